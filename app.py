@@ -1,12 +1,9 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+import click
 import os
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from datetime import datetime
-import atexit
+from datetime import datetime, timedelta
 from models import db
 import sys, os
 
@@ -14,7 +11,24 @@ sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 
 # --- Initialize Extensions ---
-migrate = Migrate()
+class MigrateGroup(click.Command):
+    """
+    `flask db ...` from Flask-Migrate, imported only when the command runs:
+    alembic adds ~0.2s to every import of the app, and workers never use it.
+    """
+
+    def __init__(self, app):
+        super().__init__("db", help="Perform database migrations.")
+        self.app = app
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_cli_group
+        if "migrate" not in self.app.extensions:
+            Migrate(self.app, db)
+        # the real group parses its own options and runs its subcommands
+        return db_cli_group.make_context(info_name, args, parent=parent, **extra)
+
 
 def create_app():
     load_dotenv()
@@ -22,10 +36,74 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "SECRET_KEY")
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL", "sqlite:///fidpos.db")
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['BARCODE_CACHE_SIZE'] = int(os.getenv("BARCODE_CACHE_SIZE", 2048))
+    app.config['BARCODE_CACHE_TTL'] = int(os.getenv("BARCODE_CACHE_TTL", 300))
+    app.config['PRINTER_MODE'] = os.getenv("PRINTER_MODE", "bluetooth")
+    app.config['PRINTER_USB_VID'] = os.getenv("PRINTER_USB_VID")
+    app.config['PRINTER_USB_PID'] = os.getenv("PRINTER_USB_PID")
+    app.config['PRINTER_BT_MAC'] = os.getenv("PRINTER_BT_MAC")
+    app.config['PRINTER_NETWORK_IP'] = os.getenv("PRINTER_NETWORK_IP")
+    app.config['PRINTER_NETWORK_PORT'] = int(os.getenv("PRINTER_NETWORK_PORT", 9100))
+    app.config['PRINT_QUEUE_SIZE'] = int(os.getenv("PRINT_QUEUE_SIZE", 100))
+    app.config['PRINT_RETRIES'] = int(os.getenv("PRINT_RETRIES", 3))
+    app.config['PRINT_RETRY_BACKOFF'] = float(os.getenv("PRINT_RETRY_BACKOFF", 0.5))
+    app.config['BACKUP_MODE'] = os.getenv("BACKUP_MODE", "snapshot")  # "snapshot" or "dump"
+    app.config['BACKUP_DIR'] = os.getenv("BACKUP_DIR", os.path.join(app.instance_path, "backups"))
+    app.config['BACKUP_KEEP'] = int(os.getenv("BACKUP_KEEP", 7))
+    app.config['BACKUP_INTERVAL_HOURS'] = float(os.getenv("BACKUP_INTERVAL_HOURS", 24))
+    app.config['BACKUP_WAL_INTERVAL_MINUTES'] = float(os.getenv("BACKUP_WAL_INTERVAL_MINUTES", 0))
+    app.config['SQLITE_TUNING'] = os.getenv("SQLITE_TUNING", "1") == "1"
+    app.config['SQLITE_JOURNAL_MODE'] = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    app.config['SQLITE_SYNCHRONOUS'] = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+    app.config['TILL_MODE'] = os.getenv("TILL_MODE", "0") == "1"
+    app.config['TILL_JOURNAL_PATH'] = os.getenv("TILL_JOURNAL_PATH", os.path.join(app.instance_path, "till_journal.db"))
+    app.config['SYNC_SERVER_URL'] = os.getenv("SYNC_SERVER_URL")
+    app.config['SYNC_TOKEN'] = os.getenv("SYNC_TOKEN")
+    app.config['SYNC_BATCH_SIZE'] = int(os.getenv("SYNC_BATCH_SIZE", 50))
+    app.config['SYNC_INTERVAL_SECONDS'] = float(os.getenv("SYNC_INTERVAL_SECONDS", 5))
+    app.config['SYNC_MAX_BATCH'] = int(os.getenv("SYNC_MAX_BATCH", 500))
+    app.config['CATALOG_SNAPSHOT_MIN_AGE'] = float(os.getenv("CATALOG_SNAPSHOT_MIN_AGE", 30))
+    app.config['METRICS_ENABLED'] = os.getenv("METRICS_ENABLED", "0") == "1"
+    app.config['METRICS_N_PLUS_ONE'] = int(os.getenv("METRICS_N_PLUS_ONE", 50))
+    app.config['STOCK_SNAPSHOT_INTERVAL_HOURS'] = float(os.getenv("STOCK_SNAPSHOT_INTERVAL_HOURS", 24))
+    app.config['SCHEDULER_ENABLED'] = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+    app.config['SCHEDULER_TICK_SECONDS'] = float(os.getenv("SCHEDULER_TICK_SECONDS", 30))
+    app.config['SCHEDULER_LEASE_SECONDS'] = float(os.getenv("SCHEDULER_LEASE_SECONDS", 120))
+    app.config['MPESA_CALLBACK_BATCH'] = int(os.getenv("MPESA_CALLBACK_BATCH", 200))
+    app.config['MPESA_CALLBACK_SWEEP_MINUTES'] = float(os.getenv("MPESA_CALLBACK_SWEEP_MINUTES", 5))
+    # "0" in production: run `flask db upgrade` once per deploy instead of in every worker
+    app.config['AUTO_CREATE_SCHEMA'] = os.getenv("AUTO_CREATE_SCHEMA", "1") == "1"
 
     # --- Initialize DB + Migrations ---
     db.init_app(app)
-    migrate.init_app(app, db)
+    app.cli.add_command(MigrateGroup(app))
+
+    # --- Barcode lookup cache ---
+    from utils.cache import item_cache
+    item_cache.init_app(app)
+
+    # --- POS catalog snapshot ---
+    from utils.catalog import catalog_snapshot
+    catalog_snapshot.init_app(app)
+
+    # --- Background receipt printing ---
+    from utils.print_queue import print_queue
+    print_queue.init_app(app)
+
+    # --- Leader-elected background jobs (backups, stock snapshots, ...) ---
+    from utils.scheduler import job_scheduler
+    job_scheduler.init_app(app)
+
+    # --- M-Pesa callback inbox: ack on arrival, apply in the background ---
+    from utils.mpesa_inbox import mpesa_inbox
+    mpesa_inbox.init_app(app)
+
+    # --- Offline-first till journal + sync worker (TILL_MODE=1) ---
+    from utils.till_sync import till_sync
+    till_sync.init_app(app)
 
     # --- Register Blueprints ---
     from routes.main import  main_bp
@@ -45,23 +123,69 @@ def create_app():
     app.register_blueprint(mpesa_bp)
 
     # --- Background Backup Job ---
-    from utils.printer import initialize_printer
-    from utils.backup import backup_database
+    from utils.backup import backup_database, snapshot_database, ship_wal
+    from utils.sqlite_tuning import tune_sqlite
+    from utils.rollups import backfill_rollups_command
+    from utils.metrics import metrics
+    from utils.importer import import_items_command
+    from utils.stock import take_snapshots, stock_snapshot_command, stock_audit_command
+    from utils.schema import create_schema, init_db_command
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(backfill_rollups_command)
+    app.cli.add_command(import_items_command)
+    app.cli.add_command(stock_snapshot_command)
+    app.cli.add_command(stock_audit_command)
     with app.app_context():
-        db.create_all()
-        initialize_printer()
-
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(
-        func=backup_database,
-        trigger=IntervalTrigger(hours=24),
-        args=["backup.sql"],
-        id='database_backup_job',
-        name='Backup database every 24 hours',
-        replace_existing=True
-    )
-    scheduler.start()
-    atexit.register(lambda: scheduler.shutdown())
+        # --- SQLite connection pragmas (WAL, busy timeout, ...) ---
+        if app.config['SQLITE_TUNING']:
+            tune_sqlite(db.engine, app.config)
+        # --- Request/SQL instrumentation + /metrics (METRICS_ENABLED=1) ---
+        metrics.init_app(app, db.engine)
+        # --- Schema + derived data (the printer now initializes on the first receipt) ---
+        if app.config['AUTO_CREATE_SCHEMA']:
+            create_schema()
+        db_path = db.engine.url.database
+
+    # --- Background jobs: one leader-elected run per deployment, not per worker ---
+    if app.config['BACKUP_MODE'] == "dump":
+        job_scheduler.add_job(
+            id='database_backup_job',
+            func=backup_database,
+            interval=timedelta(hours=app.config['BACKUP_INTERVAL_HOURS']),
+            args=["backup.sql", db_path],
+            name='Backup database every 24 hours',
+        )
+    else:
+        job_scheduler.add_job(
+            id='database_backup_job',
+            func=snapshot_database,
+            interval=timedelta(hours=app.config['BACKUP_INTERVAL_HOURS']),
+            args=[db_path, app.config['BACKUP_DIR'], app.config['BACKUP_KEEP']],
+            name='Snapshot database every 24 hours',
+        )
+        if app.config['BACKUP_WAL_INTERVAL_MINUTES'] > 0:
+            job_scheduler.add_job(
+                id='wal_shipping_job',
+                func=ship_wal,
+                interval=timedelta(minutes=app.config['BACKUP_WAL_INTERVAL_MINUTES']),
+                args=[db_path, app.config['BACKUP_DIR'], app.config['BACKUP_KEEP']],
+                name='Ship WAL segments between snapshots',
+            )
+    if app.config['STOCK_SNAPSHOT_INTERVAL_HOURS'] > 0:
+        job_scheduler.add_job(
+            id='stock_snapshot_job',
+            func=take_snapshots,
+            interval=timedelta(hours=app.config['STOCK_SNAPSHOT_INTERVAL_HOURS']),
+            name='Snapshot stock levels from the ledger',
+        )
+    if app.config['MPESA_CALLBACK_SWEEP_MINUTES'] > 0:
+        job_scheduler.add_job(
+            id='mpesa_callback_sweep',
+            func=mpesa_inbox.process_pending,
+            interval=timedelta(minutes=app.config['MPESA_CALLBACK_SWEEP_MINUTES']),
+            name='Apply M-Pesa callbacks left unprocessed',
+        )
+    job_scheduler.start()
 
     @app.context_processor
     def inject_year():
@@ -0,0 +1,106 @@
+# benchmarks/bench_backup.py
+"""
+Time, size and writer stalls: iterdump SQL backup vs. backup-API snapshot.
+
+    python -m benchmarks.bench_backup --rows 1000000
+
+While each backup runs, a writer thread commits one sale every 10 ms and
+records its worst commit latency, which shows how long the backup blocks
+the tills.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_indexes import create_schema, seed, INDEXES  # noqa: E402
+from utils.backup import backup_database, snapshot_database  # noqa: E402
+
+
+class Writer(threading.Thread):
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.path = path
+        self.stop = threading.Event()
+        self.worst_ms = 0.0
+        self.commits = 0
+
+    def run(self):
+        conn = sqlite3.connect(self.path, timeout=60)
+        while not self.stop.is_set():
+            start = time.perf_counter()
+            conn.execute(
+                "INSERT INTO sales (barcode, item_name, price, quantity, total, sold_at) "
+                "VALUES ('600000000001', 'Item 1', 100, 1, 100, datetime('now'))"
+            )
+            conn.commit()
+            self.worst_ms = max(self.worst_ms, (time.perf_counter() - start) * 1000)
+            self.commits += 1
+            time.sleep(0.01)
+        conn.close()
+
+
+def measure(label, path, fn):
+    writer = Writer(path)
+    writer.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    output = fn()
+    elapsed = time.perf_counter() - start
+    writer.stop.set()
+    writer.join()
+    return {
+        "seconds": round(elapsed, 2),
+        "bytes": sum(os.path.getsize(p) for p in output),
+        "writer_commits": writer.commits,
+        "writer_worst_ms": round(writer.worst_ms, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--wal", action="store_true", help="run the live database in WAL mode")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-bench-")
+    path = os.path.join(workdir, "bench.db")
+    conn = create_schema(path)
+    seed(conn, args.rows)
+    for name, table, columns in INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+    conn.commit()
+    if args.wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    db_size = os.path.getsize(path)
+
+    dump_file = os.path.join(workdir, "backup.sql")
+    backup_dir = os.path.join(workdir, "backups")
+
+    def run_dump():
+        backup_database(dump_file, path)
+        return [dump_file]
+
+    def run_snapshot():
+        manifest = snapshot_database(path, backup_dir)
+        return [os.path.join(backup_dir, f) for f in os.listdir(backup_dir)] if manifest else []
+
+    results = {
+        "rows": args.rows,
+        "wal": args.wal,
+        "db_bytes": db_size,
+        "dump": measure("dump", path, run_dump),
+        "snapshot": measure("snapshot", path, run_snapshot),
+    }
+    conn.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_catalog.py
+"""
+POS page catalog load: full JSON item listing vs. the versioned gzipped snapshot.
+
+    python -m benchmarks.bench_catalog --items 50000
+
+Seeds a throwaway SQLite file with --items SKUs and times, through the Flask
+test client: the old /items/ JSON listing, a cold snapshot build, a cached
+snapshot hit, a revalidation that answers 304, and a delta after a sale.
+"""
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+
+def timed(fn, runs):
+    samples = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 2), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-bench-")
+    path = os.path.join(workdir, "bench.db")
+    os.environ.update({"DATABASE_URL": f"sqlite:///{path}", "BACKUP_INTERVAL_HOURS": "10000"})
+    from app import create_app
+    from utils.catalog import catalog_snapshot
+
+    app = create_app()
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO categories (name) VALUES (?)", [(f"Category {n}",) for n in range(50)])
+    conn.executemany(
+        "INSERT INTO items (barcode, name, price, quantity, category_id, catalog_version) VALUES (?, ?, ?, ?, ?, 0)",
+        [(f"6{n:011d}", f"Item {n} 500g pack", 10 + n % 990, 1000, 1 + n % 50) for n in range(args.items)],
+    )
+    conn.commit()
+    conn.close()
+    client = app.test_client()
+    gz = {"Accept-Encoding": "gzip"}
+
+    listing_ms, listing = timed(lambda: client.get("/items/"), args.runs)
+
+    def cold():
+        catalog_snapshot.clear()
+        return client.get("/items/catalog", headers=gz)
+
+    cold_ms, snapshot = timed(cold, args.runs)
+    hit_ms, _ = timed(lambda: client.get("/items/catalog", headers=gz), args.runs)
+    etag = snapshot.headers["ETag"]
+    revalidate_ms, not_modified = timed(
+        lambda: client.get("/items/catalog", headers=dict(gz, **{"If-None-Match": etag})), args.runs
+    )
+    plain = json.loads(gzip.decompress(snapshot.data))
+
+    client.post("/sales/checkout", json={
+        "items": [{"barcode": "600000000007", "name": "Item 7 500g pack", "price": 17, "qty": 1}],
+        "payment_method": "cash",
+    })
+    delta_ms, delta = timed(lambda: client.get(f"/items/catalog/delta?since={plain['version']}"), args.runs)
+
+    print(json.dumps({
+        "items": args.items,
+        "json_listing": {"ms": listing_ms, "kb": round(len(listing.data) / 1024, 1)},
+        "snapshot_cold_build": {"ms": cold_ms},
+        "snapshot_cached": {"ms": hit_ms, "kb_gzip": round(len(snapshot.data) / 1024, 1),
+                            "kb_uncompressed": round(len(gzip.decompress(snapshot.data)) / 1024, 1)},
+        "revalidate_304": {"ms": revalidate_ms, "status": not_modified.status_code},
+        "delta_after_sale": {"ms": delta_ms, "items": len(delta.get_json()["items"])},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# benchmarks/bench_concurrency.py
+"""
+Concurrent checkout + report throughput, with and without the SQLite tuning profile.
+
+    python -m benchmarks.bench_concurrency --checkout-workers 4 --report-workers 2 --seconds 10
+
+Each worker is a separate process with its own app (like gunicorn workers)
+hammering one database file through the Flask test client: checkout workers
+POST /sales/checkout, report workers page through /reports/data. Each run
+uses a fresh database so the baseline really is in rollback-journal mode.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+
+def _make_app(db_path, tuned):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["SQLITE_TUNING"] = "1" if tuned else "0"
+    os.environ["BACKUP_INTERVAL_HOURS"] = "10000"
+    from app import create_app
+    return create_app()
+
+
+def seed(db_path, tuned, items, sales):
+    from datetime import datetime, timedelta
+    from models import db, Item, Sale
+    from utils.totals import rebuild_totals
+
+    app = _make_app(db_path, tuned)
+    with app.app_context():
+        db.session.execute(Item.__table__.insert(), [
+            {"barcode": f"6{i:011d}", "name": f"Item {i}", "price": 100, "quantity": 10 ** 9}
+            for i in range(items)
+        ])
+        start = datetime(2026, 1, 1)
+        db.session.execute(Sale.__table__.insert(), [
+            {"barcode": f"6{i % items:011d}", "item_name": f"Item {i % items}", "price": 100,
+             "quantity": 1, "total": 100, "sold_at": start + timedelta(minutes=i)}
+            for i in range(sales)
+        ])
+        db.session.commit()
+        rebuild_totals()
+
+
+def worker(kind, db_path, tuned, items, seconds, results):
+    app = _make_app(db_path, tuned)
+    client = app.test_client()
+    ok = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    n = os.getpid()
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if kind == "checkout":
+                n += 1
+                response = client.post("/sales/checkout", json={
+                    "items": [{"barcode": f"6{(n * 7 + k) % items:011d}", "quantity": 1} for k in range(3)],
+                    "payment_method": "cash",
+                })
+            else:
+                response = client.get("/reports/data?limit=2000")
+            if response.status_code == 200:
+                ok += 1
+            else:
+                errors += 1
+        except Exception:
+            # "database is locked" surfaces as an unhandled OperationalError
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    results.put({
+        "kind": kind,
+        "ok": ok,
+        "errors": errors,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 1) if latencies else None,
+    })
+
+
+def run(tuned, args):
+    workdir = tempfile.mkdtemp(prefix="fidpos-conc-")
+    db_path = os.path.join(workdir, "bench.db")
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        seeder = ctx.Process(target=seed, args=(db_path, tuned, args.items, args.sales))
+        seeder.start()
+        seeder.join()
+
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=worker, args=(kind, db_path, tuned, args.items, args.seconds, results))
+            for kind, count in (("checkout", args.checkout_workers), ("report", args.report_workers))
+            for _ in range(count)
+        ]
+        for p in procs:
+            p.start()
+        rows = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = {}
+    for kind in ("checkout", "report"):
+        mine = [r for r in rows if r["kind"] == kind]
+        summary[kind] = {
+            "per_second": round(sum(r["ok"] for r in mine) / args.seconds, 1),
+            "errors": sum(r["errors"] for r in mine),
+            "worst_p99_ms": max((r["p99_ms"] or 0) for r in mine) if mine else None,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--checkout-workers", type=int, default=4)
+    parser.add_argument("--report-workers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--sales", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(json.dumps({
+        "baseline": run(False, args),
+        "tuned": run(True, args),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_export.py
+"""
+Streaming CSV/XLSX export vs. the full JSON listing: time to first byte, total time, memory.
+
+    python -m benchmarks.bench_export --rows 1000000
+
+Seeds a throwaway SQLite file and runs each request through the Flask test
+client in a fresh subprocess, reading the body chunk by chunk. Peak RSS is
+reported per request, so the export's constant memory shows against the
+JSON array, which is built in full before the first byte is sent.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+URLS = {
+    "json_full_listing": "/reports/data",
+    "csv_export": "/reports/export?format=csv",
+    "xlsx_export": "/reports/export?format=xlsx",
+}
+
+
+def measure(path, url):
+    """Run one request in this process and return timings (called in a subprocess)."""
+    from flask import Flask
+    from models import db
+    from routes.reports import reports_bp
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(app)
+    app.register_blueprint(reports_bp)
+    client = app.test_client()
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None and chunk:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    response.close()
+    total = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "status": response.status_code,
+        "first_byte_ms": round((first_byte or total) * 1000, 1),
+        "total_seconds": round(total, 2),
+        "mb": round(size / 1e6, 1),
+        "peak_rss_growth_mb": round((peak_kb - baseline_kb) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--measure", nargs=2, metavar=("DB", "URL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure)))
+        return
+
+    from benchmarks.bench_indexes import create_schema, seed, INDEXES
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fidpos-bench-"), "bench.db")
+    conn = create_schema(path)
+    seed(conn, args.rows)
+    for name, table, columns in INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+    conn.commit()
+    conn.close()
+
+    results = {"rows": args.rows}
+    for label, url in URLS.items():
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_export", "--measure", path, url],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        results[label] = json.loads(out.stdout.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
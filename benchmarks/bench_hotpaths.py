@@ -0,0 +1,294 @@
+# benchmarks/bench_hotpaths.py
+"""
+Hot-path latency and throughput: scan, checkout, sales listing and dashboard.
+
+    python -m benchmarks.bench_hotpaths --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.bench_hotpaths --compare results/<older>.json
+
+Seeds a throwaway SQLite file (schema from models.py) with a synthetic
+catalog and two years of sales, then measures each route twice:
+
+  in_process  one request at a time through the Flask test client, so the
+              numbers are app + SQLite cost only
+  http        --concurrency client threads against gunicorn (--workers
+              processes) for --seconds, with a weighted request mix
+
+Results are JSON with the git commit, Python/SQLite versions and the run
+parameters. With --compare, any route whose p50 (p99) got more than
+--tolerance (--p99-tolerance) and at least 1 ms slower than the baseline
+file is listed and the exit code is 1.
+Keep the parameters identical across runs you want to compare.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+# route -> share of the HTTP mix; a till scans far more than anything else
+MIX = {"lookup": 0.6, "checkout": 0.2, "sales_data": 0.1, "dashboard": 0.1}
+# slowdowns smaller than this are run-to-run noise, whatever the percentage
+MIN_REGRESSION_MS = 1.0
+
+
+def percentile(sorted_samples, q):
+    if not sorted_samples:
+        return None
+    return round(sorted_samples[min(int(len(sorted_samples) * q), len(sorted_samples) - 1)] * 1000, 2)
+
+
+def summarize(samples, errors, seconds):
+    samples.sort()
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "p50_ms": percentile(samples, 0.50),
+        "p99_ms": percentile(samples, 0.99),
+        "per_second": round(len(samples) / seconds, 1) if seconds else None,
+    }
+
+
+def git_revision():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def seed_database(path, items, rows):
+    from benchmarks.bench_indexes import create_schema, seed, INDEXES
+
+    conn = create_schema(path)
+    seed(conn, rows, items=items)
+    for name, table, columns in INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+    # stock never runs out mid-benchmark
+    conn.execute("UPDATE items SET quantity = 1000000000")
+    conn.commit()
+    conn.close()
+
+    # totals + rollups the way a migrated production database has them
+    from models import db
+    from utils.totals import rebuild_totals
+
+    with make_app(path).app_context():
+        rebuild_totals()
+        db.session.commit()
+
+
+def make_app(path):
+    os.environ.update({"DATABASE_URL": f"sqlite:///{path}", "BACKUP_INTERVAL_HOURS": "10000"})
+    from app import create_app
+    return create_app()
+
+
+class Requests:
+    """The measured requests, as (method, url, json) triples."""
+
+    def __init__(self, items, rnd):
+        self.items = items
+        self.rnd = rnd
+
+    def barcode(self):
+        return f"{600000000000 + self.rnd.randint(1, self.items)}"
+
+    def lookup(self):
+        return "GET", f"/items/lookup/{self.barcode()}", None
+
+    def checkout(self):
+        cart = [{"barcode": self.barcode(), "name": "", "price": 100, "qty": self.rnd.randint(1, 3)}
+                for _ in range(self.rnd.randint(1, 5))]
+        return "POST", "/sales/checkout", {"items": cart, "payment_method": "cash"}
+
+    def sales_data(self):
+        # first page, the way reports.js asks for it (the unpaged legacy dump is not a hot path)
+        return "GET", "/sales/data?limit=500", None
+
+    def dashboard(self):
+        return "GET", "/", None
+
+
+def run_in_process(path, args):
+    client = make_app(path).test_client()
+    make = Requests(args.items, random.Random(1))
+    results = {}
+    for route in MIX:
+        samples, errors = [], 0
+        for n in range(args.warmup + args.requests):
+            method, url, body = getattr(make, route)()
+            start = time.perf_counter()
+            response = client.open(url, method=method, json=body)
+            elapsed = time.perf_counter() - start
+            if n < args.warmup:
+                continue
+            if response.status_code == 200:
+                samples.append(elapsed)
+            else:
+                errors += 1
+        results[route] = summarize(samples, errors, sum(samples))
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_http(path, args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", BACKUP_INTERVAL_HOURS="10000")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(args.workers), "--bind", f"127.0.0.1:{port}",
+         "--log-level", "warning", "run:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if requests.get(f"{base_url}/items/lookup/600000000001", timeout=1).ok:
+                    break
+            except requests.RequestException:
+                pass
+            if time.monotonic() > deadline or server.poll() is not None:
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.2)
+
+        samples = {route: [] for route in MIX}
+        errors = {route: 0 for route in MIX}
+        lock = threading.Lock()
+        stop = time.monotonic() + args.seconds
+
+        def client(seed):
+            rnd = random.Random(seed)
+            make = Requests(args.items, rnd)
+            session = requests.Session()
+            routes, weights = zip(*MIX.items())
+            mine = {route: [] for route in MIX}
+            failed = {route: 0 for route in MIX}
+            while time.monotonic() < stop:
+                route = rnd.choices(routes, weights)[0]
+                method, url, body = getattr(make, route)()
+                start = time.perf_counter()
+                try:
+                    ok = session.request(method, base_url + url, json=body, timeout=30).status_code == 200
+                except requests.RequestException:
+                    ok = False
+                if ok:
+                    mine[route].append(time.perf_counter() - start)
+                else:
+                    failed[route] += 1
+            with lock:
+                for route in MIX:
+                    samples[route].extend(mine[route])
+                    errors[route] += failed[route]
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(args.concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    results = {route: summarize(samples[route], errors[route], elapsed) for route in MIX}
+    results["total_per_second"] = round(sum(r["requests"] for r in results.values()) / elapsed, 1)
+    return results
+
+
+def compare(current, baseline, tolerances):
+    """Routes whose p50/p99 grew by more than their tolerance (0.25 = 25%) over the baseline."""
+    regressions = []
+    for phase in ("in_process", "http"):
+        for route, now in current.get(phase, {}).items():
+            before = baseline.get(phase, {}).get(route)
+            if not isinstance(now, dict) or not isinstance(before, dict):
+                continue
+            for metric, tolerance in tolerances.items():
+                if not (now.get(metric) and before.get(metric)):
+                    continue
+                if now[metric] > before[metric] * (1 + tolerance) and now[metric] - before[metric] > MIN_REGRESSION_MS:
+                    regressions.append({
+                        "phase": phase, "route": route, "metric": metric,
+                        "baseline": before[metric], "current": now[metric],
+                        "change": f"+{round((now[metric] / before[metric] - 1) * 100)}%",
+                    })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=500_000, help="sale lines (two years of history)")
+    parser.add_argument("--requests", type=int, default=500, help="in-process requests per route")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10, help="HTTP load duration (0 to skip)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5, help="allowed p99 slowdown (noisier)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-hot-")
+    path = os.path.join(workdir, "bench.db")
+    started = time.perf_counter()
+    seed_database(path, args.items, args.rows)
+
+    results = {
+        "commit": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "params": {k: getattr(args, k) for k in ("items", "rows", "requests", "warmup",
+                                                  "seconds", "concurrency", "workers")},
+        "seed_seconds": round(time.perf_counter() - started, 1),
+        "in_process": run_in_process(path, args),
+    }
+    if args.seconds > 0:
+        results["http"] = run_http(path, args)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != results["params"]:
+            print(f"⚠️ Parameters differ from the baseline ({baseline.get('params')})", file=sys.stderr)
+        results["baseline_commit"] = baseline.get("commit")
+        results["regressions"] = compare(
+            results, baseline, {"p50_ms": args.tolerance, "p99_ms": args.p99_tolerance}
+        )
+        exit_code = 1 if results["regressions"] else 0
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_import.py
+"""
+Bulk item import throughput: batched upserts vs. one POST /items/add per item.
+
+    python -m benchmarks.bench_import --rows 100000
+
+Writes a --rows supplier CSV (barcode, name, price, qty, category; about one
+row in a hundred invalid), imports it into a throwaway SQLite file through
+POST /items/import, then re-imports it so every row is an update, and times
+--sample single-item POST /items/add calls to extrapolate the per-item path.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+CATEGORIES = ["Dairy", "Beverages", "Flour & Grains", "Cooking", "Household", "Bakery", "Snacks",
+              "Personal Care", "Breakfast"]
+
+
+def make_csv(rows, rnd, price_shift=0):
+    out = io.StringIO()
+    out.write("Barcode,Name,Price,Qty,Category\n")
+    for n in range(rows):
+        price = "n/a" if n % 100 == 99 else rnd.randint(20, 2000) + price_shift
+        out.write(f"{700000000000 + n},Item {n},{price},{rnd.randint(0, 300)},{rnd.choice(CATEGORIES)}\n")
+    return out.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=500, help="single-item adds to time")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-bench-")
+    path = os.path.join(workdir, "bench.db")
+    os.environ.update({"DATABASE_URL": f"sqlite:///{path}", "BACKUP_INTERVAL_HOURS": "10000"})
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    rnd = random.Random(7)
+    results = {"rows": args.rows}
+
+    for phase, shift in (("insert", 0), ("update", 5)):
+        body = make_csv(args.rows, rnd, shift)
+        start = time.perf_counter()
+        summary = client.post("/items/import", data=body, content_type="text/csv").get_json()
+        elapsed = time.perf_counter() - start
+        results[phase] = {
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(args.rows / elapsed),
+            **{k: summary[k] for k in ("inserted", "updated", "error_count", "categories_created")},
+        }
+
+    start = time.perf_counter()
+    for n in range(args.sample):
+        client.post("/items/add", json={
+            "barcode": f"800000000{n:03d}", "name": f"Single {n}", "price": "10", "quantity": "1",
+            "category_id": "1",
+        })
+    per_item = (time.perf_counter() - start) / args.sample
+    results["single_add"] = {
+        "ms_per_item": round(per_item * 1000, 2),
+        "extrapolated_seconds": round(per_item * args.rows, 1),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# benchmarks/bench_indexes.py
+"""
+Query plans and timings for the hot report/checkout queries, before and
+after the indexes from migrations/versions/0002_hot_query_indexes.py.
+
+    python -m benchmarks.bench_indexes --rows 1000000
+
+Seeds a throwaway SQLite file (never the real database) using the schema
+from models.py, runs each query without the indexes, creates them, and runs
+everything again.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine  # noqa: E402
+from models import db  # noqa: E402
+
+INDEXES = [
+    ("ix_sales_sold_at_id", "sales", "sold_at, id"),
+    ("ix_sales_transaction_id", "sales", "transaction_id"),
+    ("ix_sales_barcode_sold_at", "sales", "barcode, sold_at"),
+    ("ix_items_category_id", "items", "category_id"),
+    ("ix_sale_transactions_status_sold_at", "sale_transactions", "status, sold_at"),
+]
+
+START = datetime(2023, 1, 1)
+TS = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def create_schema(path):
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    for name, _, _ in INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    return conn
+
+
+def seed(conn, rows, items=5000, categories=50, lines_per_sale=4):
+    rnd = random.Random(42)
+    span = 2 * 365 * 24 * 3600  # two years of history
+
+    conn.executemany(
+        "INSERT INTO categories (id, name) VALUES (?, ?)",
+        ((i, f"Category {i}") for i in range(1, categories + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO items (id, barcode, name, price, quantity, category_id) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (i, f"{600000000000 + i}", f"Item {i}", round(rnd.uniform(10, 2000), 2),
+             rnd.randint(0, 500), rnd.randint(1, categories))
+            for i in range(1, items + 1)
+        ),
+    )
+
+    transactions = rows // lines_per_sale
+    stamps = sorted(START + timedelta(seconds=rnd.randrange(span)) for _ in range(transactions))
+    conn.executemany(
+        "INSERT INTO sale_transactions (id, total, status, sold_at) VALUES (?, ?, ?, ?)",
+        (
+            (t + 1, 0, rnd.choice(("paid", "paid", "paid", "pending", "failed")), stamps[t].strftime(TS))
+            for t in range(transactions)
+        ),
+    )
+
+    def sale_rows():
+        for n in range(rows):
+            t = n // lines_per_sale
+            item = rnd.randint(1, items)
+            qty = rnd.randint(1, 5)
+            price = 100.0
+            yield (t + 1, f"{600000000000 + item}", f"Item {item}", price, qty, price * qty,
+                   stamps[min(t, transactions - 1)].strftime(TS))
+
+    conn.executemany(
+        "INSERT INTO sales (transaction_id, barcode, item_name, price, quantity, total, sold_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        sale_rows(),
+    )
+    conn.commit()
+
+
+def queries():
+    month_start = (START + timedelta(days=400)).strftime(TS)
+    month_end = (START + timedelta(days=431)).strftime(TS)
+    cursor_at = (START + timedelta(days=415)).strftime(TS)
+    return {
+        "report_range_page": (
+            "SELECT id, item_name, total, sold_at FROM sales "
+            "WHERE sold_at >= ? AND sold_at < ? ORDER BY sold_at DESC, id DESC LIMIT 501",
+            (month_start, month_end),
+        ),
+        "report_keyset_next_page": (
+            "SELECT id, item_name, total, sold_at FROM sales "
+            "WHERE sold_at >= ? AND (sold_at, id) < (?, ?) "
+            "ORDER BY sold_at DESC, id DESC LIMIT 501",
+            (month_start, cursor_at, 10 ** 9),
+        ),
+        "report_range_total": (
+            "SELECT COUNT(*), SUM(total) FROM sales WHERE sold_at >= ? AND sold_at < ?",
+            (month_start, month_end),
+        ),
+        "transaction_items": (
+            "SELECT * FROM sales WHERE transaction_id = ?",
+            (12345,),
+        ),
+        "barcode_history": (
+            "SELECT sold_at, quantity, total FROM sales WHERE barcode = ? "
+            "ORDER BY sold_at DESC LIMIT 50",
+            ("600000000042",),
+        ),
+        "items_in_category": (
+            "SELECT id, name FROM items WHERE category_id = ?",
+            (7,),
+        ),
+        "pending_transactions": (
+            "SELECT id, total FROM sale_transactions WHERE status = 'pending' AND sold_at >= ?",
+            (month_start,),
+        ),
+    }
+
+
+def run_queries(conn, repeat):
+    results = {}
+    for name, (sql, params) in queries().items():
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+        conn.execute(sql, params).fetchall()  # warm the page cache
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params).fetchall()
+        elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+        results[name] = {"ms": round(elapsed_ms, 3), "plan": plan}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="sales rows to seed")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fidpos-bench-"), "bench.db")
+    conn = create_schema(path)
+
+    start = time.perf_counter()
+    seed(conn, args.rows)
+    seed_s = time.perf_counter() - start
+
+    before = run_queries(conn, args.repeat)
+
+    start = time.perf_counter()
+    for name, table, columns in INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+    conn.execute("ANALYZE")
+    conn.commit()
+    index_s = time.perf_counter() - start
+
+    after = run_queries(conn, args.repeat)
+    conn.close()
+    os.remove(path)
+
+    if args.json:
+        print(json.dumps({
+            "rows": args.rows, "seed_s": round(seed_s, 2), "index_build_s": round(index_s, 2),
+            "before": before, "after": after,
+        }, indent=2))
+        return
+
+    print(f"Seeded {args.rows:,} sales in {seed_s:.1f}s, built indexes in {index_s:.1f}s\n")
+    for name in before:
+        b, a = before[name], after[name]
+        speedup = b["ms"] / a["ms"] if a["ms"] else float("inf")
+        print(f"{name:26} {b['ms']:10.2f} ms -> {a['ms']:8.2f} ms  ({speedup:,.0f}x)")
+        print(f"{'':26} before: {' / '.join(b['plan'])}")
+        print(f"{'':26} after:  {' / '.join(a['plan'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_listings.py
+"""
+SQL statements per item-listing request must not grow with the catalog.
+
+    python -m benchmarks.bench_listings --items 5000
+
+Seeds two throwaway SQLite files, one with 50 items and one with --items
+items, with a category per 25 items, and counts the SQL statements each
+listing endpoint issues against both. Any endpoint whose count differs
+between the two sizes is an N+1 and the exit code is 1. (A lazy
+item.category costs one query per distinct category, since the session
+identity map absorbs repeats, so the category count has to grow too.) Also times each listing and, for reference, the lazy-loading pattern the
+listings used to follow (Item.query.all() then item.category.name per item).
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+LISTINGS = ["/items/", "/products/api/items", "/products/items", "/items/catalog", "/categories/list"]
+ITEMS_PER_CATEGORY = 25
+
+
+def seed(path, items):
+    os.environ.update({"DATABASE_URL": f"sqlite:///{path}", "BACKUP_INTERVAL_HOURS": "10000"})
+    from app import create_app
+    from routes.products import products_bp
+
+    app = create_app()
+    if "products" not in app.blueprints:
+        app.register_blueprint(products_bp)
+    categories = max(1, items // ITEMS_PER_CATEGORY)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO categories (id, name) VALUES (?, ?)",
+                     [(n, f"Category {n}") for n in range(1, categories + 1)])
+    conn.executemany(
+        "INSERT INTO items (barcode, name, price, quantity, category_id, catalog_version) VALUES (?, ?, ?, ?, ?, 0)",
+        # every tenth item uncategorised
+        [(f"{500000000000 + n}", f"Item {n}", 10 + n % 500, n % 90, None if n % 10 == 0 else n % categories + 1)
+         for n in range(items)],
+    )
+    conn.commit()
+    conn.close()
+    return app
+
+
+def measure(app):
+    from models import db, Item
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        client = app.test_client()
+        results = {}
+        for url in LISTINGS:
+            client.get(url)  # warm up: first-request setup and snapshot builds
+            del statements[:]
+            start = time.perf_counter()
+            status = client.get(url).status_code
+            results[url] = {
+                "status": status,
+                "queries": len(statements),
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+            }
+
+        del statements[:]
+        start = time.perf_counter()
+        [i.category.name if i.category else None for i in Item.query.all()]
+        results["lazy_relationship_reference"] = {
+            "queries": len(statements),
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        db.session.remove()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-bench-")
+    small = measure(seed(os.path.join(workdir, "small.db"), 50))
+    large = measure(seed(os.path.join(workdir, "large.db"), args.items))
+
+    growing = [url for url in LISTINGS if small[url]["queries"] != large[url]["queries"]]
+    failed = [url for url in LISTINGS if large[url]["status"] != 200]
+    print(json.dumps({"items": [50, args.items], "small": small, "large": large,
+                      "query_count_grows": growing, "failed": failed}, indent=2))
+    sys.exit(1 if growing or failed else 0)
+
+
+if __name__ == "__main__":
+    main()
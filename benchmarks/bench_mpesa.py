@@ -0,0 +1,75 @@
+# benchmarks/bench_mpesa.py
+"""
+STK push latency and Daraja round trips against the local stub.
+
+    python -m benchmarks.bench_mpesa --pushes 200
+
+Checks that the OAuth endpoint is hit once for the whole run, that pooled
+keep-alive connections are reused, and that a revoked token is refreshed
+transparently. Exits non-zero if any of those fail.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.daraja_stub import DarajaStub  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pushes", type=int, default=200)
+    args = parser.parse_args()
+
+    stub = DarajaStub().start()
+    os.environ.update({
+        "MPESA_BASE_URL": stub.base_url,
+        "MPESA_CONSUMER_KEY": "key",
+        "MPESA_CONSUMER_SECRET": "secret",
+        "MPESA_SHORTCODE": "174379",
+        "MPESA_PASSKEY": "passkey",
+        "DATABASE_URL": "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"),
+    })
+
+    from app import create_app
+    import routes.mpesa as mpesa
+    mpesa.MPESA_BASE_URL = stub.base_url  # module constants are read at import time
+
+    app = create_app()
+    client = app.test_client()
+    body = {"phone": "254712345678", "amount": 10, "sale_id": 1}
+
+    latencies = []
+    for i in range(args.pushes):
+        if i == args.pushes // 2:
+            stub.revoke_tokens()  # simulate Daraja expiring the token early
+        start = time.perf_counter()
+        resp = client.post("/mpesa/stkpush", json=body)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200, resp.get_json()
+
+    latencies.sort()
+    result = {
+        "pushes": args.pushes,
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 3),
+        "daraja": dict(stub.counts),
+    }
+    print(json.dumps(result, indent=2))
+    stub.shutdown()
+
+    ok = (
+        stub.counts["oauth"] == 2             # initial token + one refresh after revoke
+        and stub.counts["stkpush"] == args.pushes
+        and stub.counts["connections"] <= 2   # keep-alive reuse
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/bench_mpesa_callbacks.py
+"""
+M-Pesa callback ingestion under a burst of callbacks and Daraja retries.
+
+    python -m benchmarks.bench_mpesa_callbacks --sales 1000 --retries 2
+
+Creates --sales pending sales, sends an STK push for each through /sales/pay
+against the local Daraja stub (which stores each CheckoutRequestID on its
+sale), then fires every callback 1 + --retries times from --threads
+threads, about one in ten a failed payment. Reports the callback ack
+latency, how long the background inbox took to apply them, and exits 1
+unless every sale ends paid or failed as its callback said, each
+callback is stored once, and a callback that arrives before its push is
+linked is still applied.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.daraja_stub import DarajaStub  # noqa: E402
+
+
+def callback(checkout_id, paid):
+    body = {"MerchantRequestID": "bench", "CheckoutRequestID": checkout_id,
+            "ResultCode": 0 if paid else 1032,
+            "ResultDesc": "The service request is processed successfully." if paid else "Request cancelled by user"}
+    if paid:
+        body["CallbackMetadata"] = {"Item": [
+            {"Name": "Amount", "Value": 10.0},
+            {"Name": "MpesaReceiptNumber", "Value": f"R{checkout_id[-9:].upper()}"},
+            {"Name": "TransactionDate", "Value": 20261018100000},
+            {"Name": "PhoneNumber", "Value": 254712345678},
+        ]}
+    return {"Body": {"stkCallback": body}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sales", type=int, default=1000)
+    parser.add_argument("--retries", type=int, default=2, help="duplicate deliveries per callback")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    stub = DarajaStub().start()
+    path = os.path.join(tempfile.mkdtemp(prefix="fidpos-bench-"), "bench.db")
+    os.environ.update({
+        "MPESA_BASE_URL": stub.base_url,
+        "MPESA_CONSUMER_KEY": "key",
+        "MPESA_CONSUMER_SECRET": "secret",
+        "MPESA_SHORTCODE": "174379",
+        "MPESA_PASSKEY": "passkey",
+        "DATABASE_URL": f"sqlite:///{path}",
+        "SCHEDULER_ENABLED": "0",
+    })
+
+    from app import create_app
+    import routes.mpesa as mpesa
+    mpesa.MPESA_BASE_URL = stub.base_url  # module constants are read at import time
+    from utils.mpesa_inbox import mpesa_inbox
+
+    app = create_app()
+    client = app.test_client()
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO sale_transactions (id, total, status) VALUES (?, 10, 'pending')",
+                     [(n,) for n in range(1, args.sales + 1)])
+    conn.commit()
+    conn.close()
+
+    checkout_ids = {}
+    for sale_id in range(1, args.sales + 1):
+        resp = client.post("/sales/pay", json={"sale_id": sale_id, "phone": "254712345678"})
+        checkout_ids[sale_id] = resp.get_json()["CheckoutRequestID"]
+    stub.shutdown()
+
+    rnd = random.Random(7)
+    outcome = {sale_id: rnd.random() >= 0.1 for sale_id in checkout_ids}
+    deliveries = [callback(checkout_ids[s], outcome[s]) for s in checkout_ids for _ in range(1 + args.retries)]
+    rnd.shuffle(deliveries)
+
+    def deliver(payload):
+        start = time.perf_counter()
+        resp = client.post("/mpesa/callback", json=payload)
+        assert resp.get_json()["ResultCode"] == 0
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        latencies = sorted(pool.map(deliver, deliveries))
+    acked = time.perf_counter() - start
+
+    # wait for the background inbox to apply them all
+    with app.app_context():
+        from models import db, MpesaCallback, SaleTransaction
+        while db.session.query(MpesaCallback.id).filter(MpesaCallback.processed_at.is_(None)).first():
+            db.session.remove()
+            time.sleep(0.01)
+        applied = time.perf_counter() - start
+        stored = db.session.query(MpesaCallback.id).count()
+        statuses = dict(db.session.query(SaleTransaction.id, SaleTransaction.status))
+
+        # a callback that lands before the push response is linked to its sale
+        db.session.execute(db.insert(SaleTransaction).values(id=args.sales + 1, total=10, status="pending"))
+        db.session.commit()
+        client.post("/mpesa/callback", json=callback("ws_CO_early", True))
+        time.sleep(0.2)
+        mpesa_inbox.link(args.sales + 1, "ws_CO_early")
+        early = db.session.get(SaleTransaction, args.sales + 1).status
+
+    wrong = [s for s, paid in outcome.items() if statuses.get(s) != ("paid" if paid else "failed")]
+    result = {
+        "sales": args.sales,
+        "callbacks_sent": len(deliveries),
+        "callbacks_stored": stored,
+        "ack_p50_ms": round(statistics.median(latencies), 3),
+        "ack_p99_ms": round(latencies[int(len(latencies) * 0.99) - 1], 3),
+        "acks_per_second": round(len(deliveries) / acked),
+        "all_applied_seconds": round(applied, 3),
+        "wrong_status": len(wrong),
+        "early_callback": early,
+    }
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if stored == args.sales and not wrong and early == "paid" else 1)
+
+
+if __name__ == "__main__":
+    main()
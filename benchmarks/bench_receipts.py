@@ -0,0 +1,131 @@
+# benchmarks/bench_receipts.py
+"""
+Receipt views and reprints: stored blobs vs. rendering per request.
+
+    python -m benchmarks.bench_receipts --receipts 500 --lines 8
+
+Checks out --receipts carts of --lines items each, then times viewing each
+receipt through /sales/receipt/<id> (one blob read) against the old handler
+(load the transaction, lazy-load its items, render receipt.html), counts
+SQL statements per view, and times preparing a reprint from the stored
+ESC/POS bytes against rendering it. Also reports what storing the receipt
+adds to a checkout and how many bytes each receipt takes.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def timed(fn, args):
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 3), "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--receipts", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "DATABASE_URL": "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="fidpos-bench-"), "bench.db"),
+        "SCHEDULER_ENABLED": "0",
+    })
+    from flask import render_template
+    from sqlalchemy import event, func
+    from app import create_app
+    from models import db, Item, Receipt, SaleTransaction
+    import routes.sales as sales
+    from utils.receipts import get_receipt, render_escpos
+
+    app = create_app()
+
+    @app.route("/bench/receipt/<int:sale_id>")
+    def old_receipt(sale_id):
+        # the handler this replaces, mounted so both views go through HTTP
+        transaction = SaleTransaction.query.get_or_404(sale_id)
+        return render_template("receipt.html", items=transaction.items, total=transaction.total,
+                               shop_name="FidPOS Store", date=transaction.sold_at)
+
+    client = app.test_client()
+    rnd = random.Random(7)
+    with app.app_context():
+        db.session.add_all(Item(barcode=f"{n:08d}", name=f"Item {n} {rnd.choice(['500ml', '1kg', '2L'])}",
+                                price=rnd.randint(20, 900), quantity=10 ** 6) for n in range(200))
+        db.session.commit()
+
+    def cart():
+        return {"payment_method": "cash", "items": [
+            {"barcode": f"{n:08d}", "name": "", "price": rnd.randint(20, 900), "qty": rnd.randint(1, 4)}
+            for n in rnd.sample(range(200), args.lines)]}
+
+    # alternate checkouts with and without storing the receipt, for its cost
+    store = sales.store_receipt
+    checkouts, bare, sale_ids = [], [], []
+    for n in range(2 * args.receipts):
+        sales.store_receipt = store if n % 2 == 0 else (lambda *a, **k: None)
+        start = time.perf_counter()
+        sale_id = client.post("/sales/checkout", json=cart()).get_json()["sale_id"]
+        (checkouts if n % 2 == 0 else bare).append((time.perf_counter() - start) * 1000)
+        if n % 2 == 0:
+            sale_ids.append(sale_id)
+    sales.store_receipt = store
+
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(1))
+
+    def old_view(sale_id):
+        client.get(f"/bench/receipt/{sale_id}", headers={"Accept-Encoding": "gzip"})
+
+    def new_view(sale_id):
+        client.get(f"/sales/receipt/{sale_id}", headers={"Accept-Encoding": "gzip"})
+
+    def count(fn):
+        statements.clear()
+        fn(sale_ids[0])
+        return len(statements)
+
+    def old_reprint(sale_id):
+        with app.app_context():
+            head = db.session.get(SaleTransaction, sale_id)
+            render_escpos([(s.item_name, s.quantity, s.price, s.total) for s in head.items], head.total, head.sold_at)
+            db.session.remove()
+
+    def new_reprint(sale_id):
+        with app.app_context():
+            gzip.decompress(get_receipt(sale_id, "escpos"))
+            db.session.remove()
+
+    results = {
+        "receipts": args.receipts,
+        "lines_per_receipt": args.lines,
+        "view_render_per_request_http": dict(timed(old_view, sale_ids), sql_statements=count(old_view)),
+        "view_stored_blob_http": dict(timed(new_view, sale_ids), sql_statements=count(new_view)),
+        "reprint_render": timed(old_reprint, sale_ids),
+        "reprint_stored_bytes": timed(new_reprint, sale_ids),
+        "checkout_p50_ms": round(statistics.median(checkouts), 3),
+        "checkout_without_receipt_p50_ms": round(statistics.median(bare), 3),
+    }
+    with app.app_context():
+        html, escpos = db.session.query(func.avg(func.length(Receipt.html)), func.avg(func.length(Receipt.escpos))).one()
+        plain = len(gzip.decompress(get_receipt(sale_ids[0], "html")))
+        results["stored_bytes_per_receipt"] = {"html_gz": round(html), "escpos_gz": round(escpos), "html_plain": plain}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
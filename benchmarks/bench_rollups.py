@@ -0,0 +1,90 @@
+# benchmarks/bench_rollups.py
+"""
+Multi-year report summary: aggregating raw sales vs. reading the rollup tables.
+
+    python -m benchmarks.bench_rollups --rows 1000000
+
+Seeds two years of sales into a throwaway SQLite file (indexes included),
+backfills the rollups with utils.rollups.rebuild_rollups, then times the
+same summary (totals, revenue by day and hour, top sellers, category mix)
+computed from `sales` directly and from the rollups via sales_summary().
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from flask import Flask  # noqa: E402
+from benchmarks.bench_indexes import create_schema, seed, INDEXES  # noqa: E402
+from models import db  # noqa: E402
+from utils.rollups import rebuild_rollups, sales_summary  # noqa: E402
+
+RAW_QUERIES = [
+    "SELECT count(id), sum(quantity), sum(total) FROM sales",
+    "SELECT date(sold_at), count(id), sum(quantity), sum(total) FROM sales GROUP BY 1 ORDER BY 1",
+    "SELECT CAST(strftime('%H', sold_at) AS INTEGER), count(id), sum(quantity), sum(total) "
+    "FROM sales GROUP BY 1 ORDER BY 1",
+    "SELECT barcode, max(item_name), count(id), sum(quantity), sum(total) FROM sales "
+    "GROUP BY barcode ORDER BY sum(total) DESC LIMIT 10",
+    "SELECT coalesce(i.category_id, 0), count(s.id), sum(s.quantity), sum(s.total) "
+    "FROM sales s LEFT JOIN items i ON i.barcode = s.barcode GROUP BY 1 ORDER BY 4 DESC",
+]
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return round(min(times) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="fidpos-bench-"), "bench.db")
+    conn = create_schema(path)
+    seed(conn, args.rows)
+    for name, table, columns in INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+    conn.commit()
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(app)
+
+    with app.app_context():
+        start = time.perf_counter()
+        rebuild_rollups()
+        db.session.commit()
+        backfill = round(time.perf_counter() - start, 2)
+
+        def raw():
+            for sql in RAW_QUERIES:
+                conn.execute(sql).fetchall()
+
+        results = {
+            "rows": args.rows,
+            "backfill_seconds": backfill,
+            "raw_sales_ms": best_of(raw, args.repeat),
+            "rollups_ms": best_of(lambda: sales_summary(top=10), args.repeat),
+            "rollup_rows": {
+                table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                for table in ("sales_daily", "sales_hourly", "item_sales_daily", "item_sales_monthly",
+                              "category_sales_daily")
+            },
+        }
+    conn.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_search.py
+"""
+Item search on a large catalog: in-process fuzzy index vs. SQL LIKE.
+
+    python -m benchmarks.bench_search --items 100000
+
+Seeds a throwaway SQLite file with --items SKUs named like a supermarket
+catalog (brand + product + variant + size), then times prefix, typo,
+multi-word and barcode queries through utils.search, the LIKE '%q%' scan a
+naive endpoint would run, and the delta sync the index does after a sale.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+BRANDS = ["Kabras", "Mumias", "Brookside", "Tuzo", "Daima", "Kenylon", "Jogoo", "Ndovu", "Pembe",
+          "Coca-Cola", "Fanta", "Sprite", "Afia", "Minute Maid", "Cadbury", "Nestle", "Kensalt",
+          "Golden Fry", "Elianto", "Rina", "Omo", "Ariel", "Sunlight", "Geisha", "Colgate", "Dettol",
+          "Royco", "Kimbo", "Blue Band", "Festive", "Supa Loaf", "Broadways", "Highlands", "Keringet"]
+PRODUCTS = ["Milk", "Sugar", "Maize Flour", "Wheat Flour", "Cooking Oil", "Soda", "Juice", "Chocolate",
+            "Salt", "Rice", "Soap", "Detergent", "Toothpaste", "Bread", "Margarine", "Water", "Tea Leaves",
+            "Coffee", "Biscuits", "Yoghurt", "Butter", "Cornflakes", "Spaghetti", "Tomato Sauce",
+            "Baking Powder", "Drinking Chocolate", "Washing Powder", "Bathing Soap", "Mineral Water"]
+VARIANTS = ["", "Strawberry", "Vanilla", "Original", "Lemon", "Orange", "Mango", "Fresh", "Long Life",
+            "Extra", "Light", "Classic", "Family Pack", "Premium", "Brown", "White", "Whole Grain"]
+SIZES = ["100g", "200g", "250g", "400g", "500g", "1kg", "2kg", "5kg", "250ml", "300ml", "500ml",
+         "1L", "2L", "5L", "6 Pack", "12 Pack"]
+CATEGORIES = ["Dairy", "Beverages", "Flour & Grains", "Cooking", "Household", "Bakery", "Snacks",
+              "Personal Care", "Breakfast"]
+
+QUERIES = {
+    "prefix": ["choc", "brook", "maize fl", "coo", "deter", "kab sug", "yog"],
+    "typo": ["choclate", "brookide", "detergnt", "margarin", "spagheti", "yoghrt", "toothpste"],
+    "multi_word": ["milk 500ml", "cola 2l", "brookside milk fresh", "cooking oil 5l", "omo washing"],
+    "barcode": ["61610", "6161000012", "616100004999"],
+}
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 3), "p99_ms": round(samples[int(len(samples) * 0.99)], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-bench-")
+    path = os.path.join(workdir, "bench.db")
+    os.environ.update({"DATABASE_URL": f"sqlite:///{path}", "BACKUP_INTERVAL_HOURS": "10000"})
+    from app import create_app
+    from utils.search import search_index
+
+    app = create_app()
+    rnd = random.Random(7)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO categories (id, name) VALUES (?, ?)", enumerate(CATEGORIES, 1))
+    conn.executemany(
+        "INSERT INTO items (barcode, name, price, quantity, category_id, catalog_version) VALUES (?, ?, ?, ?, ?, 0)",
+        [
+            (f"{616100000000 + n}",
+             " ".join(w for w in (rnd.choice(BRANDS), rnd.choice(VARIANTS), rnd.choice(PRODUCTS), rnd.choice(SIZES)) if w),
+             rnd.randint(20, 2000), rnd.randint(0, 300), rnd.randint(1, len(CATEGORIES)))
+            for n in range(args.items)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    results = {"items": args.items}
+    with app.app_context():
+        start = time.perf_counter()
+        search_index.sync()
+        results["index_build_seconds"] = round(time.perf_counter() - start, 2)
+        results["vocabulary_words"] = len(search_index.vocabulary)
+
+        for kind, queries in QUERIES.items():
+            per_query = [timed(lambda q=q: search_index.search(q, 20), args.runs) for q in queries]
+            results[kind] = {
+                "p50_ms": round(statistics.median(r["p50_ms"] for r in per_query), 3),
+                "worst_p99_ms": max(r["p99_ms"] for r in per_query),
+                "sample": {q: [r["name"] for r in search_index.search(q, 3)] for q in queries[:2]},
+            }
+
+        from models import db
+        like = db.session.connection().connection.dbapi_connection
+        results["sql_like_scan"] = timed(lambda: like.execute(
+            "SELECT i.id, i.name FROM items i LEFT JOIN categories c ON c.id = i.category_id "
+            "WHERE i.name LIKE ? OR i.barcode LIKE ? OR c.name LIKE ? LIMIT 20",
+            ("%detergnt%",) * 3).fetchall(), 20)
+
+        # a checkout bumps the catalog version; the next search applies the delta
+        client = app.test_client()
+        syncs = []
+        for n in range(20):
+            client.post("/sales/checkout", json={
+                "items": [{"barcode": f"{616100000000 + n}", "name": "", "price": 1, "qty": 1}],
+                "payment_method": "cash",
+            })
+            start = time.perf_counter()
+            search_index.sync()
+            syncs.append((time.perf_counter() - start) * 1000)
+        results["delta_sync_after_sale_ms"] = round(statistics.median(syncs), 3)
+        results["http_search"] = timed(lambda: client.get("/items/search?q=choclate"), 50)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_startup.py
+"""
+Worker startup: time to import the app and run create_app() in a fresh process.
+
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --root /path/to/older/checkout   # compare a baseline
+
+Every gunicorn worker (and every restart on deploy) pays this before serving
+its first request. Each run is a new interpreter against an already
+migrated throwaway database, once with AUTO_CREATE_SCHEMA=1 (create_all +
+rollup/ledger checks at boot) and once with AUTO_CREATE_SCHEMA=0 (schema
+left to `flask db upgrade`). Also lists the slowest
+top-level imports from `python -X importtime` and which heavy optional
+dependencies were loaded by the time create_app() returned.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# only needed on first use: printing, Daraja / till sync, migrations, the job scheduler
+HEAVY = ["escpos", "requests", "alembic", "flask_migrate", "apscheduler"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_app_ms": (done - imported) * 1000,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+
+def run(root, env, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, "-c", PROBE], cwd=root, env=env,
+        capture_output=True, text=True, check=True,
+    )
+
+
+def slowest_imports(stderr, top):
+    """Imports done by create_app() and by `import app` itself, slowest first, from -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        # depth 0: imported at top level (create_app's imports); depth 1: imported by a top-level import
+        if depth <= 1 and name.strip() != "app":
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return [{"module": name, "ms": round(ms, 1)} for ms, name in sorted(rows, reverse=True)[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--root", default=ROOT, help="checkout to measure (default: this one)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-bench-")
+    env = dict(
+        os.environ,
+        PYTHONPATH=args.root,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        SCHEDULER_ENABLED="0",
+    )
+    # build the schema and warm the bytecode caches; nothing below is a cold start
+    run(args.root, dict(env, AUTO_CREATE_SCHEMA="1"))
+
+    results = {"root": args.root, "runs": args.runs}
+    for mode in ("1", "0"):
+        mode_env = dict(env, AUTO_CREATE_SCHEMA=mode)
+        samples = [json.loads(run(args.root, mode_env).stdout.splitlines()[-1]) for _ in range(args.runs)]
+        imports = [s["import_ms"] for s in samples]
+        creates = [s["create_app_ms"] for s in samples]
+        results[f"AUTO_CREATE_SCHEMA={mode}"] = {
+            "import_ms_p50": round(statistics.median(imports), 1),
+            "create_app_ms_p50": round(statistics.median(creates), 1),
+            "total_ms_p50": round(statistics.median(i + c for i, c in zip(imports, creates)), 1),
+            "heavy_modules_loaded": samples[-1]["loaded"],
+        }
+
+    profile = run(args.root, dict(env, AUTO_CREATE_SCHEMA="0"), "-X", "importtime")
+    results["slowest_imports"] = slowest_imports(profile.stderr, args.top)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
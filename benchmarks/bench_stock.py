@@ -0,0 +1,134 @@
+# benchmarks/bench_stock.py
+"""
+Stock ledger reads: snapshot + replay vs. summing the whole history.
+
+    python -m benchmarks.bench_stock --movements 1000000
+
+Seeds a throwaway SQLite file with --items items and --movements stock
+movements spread over --days days, with a snapshot run at the end of
+every day (what the daily snapshot job leaves behind), then times:
+
+  quantity_at      one item's stock at a random past moment
+  levels_at        every item's stock at the end of a random past day
+  full_history     the same as levels_at by summing all earlier movements
+  snapshot_run     take_snapshots() after a day of trading
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+START = datetime(2025, 1, 1)
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 2), "p99_ms": round(samples[int(len(samples) * 0.99)], 2)}
+
+
+def seed(path, items, movements, days):
+    """Items, a day-ordered ledger and one snapshot run per day, written directly."""
+    rnd = random.Random(3)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO items (id, barcode, name, price, quantity, catalog_version) VALUES (?, ?, ?, 100, 0, 0)",
+                     [(n, f"{900000000000 + n}", f"Item {n}") for n in range(1, items + 1)])
+    per_day = movements // days
+    balance = [0] * (items + 1)
+    movement_id = 0
+    for day in range(days):
+        rows = []
+        moved = set()
+        for _ in range(per_day):
+            movement_id += 1
+            item_id = rnd.randint(1, items)
+            # mostly sales, a restock whenever an item runs low
+            quantity = rnd.randint(20, 60) if balance[item_id] < 5 else -rnd.randint(1, 3)
+            balance[item_id] += quantity
+            moved.add(item_id)
+            at = START + timedelta(days=day, seconds=rnd.randint(0, 86399))
+            rows.append((movement_id, item_id, "restock" if quantity > 0 else "sale", quantity, str(at)))
+        conn.executemany("INSERT INTO stock_movements (id, item_id, kind, quantity, occurred_at) VALUES (?, ?, ?, ?, ?)", rows)
+        taken_at = str(START + timedelta(days=day + 1))
+        conn.executemany(
+            "INSERT INTO stock_snapshots (item_id, movement_id, quantity, taken_at) VALUES (?, ?, ?, ?)",
+            [(item_id, movement_id, balance[item_id], taken_at) for item_id in moved],
+        )
+    conn.executemany("UPDATE items SET quantity = ? WHERE id = ?", [(balance[n], n) for n in range(1, items + 1)])
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--movements", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-bench-")
+    path = os.path.join(workdir, "bench.db")
+    os.environ.update({"DATABASE_URL": f"sqlite:///{path}", "BACKUP_INTERVAL_HOURS": "10000",
+                       "STOCK_SNAPSHOT_INTERVAL_HOURS": "0"})
+    from app import create_app
+    from models import db, StockMovement
+    from sqlalchemy import func
+    from utils.stock import quantity_at, stock_levels_at, take_snapshots, ledger_discrepancies
+
+    app = create_app()
+    started = time.perf_counter()
+    seed(path, args.items, args.movements, args.days)
+    results = {"items": args.items, "movements": args.movements, "days": args.days,
+               "seed_seconds": round(time.perf_counter() - started, 1)}
+
+    rnd = random.Random(5)
+
+    def some_day():
+        return START + timedelta(days=rnd.randint(1, args.days - 1), hours=rnd.randint(0, 23))
+
+    with app.app_context():
+        def full_history():
+            at = some_day()
+            return dict(
+                db.session.query(StockMovement.item_id, func.sum(StockMovement.quantity))
+                .filter(StockMovement.occurred_at < at).group_by(StockMovement.item_id)
+            )
+
+        results["quantity_at"] = timed(lambda: quantity_at(rnd.randint(1, args.items), some_day()), args.runs * 10)
+        results["levels_at"] = timed(lambda: stock_levels_at(some_day()), args.runs)
+        results["full_history"] = timed(full_history, max(5, args.runs // 5))
+
+        at = START + timedelta(days=args.days // 2, hours=12)
+        snap = stock_levels_at(at)
+        full = dict(db.session.query(StockMovement.item_id, func.sum(StockMovement.quantity))
+                    .filter(StockMovement.occurred_at < at).group_by(StockMovement.item_id))
+        results["levels_match_full_history"] = all(snap[k] == full.get(k, 0) for k in snap)
+        results["ledger_matches_items"] = not ledger_discrepancies()
+
+        # one more day of trading, then the job that follows it
+        client = app.test_client()
+        for _ in range(200):
+            client.post(f"/items/{rnd.randint(1, args.items)}/stock", json={"kind": "restock", "quantity": 5})
+        start = time.perf_counter()
+        written = take_snapshots()
+        results["snapshot_run"] = {"items": written, "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
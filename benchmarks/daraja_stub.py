@@ -0,0 +1,112 @@
+# benchmarks/daraja_stub.py
+"""
+Local stand-in for the Safaricom Daraja API.
+
+Implements just the endpoints FidPOS calls (OAuth token and STK push) and
+counts requests and TCP connections, so connection reuse and token caching
+can be checked without touching the sandbox:
+
+    python -m benchmarks.daraja_stub --port 8900
+    MPESA_BASE_URL=http://127.0.0.1:8900 python run.py
+"""
+import argparse
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class DarajaStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), token_ttl=3599, latency=0.0):
+        super().__init__(address, _Handler)
+        self.token_ttl = token_ttl
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.counts = {"oauth": 0, "stkpush": 0, "connections": 0, "unauthorized": 0}
+        self.tokens = set()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def bump(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def revoke_tokens(self):
+        with self.lock:
+            self.tokens.clear()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse sockets
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.bump("connections")
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        if not self.path.startswith("/oauth/v1/generate"):
+            return self._reply(404, {"error": "not found"})
+        self.server.bump("oauth")
+        token = uuid.uuid4().hex
+        with self.server.lock:
+            self.server.tokens.add(token)
+        self._reply(200, {"access_token": token, "expires_in": str(self.server.token_ttl)})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/mpesa/stkpush/v1/processrequest":
+            return self._reply(404, {"error": "not found"})
+
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        with self.server.lock:
+            valid = token in self.server.tokens
+        if not valid:
+            self.server.bump("unauthorized")
+            return self._reply(401, {"errorMessage": "Invalid Access Token"})
+
+        if self.server.latency:
+            threading.Event().wait(self.server.latency)
+        self.server.bump("stkpush")
+        self._reply(200, {
+            "MerchantRequestID": uuid.uuid4().hex[:12],
+            "CheckoutRequestID": f"ws_CO_{uuid.uuid4().hex[:16]}",
+            "ResponseCode": "0",
+            "ResponseDescription": "Success. Request accepted for processing",
+            "CustomerMessage": "Success. Request accepted for processing",
+            "AccountReference": payload.get("AccountReference"),
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Daraja stub")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+    stub = DarajaStub(("127.0.0.1", args.port))
+    print(f"Daraja stub listening on {stub.base_url}")
+    stub.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
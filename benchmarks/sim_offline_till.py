@@ -0,0 +1,192 @@
+# benchmarks/sim_offline_till.py
+"""
+Offline till on one machine: local journal -> sync -> central database, exactly once.
+
+    python -m benchmarks.sim_offline_till --sales 200
+
+Uses two SQLite files in a temp dir: the till's journal (TILL_MODE=1) and the
+central database, served by a second app process on localhost. The script
+rings up sales while the central server is down, starts it, waits for the
+sync worker to drain the journal, then re-uploads everything (lost acks) and
+races two concurrent uploads of the same batch. Exits non-zero if any sale
+is missing or recorded twice.
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+SERVER = (
+    "import sys; sys.path.insert(0, {root!r}); from app import create_app; "
+    "create_app().run(host='127.0.0.1', port={port}, threaded=True, use_reloader=False)"
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def central_counts(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(
+            "SELECT count(*), count(DISTINCT idempotency_key), coalesce(sum(total), 0) "
+            "FROM sale_transactions WHERE idempotency_key IS NOT NULL"
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sales", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="fidpos-till-")
+    central_db = os.path.join(workdir, "central.db")
+    journal_db = os.path.join(workdir, "till_journal.db")
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    # --- Till: journal mode, central server still down ---
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'till_local.db')}",
+        "TILL_MODE": "1",
+        "TILL_JOURNAL_PATH": journal_db,
+        "SYNC_SERVER_URL": base_url,
+        "SYNC_INTERVAL_SECONDS": "0.2",
+        "BACKUP_INTERVAL_HOURS": "10000",
+    })
+    from app import create_app
+    from utils.till_sync import till_sync
+
+    till = create_app().test_client()
+    latencies = []
+    expected_total = 0.0
+    for n in range(args.sales):
+        cart = [
+            {"barcode": "600000000001", "name": "Soda", "price": 50, "qty": 1 + n % 3},
+            {"barcode": "600000000002", "name": "Bread", "price": 60, "qty": 1},
+        ]
+        expected_total += sum(line["price"] * line["qty"] for line in cart)
+        start = time.perf_counter()
+        response = till.post("/sales/checkout", json={"items": cart, "payment_method": "cash"})
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200 and response.get_json()["status"] == "queued", response.data
+    latencies.sort()
+    offline = till.get("/sales/sync/status").get_json()
+
+    # --- Central server comes up (its own process and SQLite file) ---
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{central_db}", TILL_MODE="0")
+    server = subprocess.Popen(
+        [sys.executable, "-c", SERVER.format(root=ROOT, port=port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        def server_up():
+            try:
+                return requests.get(f"{base_url}/sales/sync/status", timeout=1).ok
+            except requests.RequestException:
+                return False
+
+        assert wait_for(server_up, 30), "central server did not start"
+        conn = sqlite3.connect(central_db)
+        conn.executemany(
+            "INSERT INTO items (barcode, name, price, quantity) VALUES (?, ?, ?, ?)",
+            [("600000000001", "Soda", 50, 5), ("600000000002", "Bread", 60, 5)],
+        )
+        conn.commit()
+        conn.close()
+
+        start = time.perf_counter()
+        till_sync._wake.set()
+        drained = wait_for(lambda: till_sync.journal.stats()["pending"] == 0, 60)
+        drain_seconds = round(time.perf_counter() - start, 2)
+        after_sync = central_counts(central_db)
+
+        # --- Lost acks: the till uploads the whole journal again ---
+        conn = sqlite3.connect(journal_db)
+        entries = [json.loads(row[0]) for row in conn.execute("SELECT payload FROM journal ORDER BY seq")]
+        conn.close()
+        replay = []
+        for i in range(0, len(entries), 50):
+            response = requests.post(f"{base_url}/sales/sync", json={"sales": entries[i:i + 50]}, timeout=30)
+            replay.extend(r["status"] for r in response.json()["results"])
+        after_replay = central_counts(central_db)
+
+        # --- Two uploads of the same new batch racing each other ---
+        batch = [
+            {"key": uuid.uuid4().hex, "sold_at": None, "payment_method": "cash",
+             "items": [{"barcode": "600000000001", "name": "Soda", "price": 50, "qty": 1}]}
+            for _ in range(20)
+        ]
+        race = []
+
+        def upload():
+            response = requests.post(f"{base_url}/sales/sync", json={"sales": batch}, timeout=30)
+            race.extend(r["status"] for r in response.json()["results"])
+
+        threads = [threading.Thread(target=upload) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        after_race = central_counts(central_db)
+
+        conn = sqlite3.connect(central_db)
+        stock = dict(conn.execute("SELECT barcode, quantity FROM items").fetchall())
+        conn.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+    ok = (
+        drained
+        and after_sync[0] == after_sync[1] == args.sales
+        and abs(after_sync[2] - expected_total) < 0.01
+        and after_replay == after_sync
+        and set(replay) == {"duplicate"}
+        and after_race[0] == after_race[1] == args.sales + len(batch)
+        and race.count("created") == len(batch)
+    )
+    print(json.dumps({
+        "sales": args.sales,
+        "offline_checkout_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "offline_checkout_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        "pending_while_offline": offline["pending"],
+        "drain_seconds": drain_seconds,
+        "central_after_sync": {"transactions": after_sync[0], "revenue": after_sync[2]},
+        "replay_statuses": {s: replay.count(s) for s in set(replay)},
+        "race_statuses": {s: race.count(s) for s in set(race)},
+        "central_after_race": after_race[0],
+        "central_stock": stock,
+        "ok": ok,
+    }, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""baseline schema
+
+Until now the schema was only ever created by db.create_all(), so this
+revision creates each table only when it is missing. Databases that were
+built by create_all() upgrade through it without changes.
+
+Revision ID: 0001_baseline_schema
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('categories'):
+        op.create_table(
+            'categories',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name'),
+        )
+
+    if not _has_table('sale_transactions'):
+        op.create_table(
+            'sale_transactions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('total', sa.Float(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('paymenyt_method', sa.String(length=20), nullable=True),
+            sa.Column('paid_at', sa.DateTime(), nullable=True),
+            sa.Column('sold_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if not _has_table('items'):
+        op.create_table(
+            'items',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('barcode', sa.String(length=100), nullable=False),
+            sa.Column('name', sa.String(length=200), nullable=False),
+            sa.Column('price', sa.Float(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=True),
+            sa.Column('category_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('barcode'),
+        )
+
+    if not _has_table('sales'):
+        op.create_table(
+            'sales',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('transaction_id', sa.Integer(), nullable=True),
+            sa.Column('barcode', sa.String(length=100), nullable=False),
+            sa.Column('item_name', sa.String(length=200), nullable=False),
+            sa.Column('price', sa.Float(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=True),
+            sa.Column('total', sa.Float(), nullable=False),
+            sa.Column('sold_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['transaction_id'], ['sale_transactions.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if not _has_table('sales_summary'):
+        op.create_table(
+            'sales_summary',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('sale_count', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+
+def downgrade():
+    op.drop_table('sales_summary')
+    op.drop_table('sales')
+    op.drop_table('items')
+    op.drop_table('sale_transactions')
+    op.drop_table('categories')
@@ -0,0 +1,43 @@
+"""indexes for report and checkout queries
+
+- sales(sold_at, id): date-range reports and keyset paging, which order by
+  sold_at DESC, id DESC
+- sales(transaction_id): SaleTransaction.items and receipts
+- sales(barcode, sold_at): per-item sales history
+- items(category_id): category listings and joins
+- sale_transactions(status, sold_at): pending/paid lookups by date
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_baseline_schema
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_hot_query_indexes'
+down_revision = '0001_baseline_schema'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_sales_sold_at_id', 'sales', ['sold_at', 'id']),
+    ('ix_sales_transaction_id', 'sales', ['transaction_id']),
+    ('ix_sales_barcode_sold_at', 'sales', ['barcode', 'sold_at']),
+    ('ix_items_category_id', 'items', ['category_id']),
+    ('ix_sale_transactions_status_sold_at', 'sale_transactions', ['status', 'sold_at']),
+]
+
+
+def upgrade():
+    # create_all() may already have built these on a fresh database
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+    op.execute('ANALYZE')
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
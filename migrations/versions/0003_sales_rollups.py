@@ -0,0 +1,97 @@
+"""sales rollup tables (daily, hourly, per item daily/monthly, per category)
+
+The upgrade backfills them from existing sales, as utils.rollups.ensure_rollups
+does for databases built by create_all(); `flask backfill-rollups` rebuilds
+them at any time.
+
+Revision ID: 0003_sales_rollups
+Revises: 0002_hot_query_indexes
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_sales_rollups'
+down_revision = '0002_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+COUNTERS = [
+    ('sale_count', sa.Integer()),
+    ('quantity', sa.Integer()),
+    ('revenue', sa.Float()),
+]
+
+TABLES = [
+    ('sales_daily', [sa.Column('day', sa.Date(), nullable=False)], ['day']),
+    ('sales_hourly', [
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('hour', sa.Integer(), autoincrement=False, nullable=False),
+    ], ['day', 'hour']),
+    ('item_sales_daily', [
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('barcode', sa.String(length=100), nullable=False),
+        sa.Column('item_name', sa.String(length=200), nullable=False),
+    ], ['day', 'barcode']),
+    ('item_sales_monthly', [
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('barcode', sa.String(length=100), nullable=False),
+        sa.Column('item_name', sa.String(length=200), nullable=False),
+    ], ['month', 'barcode']),
+    ('category_sales_daily', [
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=False),
+    ], ['day', 'category_id']),
+]
+
+# utils.rollups.rebuild_rollups() as SQLite SQL: sales bucketed by their stored
+# (EAT) time, categories from each item's current category (0: uncategorised)
+DAY = "date(sales.sold_at)"
+COUNTS = "count(sales.id), coalesce(sum(sales.quantity), 0), sum(sales.total)"
+BACKFILL = [
+    f"INSERT INTO sales_daily (day, sale_count, quantity, revenue) "
+    f"SELECT {DAY}, {COUNTS} FROM sales WHERE sales.sold_at IS NOT NULL GROUP BY 1",
+    f"INSERT INTO sales_hourly (day, hour, sale_count, quantity, revenue) "
+    f"SELECT {DAY}, CAST(strftime('%H', sales.sold_at) AS INTEGER), {COUNTS} "
+    f"FROM sales WHERE sales.sold_at IS NOT NULL GROUP BY 1, 2",
+    f"INSERT INTO item_sales_daily (day, barcode, item_name, sale_count, quantity, revenue) "
+    f"SELECT {DAY}, sales.barcode, max(sales.item_name), {COUNTS} "
+    f"FROM sales WHERE sales.sold_at IS NOT NULL GROUP BY 1, 2",
+    f"INSERT INTO item_sales_monthly (month, barcode, item_name, sale_count, quantity, revenue) "
+    f"SELECT substr({DAY}, 1, 7), sales.barcode, max(sales.item_name), {COUNTS} "
+    f"FROM sales WHERE sales.sold_at IS NOT NULL GROUP BY 1, 2",
+    f"INSERT INTO category_sales_daily (day, category_id, sale_count, quantity, revenue) "
+    f"SELECT {DAY}, coalesce(items.category_id, 0), {COUNTS} "
+    f"FROM sales LEFT OUTER JOIN items ON items.barcode = sales.barcode "
+    f"WHERE sales.sold_at IS NOT NULL GROUP BY 1, 2",
+]
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    for name, keys, primary_key in TABLES:
+        if _has_table(name):
+            continue
+        op.create_table(
+            name,
+            *keys,
+            *[sa.Column(column, type_, nullable=False) for column, type_ in COUNTERS],
+            sa.PrimaryKeyConstraint(*primary_key),
+        )
+
+    # backfill from existing sales; skipped if the app already did
+    if op.get_bind().execute(sa.text('SELECT 1 FROM sales_daily LIMIT 1')).first() is None:
+        for statement in BACKFILL:
+            op.execute(statement)
+
+
+def downgrade():
+    for name, _, _ in reversed(TABLES):
+        if _has_table(name):
+            op.drop_table(name)
@@ -0,0 +1,36 @@
+"""idempotency key on sale_transactions for offline till sync
+
+Revision ID: 0004_sale_idempotency_key
+Revises: 0003_sales_rollups
+Create Date: 2026-10-17 15:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_sale_idempotency_key'
+down_revision = '0003_sales_rollups'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # create_all() may already have added it on a fresh database
+    if not _has_column('sale_transactions', 'idempotency_key'):
+        with op.batch_alter_table('sale_transactions') as batch_op:
+            batch_op.add_column(sa.Column('idempotency_key', sa.String(length=64), nullable=True))
+    op.create_index('ix_sale_transactions_idempotency_key', 'sale_transactions', ['idempotency_key'],
+                    unique=True, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_sale_transactions_idempotency_key', table_name='sale_transactions', if_exists=True)
+    if _has_column('sale_transactions', 'idempotency_key'):
+        with op.batch_alter_table('sale_transactions') as batch_op:
+            batch_op.drop_column('idempotency_key')
@@ -0,0 +1,65 @@
+"""catalog versioning for the POS catalog snapshot and deltas
+
+- items.catalog_version: version of the item's last change
+- catalog_state: single-row version counter
+- catalog_tombstones: deleted items, for deltas
+
+Revision ID: 0005_catalog_versions
+Revises: 0004_sale_idempotency_key
+Create Date: 2026-10-17 17:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_catalog_versions'
+down_revision = '0004_sale_idempotency_key'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _has_column(table, column):
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # create_all() may already have built these on a fresh database
+    if not _has_column('items', 'catalog_version'):
+        with op.batch_alter_table('items') as batch_op:
+            batch_op.add_column(sa.Column('catalog_version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_items_catalog_version', 'items', ['catalog_version'], unique=False, if_not_exists=True)
+
+    if not _has_table('catalog_state'):
+        op.create_table(
+            'catalog_state',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if not _has_table('catalog_tombstones'):
+        op.create_table(
+            'catalog_tombstones',
+            sa.Column('item_id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('barcode', sa.String(length=100), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('item_id'),
+        )
+    op.create_index('ix_catalog_tombstones_version', 'catalog_tombstones', ['version'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_catalog_tombstones_version', table_name='catalog_tombstones', if_exists=True)
+    for name in ('catalog_tombstones', 'catalog_state'):
+        if _has_table(name):
+            op.drop_table(name)
+    op.drop_index('ix_items_catalog_version', table_name='items', if_exists=True)
+    if _has_column('items', 'catalog_version'):
+        with op.batch_alter_table('items') as batch_op:
+            batch_op.drop_column('catalog_version')
@@ -0,0 +1,74 @@
+"""stock ledger: append-only stock movements and periodic per-item snapshots
+
+The upgrade opens the ledger with one `opening` movement per stocked item,
+as utils.stock.ensure_stock_ledger does for databases built by create_all().
+
+Revision ID: 0006_stock_ledger
+Revises: 0005_catalog_versions
+Create Date: 2026-10-17 21:10:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import pytz
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_stock_ledger'
+down_revision = '0005_catalog_versions'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # create_all() may already have built these on a fresh database
+    if not _has_table('stock_movements'):
+        op.create_table(
+            'stock_movements',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('item_id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('reference', sa.String(length=100), nullable=True),
+            sa.Column('occurred_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    op.create_index('ix_stock_movements_item_id', 'stock_movements', ['item_id'], unique=False,
+                    if_not_exists=True)
+    op.create_index('ix_stock_movements_item_occurred', 'stock_movements', ['item_id', 'occurred_at'],
+                    unique=False, if_not_exists=True)
+
+    if not _has_table('stock_snapshots'):
+        op.create_table(
+            'stock_snapshots',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('item_id', sa.Integer(), nullable=False),
+            sa.Column('movement_id', sa.Integer(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('taken_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('item_id', 'movement_id', name='uq_stock_snapshots_item_movement'),
+        )
+    op.create_index('ix_stock_snapshots_taken_at', 'stock_snapshots', ['taken_at'], unique=False,
+                    if_not_exists=True)
+    op.create_index('ix_stock_snapshots_item_taken', 'stock_snapshots', ['item_id', 'taken_at'], unique=False,
+                    if_not_exists=True)
+
+    # open the ledger with the current stock; a no-op if the app already did
+    op.execute(sa.text(
+        "INSERT INTO stock_movements (item_id, kind, quantity, reference, occurred_at) "
+        "SELECT id, 'opening', quantity, 'ledger start', :now FROM items "
+        "WHERE quantity != 0 AND NOT EXISTS (SELECT 1 FROM stock_movements)"
+    ).bindparams(now=datetime.now(pytz.timezone("Africa/Nairobi")).replace(tzinfo=None)))
+
+
+def downgrade():
+    for name in ('stock_snapshots', 'stock_movements'):
+        if _has_table(name):
+            op.drop_table(name)
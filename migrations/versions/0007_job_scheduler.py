@@ -0,0 +1,60 @@
+"""leader-elected job scheduler: leader lease, job due times and run history
+
+Revision ID: 0007_job_scheduler
+Revises: 0006_stock_ledger
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_job_scheduler'
+down_revision = '0006_stock_ledger'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # create_all() may already have built these on a fresh database
+    if not _has_table('scheduler_leases'):
+        op.create_table(
+            'scheduler_leases',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('owner', sa.String(length=100), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('name'),
+        )
+    if not _has_table('scheduled_jobs'):
+        op.create_table(
+            'scheduled_jobs',
+            sa.Column('id', sa.String(length=50), nullable=False),
+            sa.Column('next_run_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    if not _has_table('job_runs'):
+        op.create_table(
+            'job_runs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('job_id', sa.String(length=50), nullable=False),
+            sa.Column('owner', sa.String(length=100), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=False),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.Column('seconds', sa.Float(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('error', sa.String(length=500), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    op.create_index('ix_job_runs_job_id_started_at', 'job_runs', ['job_id', 'started_at'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    for name in ('job_runs', 'scheduled_jobs', 'scheduler_leases'):
+        if _has_table(name):
+            op.drop_table(name)
@@ -0,0 +1,62 @@
+"""M-Pesa callback inbox and the sale's STK CheckoutRequestID
+
+Revision ID: 0008_mpesa_callback_inbox
+Revises: 0007_job_scheduler
+Create Date: 2026-10-18 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_mpesa_callback_inbox'
+down_revision = '0007_job_scheduler'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _has_column(table, column):
+    return column in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if not _has_column('sale_transactions', 'checkout_request_id'):
+        with op.batch_alter_table('sale_transactions') as batch_op:
+            batch_op.add_column(sa.Column('checkout_request_id', sa.String(length=64), nullable=True))
+    op.create_index('ix_sale_transactions_checkout_request_id', 'sale_transactions', ['checkout_request_id'],
+                    unique=True, if_not_exists=True)
+
+    # create_all() may already have built this on a fresh database
+    if not _has_table('mpesa_callbacks'):
+        op.create_table(
+            'mpesa_callbacks',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('checkout_request_id', sa.String(length=64), nullable=False),
+            sa.Column('result_code', sa.Integer(), nullable=True),
+            sa.Column('result_desc', sa.String(length=255), nullable=True),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('received_at', sa.DateTime(), nullable=False),
+            sa.Column('processed_at', sa.DateTime(), nullable=True),
+            sa.Column('sale_id', sa.Integer(), nullable=True),
+            sa.Column('amount', sa.Float(), nullable=True),
+            sa.Column('receipt_number', sa.String(length=32), nullable=True),
+            sa.Column('phone', sa.String(length=20), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('checkout_request_id'),
+        )
+    op.create_index('ix_mpesa_callbacks_processed_at', 'mpesa_callbacks', ['processed_at'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    if _has_table('mpesa_callbacks'):
+        op.drop_table('mpesa_callbacks')
+    op.drop_index('ix_sale_transactions_checkout_request_id', table_name='sale_transactions', if_exists=True)
+    if _has_column('sale_transactions', 'checkout_request_id'):
+        with op.batch_alter_table('sale_transactions') as batch_op:
+            batch_op.drop_column('checkout_request_id')
@@ -0,0 +1,39 @@
+"""receipts rendered at checkout: gzipped HTML and ESC/POS bytes per transaction
+
+Revision ID: 0009_receipts
+Revises: 0008_mpesa_callback_inbox
+Create Date: 2026-10-18 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_receipts'
+down_revision = '0008_mpesa_callback_inbox'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    # create_all() may already have built this on a fresh database;
+    # older sales get their receipt rendered on first view
+    if not _has_table('receipts'):
+        op.create_table(
+            'receipts',
+            sa.Column('transaction_id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('html', sa.LargeBinary(), nullable=False),
+            sa.Column('escpos', sa.LargeBinary(), nullable=False),
+            sa.Column('rendered_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('transaction_id'),
+        )
+
+
+def downgrade():
+    if _has_table('receipts'):
+        op.drop_table('receipts')
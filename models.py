@@ -24,16 +24,24 @@ class Item(db.Model):
     name = db.Column(db.String(200), nullable=False)
     price = db.Column(db.Float, nullable=False)
     quantity = db.Column(db.Integer, default=0)
-    category_id = db.Column(db.Integer, db.ForeignKey("categories.id"), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey("categories.id"), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(EAT))
+    # catalog version of the last change (see utils.catalog)
+    catalog_version = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
 
     def __repr__(self):
         return f"<Item {self.name} - {self.barcode}>"
 
 class Sale(db.Model):
     __tablename__ = "sales"
+    __table_args__ = (
+        # date-range filters + keyset paging ORDER BY sold_at DESC, id DESC
+        db.Index("ix_sales_sold_at_id", "sold_at", "id"),
+        # per-item sales history
+        db.Index("ix_sales_barcode_sold_at", "barcode", "sold_at"),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    transaction_id = db.Column(db.Integer, db.ForeignKey("sale_transactions.id"))
+    transaction_id = db.Column(db.Integer, db.ForeignKey("sale_transactions.id"), index=True)
     barcode = db.Column(db.String(100), nullable=False)
     item_name = db.Column(db.String(200), nullable=False)
     price = db.Column(db.Float, nullable=False)
@@ -47,15 +55,192 @@ class Sale(db.Model):
 
 class SaleTransaction(db.Model):
     __tablename__ = "sale_transactions"
+    __table_args__ = (
+        db.Index("ix_sale_transactions_status_sold_at", "status", "sold_at"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     total = db.Column(db.Float, default=0)
     status = db.Column(db.String(20), default="pending")
     paymenyt_method = db.Column(db.String(20))
     paid_at = db.Column(db.DateTime)
     sold_at = db.Column(db.DateTime, default=lambda: datetime.now(EAT))
+    # set by tills syncing offline sales, so a re-uploaded sale is recorded once
+    idempotency_key = db.Column(db.String(64), unique=True, index=True)
+    # Daraja CheckoutRequestID of the latest STK push, so its callback finds the sale
+    checkout_request_id = db.Column(db.String(64), unique=True, index=True)
 
     # Relationship to Sale items
     items = db.relationship("Sale", backref="transaction", lazy=True)
     def __repr__(self):
         return f"<SaleTransaction {self.id} - Total: {self.total}>" 
-    
\ No newline at end of file
+    
+
+class Receipt(db.Model):
+    """A transaction's receipt, rendered at checkout by utils.receipts and stored gzipped."""
+    __tablename__ = "receipts"
+    transaction_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    html = db.Column(db.LargeBinary, nullable=False)
+    escpos = db.Column(db.LargeBinary, nullable=False)
+    rendered_at = db.Column(db.DateTime, nullable=False)
+
+
+class MpesaCallback(db.Model):
+    """Inbox of Daraja STK callbacks: stored on receipt, applied by utils.mpesa_inbox."""
+    __tablename__ = "mpesa_callbacks"
+    id = db.Column(db.Integer, primary_key=True)
+    # unique: Daraja retries of the same callback are dropped on insert
+    checkout_request_id = db.Column(db.String(64), unique=True, nullable=False)
+    result_code = db.Column(db.Integer)
+    result_desc = db.Column(db.String(255))
+    payload = db.Column(db.Text, nullable=False)
+    received_at = db.Column(db.DateTime, nullable=False)
+    processed_at = db.Column(db.DateTime, index=True)
+    # filled in when processed, from CallbackMetadata
+    sale_id = db.Column(db.Integer)
+    amount = db.Column(db.Float)
+    receipt_number = db.Column(db.String(32))
+    phone = db.Column(db.String(20))
+
+
+class SalesSummary(db.Model):
+    """Single-row running totals, kept up to date by the sale routes."""
+    __tablename__ = "sales_summary"
+    id = db.Column(db.Integer, primary_key=True)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(EAT))
+
+    def __repr__(self):
+        return f"<SalesSummary {self.sale_count} sales - {self.revenue}>"
+
+
+class CatalogState(db.Model):
+    """Single-row counter; every item/category change takes the next version."""
+    __tablename__ = "catalog_state"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CatalogTombstone(db.Model):
+    """Deleted items, so catalog deltas can tell clients to drop them."""
+    __tablename__ = "catalog_tombstones"
+    item_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    barcode = db.Column(db.String(100), nullable=False)
+    version = db.Column(db.Integer, nullable=False, index=True)
+
+
+# --- Stock ledger (appended to by every stock change, see utils.stock) ---
+
+class StockMovement(db.Model):
+    """One signed change to an item's stock; rows are only ever appended."""
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        # per-item history by time + keyset paging
+        db.Index("ix_stock_movements_item_occurred", "item_id", "occurred_at"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    # no foreign key: the history outlives deleted items
+    item_id = db.Column(db.Integer, nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # opening, sale, restock, adjustment, return
+    quantity = db.Column(db.Integer, nullable=False)
+    reference = db.Column(db.String(100))  # e.g. sale_transaction:42
+    occurred_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(EAT))
+
+    def __repr__(self):
+        return f"<StockMovement {self.kind} {self.quantity:+d} item {self.item_id}>"
+
+
+class StockSnapshot(db.Model):
+    """An item's stock once the ledger up to `movement_id` is applied."""
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (
+        db.UniqueConstraint("item_id", "movement_id", name="uq_stock_snapshots_item_movement"),
+        # an item's last snapshot before a point in time
+        db.Index("ix_stock_snapshots_item_taken", "item_id", "taken_at"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, nullable=False)
+    movement_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    taken_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(EAT), index=True)
+
+
+# --- Background jobs (utils.scheduler) ---
+
+class SchedulerLease(db.Model):
+    """Leader lease: the worker named in `owner` runs the jobs until `expires_at`."""
+    __tablename__ = "scheduler_leases"
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class ScheduledJob(db.Model):
+    """When each job is next due; a run is claimed by moving next_run_at forward."""
+    __tablename__ = "scheduled_jobs"
+    id = db.Column(db.String(50), primary_key=True)
+    next_run_at = db.Column(db.DateTime, nullable=False)
+
+
+class JobRun(db.Model):
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        db.Index("ix_job_runs_job_id_started_at", "job_id", "started_at"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(50), nullable=False)
+    owner = db.Column(db.String(100), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    seconds = db.Column(db.Float)
+    status = db.Column(db.String(20), nullable=False, default="running")  # running, ok, failed
+    error = db.Column(db.String(500))
+
+
+# --- Sales rollups (kept up to date by utils.rollups.record_rollups) ---
+
+class SalesDaily(db.Model):
+    __tablename__ = "sales_daily"
+    day = db.Column(db.Date, primary_key=True)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class SalesHourly(db.Model):
+    __tablename__ = "sales_hourly"
+    day = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0-23, EAT
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class ItemSalesDaily(db.Model):
+    __tablename__ = "item_sales_daily"
+    day = db.Column(db.Date, primary_key=True)
+    barcode = db.Column(db.String(100), primary_key=True)
+    item_name = db.Column(db.String(200), nullable=False)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class ItemSalesMonthly(db.Model):
+    """Per-item totals per month, so multi-year top-seller reports read ~12 rows per item a year."""
+    __tablename__ = "item_sales_monthly"
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    barcode = db.Column(db.String(100), primary_key=True)
+    item_name = db.Column(db.String(200), nullable=False)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class CategorySalesDaily(db.Model):
+    __tablename__ = "category_sales_daily"
+    day = db.Column(db.Date, primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 = uncategorised
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
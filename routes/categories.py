@@ -1,6 +1,8 @@
 # routes/categories.py
 from flask import Blueprint, jsonify, request, render_template
 from models import db, Category
+from utils.cache import item_cache
+from utils.catalog import next_catalog_version
 
 categories_bp = Blueprint("categories", __name__, url_prefix="/categories")
 
@@ -45,7 +47,9 @@ def update_category(id):
         return jsonify({"error": "Category not found"}), 404
 
     cat.name = name
+    next_catalog_version()  # category names ship with the catalog
     db.session.commit()
+    item_cache.clear()
     return jsonify({"message": "Category updated successfully"})
 
 # 🗑️ Delete category
@@ -56,5 +60,7 @@ def delete_category(id):
         return jsonify({"error": "Category not found"}), 404
 
     db.session.delete(cat)
+    next_catalog_version()
     db.session.commit()
+    item_cache.clear()
     return jsonify({"message": f"Category '{cat.name}' deleted"})
@@ -1,7 +1,16 @@
-from flask import Blueprint, request, jsonify, render_template
-from models import db, Item, Category, Sale
+from flask import Blueprint, request, jsonify, render_template, Response
+import gzip
+import json
+from models import db, Item, Category, Sale, StockMovement
 from utils.helpers import format_currency
-from datetime import datetime
+from utils.cache import item_cache
+from utils.catalog import catalog_snapshot, catalog_delta, next_catalog_version, record_deletion
+from utils.search import search_index
+from utils.importer import import_items, read_csv, read_json
+from utils.stock import record_counts, record_movements, quantity_at
+from utils.pagination import parse_limit, keyset_page
+from sqlalchemy import update
+from datetime import datetime, timedelta
 
 items_bp = Blueprint("items", __name__, url_prefix="/items")
 
@@ -9,17 +18,22 @@ items_bp = Blueprint("items", __name__, url_prefix="/items")
 # 🧾 List all items
 @items_bp.route("/", methods=["GET"])
 def list_items():
-    items = Item.query.all()
+    # plain columns with the category joined in: one query, no Item objects
+    rows = (
+        db.session.query(Item.id, Item.barcode, Item.name, Category.name, Item.price, Item.quantity)
+        .outerjoin(Category, Item.category_id == Category.id)
+        .order_by(Item.id)
+    )
     data = [
         {
-            "id": i.id,
-            "barcode": i.barcode,
-            "name": i.name,
-            "category": i.category.name if i.category else "Uncategorized",
-            "price": format_currency(i.price),
-            "quantity": i.quantity
+            "id": item_id,
+            "barcode": barcode,
+            "name": name,
+            "category": category or "Uncategorized",
+            "price": format_currency(price),
+            "quantity": quantity
         }
-        for i in items
+        for item_id, barcode, name, category, price, quantity in rows
     ]
     return jsonify(data), 200
 
@@ -46,14 +60,49 @@ def add_item():
         name=name,
         category_id=category_id,
         price=price,
-        quantity=quantity
+        quantity=quantity,
+        catalog_version=next_catalog_version()
     )
     db.session.add(item)
+    db.session.flush()
+    record_movements("opening", [(item.id, quantity)], reference="item created")
     db.session.commit()
+    item_cache.invalidate(barcode)
 
     return jsonify({"message": "Item added successfully", "item_id": item.id}), 201
 
 
+# 📥 Bulk add / update items from a CSV or JSON price list (matched on barcode)
+@items_bp.route("/import", methods=["POST"])
+def import_items_route():
+    upload = request.files.get("file")
+    try:
+        if upload:
+            if upload.filename.lower().endswith(".json") or upload.mimetype == "application/json":
+                rows = read_json(json.load(upload.stream))
+            else:
+                rows = read_csv(upload.stream)
+        elif request.is_json:
+            rows = read_json(request.get_json(silent=True))
+        elif request.mimetype in ("text/csv", "text/plain"):
+            rows = read_csv(request.stream)
+        else:
+            return jsonify({"error": "Send a CSV or JSON file (multipart 'file', text/csv or application/json)"}), 400
+
+        summary = import_items(
+            rows,
+            stock=request.args.get("stock", "set"),
+            create_categories=request.args.get("create_categories", "1") == "1",
+            dry_run=request.args.get("dry_run") == "1",
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if summary.get("aborted") and not (summary["inserted"] or summary["updated"]):
+        return jsonify(dict(summary, error=summary["aborted"])), 400
+    return jsonify(summary), 200
+
+
 # ✏️ Update item
 @items_bp.route("/update/<int:item_id>", methods=["PUT", "POST"])
 def update_item(item_id):
@@ -62,15 +111,23 @@ def update_item(item_id):
         return jsonify({"error": "Item not found"}), 404
 
     data = request.get_json() or request.form
+    old_barcode = item.barcode
     item.name = data.get("name", item.name)
     item.barcode = data.get("barcode", item.barcode)
     item.price = float(data.get("price", item.price))
-    item.quantity = int(data.get("quantity", item.quantity))
+    if "quantity" in data:
+        # a stock count: the adjustment is taken from the row as it is now,
+        # not from `item`, which a sale may have changed since it was read
+        quantity = int(data["quantity"])
+        record_counts([(item.id, quantity)], reference="item update")
+        db.session.execute(update(Item).where(Item.id == item.id).values(quantity=quantity))
     category_id = data.get("category_id")
     if category_id:
         item.category_id = category_id
+    item.catalog_version = next_catalog_version()
 
     db.session.commit()
+    item_cache.invalidate(old_barcode, item.barcode)
     return jsonify({"message": "Item updated successfully"}), 200
 
 
@@ -81,28 +138,150 @@ def delete_item(item_id):
     if not item:
         return jsonify({"error": "Item not found"}), 404
 
+    barcode = item.barcode
+    record_deletion(item)
+    record_movements("adjustment", [(item.id, -(item.quantity or 0))], reference="item deleted")
     db.session.delete(item)
     db.session.commit()
+    item_cache.invalidate(barcode)
     return jsonify({"message": "Item deleted successfully"}), 200
 
 
+# 📦 Restock, customer return or stock adjustment
+@items_bp.route("/<int:item_id>/stock", methods=["POST"])
+def move_stock(item_id):
+    data = request.get_json() or request.form
+    kind = data.get("kind", "restock")
+    try:
+        quantity = int(data.get("quantity", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "quantity must be a whole number"}), 400
+    if kind not in ("restock", "return", "adjustment"):
+        return jsonify({"error": "kind must be restock, return or adjustment"}), 400
+    if quantity == 0 or (kind != "adjustment" and quantity < 0):
+        return jsonify({"error": "quantity must be positive (adjustments: non-zero)"}), 400
+
+    barcode = db.session.query(Item.barcode).filter(Item.id == item_id).scalar()
+    if barcode is None:
+        return jsonify({"error": "Item not found"}), 404
+
+    # relative update, so a sale landing at the same time is not lost
+    stmt = update(Item).where(Item.id == item_id)
+    if quantity < 0:
+        stmt = stmt.where(Item.quantity >= -quantity)
+    updated = db.session.execute(
+        stmt.values(quantity=Item.quantity + quantity, catalog_version=next_catalog_version())
+    ).rowcount
+    if not updated:
+        db.session.rollback()
+        return jsonify({"error": "Adjustment would make stock negative"}), 400
+    record_movements(kind, [(item_id, quantity)], reference=data.get("reference") or None)
+    db.session.commit()
+    item_cache.invalidate(barcode)
+
+    new_quantity = db.session.query(Item.quantity).filter(Item.id == item_id).scalar()
+    return jsonify({"item_id": item_id, "kind": kind, "quantity": quantity, "stock": new_quantity}), 200
+
+
+# 📒 Stock movements of one item (?start=&end= YYYY-MM-DD, newest first, keyset paged)
+@items_bp.route("/<int:item_id>/stock", methods=["GET"])
+def stock_history(item_id):
+    try:
+        start = datetime.strptime(request.args["start"], "%Y-%m-%d") if request.args.get("start") else None
+        end = datetime.strptime(request.args["end"], "%Y-%m-%d") + timedelta(days=1) if request.args.get("end") else None
+    except ValueError:
+        return jsonify({"error": "start/end must be YYYY-MM-DD"}), 400
+
+    query = db.session.query(
+        StockMovement.id, StockMovement.kind, StockMovement.quantity,
+        StockMovement.reference, StockMovement.occurred_at
+    ).filter(StockMovement.item_id == item_id)
+    if start:
+        query = query.filter(StockMovement.occurred_at >= start)
+    if end:
+        query = query.filter(StockMovement.occurred_at < end)
+    try:
+        rows, next_cursor = keyset_page(
+            query, StockMovement.occurred_at, StockMovement.id,
+            request.args.get("cursor"), parse_limit(request.args.get("limit"))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "item_id": item_id,
+        # balances either side of the range, from the nearest snapshot
+        "opening": quantity_at(item_id, start) if start else 0,
+        "closing": quantity_at(item_id, end),
+        "movements": [
+            {"id": row.id, "kind": row.kind, "quantity": row.quantity, "reference": row.reference,
+             "occurred_at": row.occurred_at.isoformat(" ", "seconds")}
+            for row in rows
+        ],
+        "next_cursor": next_cursor,
+    }), 200
+
+
 # 🔍 Lookup item by barcode
 @items_bp.route("/lookup/<barcode>", methods=["GET"])
 def lookup_item(barcode):
-    item = Item.query.filter_by(barcode=barcode).first()
+    item = item_cache.get(barcode)
     if not item:
         return jsonify({"error": "Item not found"}), 404
 
     return jsonify({
-        "id": item.id,
-        "barcode": item.barcode,
-        "name": item.name,
-        "category": item.category.name if item.category else "Uncategorized",
-        "price": item.price,
-        "quantity": item.quantity
+        "id": item["id"],
+        "barcode": item["barcode"],
+        "name": item["name"],
+        "category": item["category"] or "Uncategorized",
+        "price": item["price"],
+        "quantity": item["quantity"]
     }), 200
 
 
+# 🔎 Search items by name, barcode or category (prefix + typo tolerant)
+@items_bp.route("/search", methods=["GET"])
+def search_items():
+    query = request.args.get("q", "")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 50))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    return jsonify({"query": query, "results": search_index.search(query, limit)}), 200
+
+
+# 📦 Whole catalog as one gzipped, versioned snapshot (POS page)
+@items_bp.route("/catalog", methods=["GET"])
+def catalog():
+    snapshot = catalog_snapshot.get()
+    headers = {
+        "ETag": snapshot["etag"],
+        "X-Catalog-Version": str(snapshot["version"]),
+        # always revalidate; an unchanged catalog costs a 304
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if snapshot["etag"] in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        body = snapshot["body"]
+    else:
+        body = gzip.decompress(snapshot["body"])
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+# 🔄 Items changed / deleted since a catalog version
+@items_bp.route("/catalog/delta", methods=["GET"])
+def catalog_changes():
+    try:
+        since = int(request.args.get("since", ""))
+    except ValueError:
+        return jsonify({"error": "since must be a catalog version"}), 400
+    return jsonify(catalog_delta(since)), 200
+
+
 # 🧱 Page route (for UI)
 @items_bp.route("/manage", methods=["GET"])
 def manage_items_page():
@@ -1,16 +1,18 @@
 # routes/main.py
 from flask import Blueprint, render_template
-from models import Category, Item, Sale
+from sqlalchemy import func
+from models import db, Category, Item
+from utils.totals import get_totals
 
 main_bp = Blueprint("main", __name__)
 
 # 🏠 Home / Dashboard
 @main_bp.route("/")
 def index():
-    total_items = Item.query.count()
-    total_sales = Sale.query.count()
-    total_stock = sum(item.quantity for item in Item.query.all())
-    total_revenue = sum(sale.total for sale in Sale.query.all())
+    total_items, total_stock = db.session.query(
+        func.count(Item.id), func.coalesce(func.sum(Item.quantity), 0)
+    ).one()
+    total_sales, total_revenue = get_totals()
 
     return render_template(
         "index.html",
@@ -40,8 +42,8 @@ def pos_page():
 # 📑 Reports page
 @main_bp.route("/reports")
 def reports_page():
-    sales = Sale.query.order_by(Sale.sold_at.desc()).all()
-    return render_template("reports.html", sales=sales)
+    # Sales are loaded page by page from /sales/data by reports.js
+    return render_template("reports.html")
 # ⚙️ Settings page
 @main_bp.route("/settings")
 def settings_page():
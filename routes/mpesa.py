@@ -1,9 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
 import base64
+import math
 import os
-import requests
+import time
 from models import db, SaleTransaction
+from utils.mpesa_client import get_session, token_cache
+from utils.mpesa_inbox import mpesa_inbox
+from utils.notify import payment_events
 import pytz
 
 EAT = pytz.timezone("Africa/Nairobi")
@@ -18,46 +22,43 @@ MPESA_SHORTCODE = os.getenv("MPESA_SHORTCODE")
 MPESA_PASSKEY = os.getenv("MPESA_PASSKEY")
 MPESA_BASE_URL = os.getenv("MPESA_BASE_URL")
 
+# ⏳ Long-poll limits (seconds)
+MAX_WAIT_SECONDS = 55
+RECHECK_SECONDS = 5
+
+
+# 🔑 Get M-Pesa access token (cached until shortly before it expires)
+def _fetch_access_token():
+    resp = get_session().get(
+        f"{MPESA_BASE_URL}/oauth/v1/generate?grant_type=client_credentials",
+        auth=(MPESA_CONSUMER_KEY, MPESA_CONSUMER_SECRET),
+        timeout=10
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return data.get("access_token"), data.get("expires_in")
+
 
-# 🔑 Get M-Pesa access token
 def get_access_token():
     try:
-        resp = requests.get(
-            f"{MPESA_BASE_URL}/oauth/v1/generate?grant_type=client_credentials",
-            auth=(MPESA_CONSUMER_KEY, MPESA_CONSUMER_SECRET),
-            timeout=10
-        )
-        resp.raise_for_status()
-        return resp.json().get("access_token")
+        return token_cache.get(_fetch_access_token)
     except Exception as e:
         current_app.logger.error(f"Failed to get M-Pesa token: {e}")
         return None
 
 
-# 💳 STK Push request
-@mpesa_bp.route("/stkpush", methods=["POST"])
-def lipa_na_mpesa():
-    data = request.get_json() or {}
-    phone = str(data.get("phone", "")).strip()
-    amount = float(data.get("amount", 0))
-    sale_id = data.get("sale_id")
-
-    if not phone or not amount:
-        return jsonify({"error": "Missing phone or amount"}), 400
-
-    token = get_access_token()
-    if not token:
-        return jsonify({"error": "Unable to get M-Pesa access token"}), 500
+def stk_push(phone, amount, account_ref, callback_url):
+    """
+    Send an STK push through the shared Daraja session.
 
+    Returns (response_json, status_code). A 401 means the cached token was
+    revoked early, so it is refreshed and the push retried once.
+    """
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     password = base64.b64encode(
         (MPESA_SHORTCODE + MPESA_PASSKEY + timestamp).encode("utf-8")
     ).decode("utf-8")
 
-    callback_url = f"{request.host_url}mpesa/callback"
-    account_ref = f"FIDPOS-{sale_id or 'NOREF'}"
-
-    headers = {"Authorization": f"Bearer {token}"}
     payload = {
         "BusinessShortCode": MPESA_SHORTCODE,
         "Password": password,
@@ -72,63 +73,136 @@ def lipa_na_mpesa():
         "TransactionDesc": "FidPOS Checkout Payment"
     }
 
-    try:
-        resp = requests.post(
-            f"{MPESA_BASE_URL}/mpesa/stkpush/v1/processrequest",
-            json=payload,
-            headers=headers,
-            timeout=15
-        )
-        res_json = resp.json()
+    for attempt in range(2):
+        token = get_access_token()
+        if not token:
+            return {"error": "Unable to get M-Pesa access token"}, 500
+
+        try:
+            resp = get_session().post(
+                f"{MPESA_BASE_URL}/mpesa/stkpush/v1/processrequest",
+                json=payload,
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=15
+            )
+        except Exception as e:
+            current_app.logger.error(f"STK Push failed: {e}")
+            return {"error": str(e)}, 500
+
+        if resp.status_code == 401 and attempt == 0:
+            token_cache.invalidate()
+            continue
+
+        try:
+            res_json = resp.json()
+        except ValueError:
+            res_json = {"error": resp.text}
         current_app.logger.info(f"STKPush Response: {res_json}")
-        return jsonify(res_json), resp.status_code
-    except Exception as e:
-        current_app.logger.error(f"STK Push failed: {e}")
-        return jsonify({"error": str(e)}), 500
+        return res_json, resp.status_code
+
+
+def link_checkout(sale_id, res_json, status):
+    """Remember a successful push's CheckoutRequestID on the sale its callback must update."""
+    checkout_id = res_json.get("CheckoutRequestID") if status == 200 else None
+    if sale_id and checkout_id:
+        try:
+            mpesa_inbox.link(sale_id, checkout_id)
+        except Exception as e:
+            # the push already went out; the till still gets its response
+            db.session.rollback()
+            current_app.logger.error(f"Failed to link {checkout_id} to sale {sale_id}: {e}")
 
 
-# 📬 Handle M-Pesa callback (confirmation)
+# 💳 STK Push request
+@mpesa_bp.route("/stkpush", methods=["POST"])
+def lipa_na_mpesa():
+    data = request.get_json() or {}
+    phone = str(data.get("phone", "")).strip()
+    amount = float(data.get("amount", 0))
+    sale_id = data.get("sale_id")
+
+    if not phone or not amount:
+        return jsonify({"error": "Missing phone or amount"}), 400
+
+    callback_url = f"{request.host_url}mpesa/callback"
+    account_ref = f"FIDPOS-{sale_id or 'NOREF'}"
+
+    res_json, status = stk_push(phone, amount, account_ref, callback_url)
+    link_checkout(sale_id, res_json, status)
+    return jsonify(res_json), status
+
+
+# 📬 Handle M-Pesa callback (confirmation): store it and acknowledge; utils.mpesa_inbox applies it
 @mpesa_bp.route("/callback", methods=["POST"])
 def mpesa_callback():
-    data = request.get_json() or {}
+    data = request.get_json(silent=True) or {}
     try:
-        body = data.get("Body", {})
-        callback = body.get("stkCallback", {})
-        result_code = callback.get("ResultCode")
-        result_desc = callback.get("ResultDesc")
-        checkout_id = callback.get("CheckoutRequestID")
-
-        if result_code == 0:
-            metadata = callback["CallbackMetadata"]["Item"]
-            amount = next(item["Value"] for item in metadata if item["Name"] == "Amount")
-            phone = next(item["Value"] for item in metadata if item["Name"] == "PhoneNumber")
-
-            # Update DB
-            transaction = SaleTransaction.query.filter_by(id=checkout_id).first()
-            if transaction:
-                transaction.status = "paid"
-                transaction.paymenyt_method = "mpesa"
-                transaction.paid_at = datetime.now(EAT)
-                db.session.commit()
-
-            current_app.logger.info(f"✅ Payment success: {phone} paid {amount}")
-        else:
-            current_app.logger.warning(f"❌ Payment failed: {result_desc}")
-
+        if not mpesa_inbox.receive(data):
+            current_app.logger.info("M-Pesa callback ignored (duplicate or no CheckoutRequestID)")
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"[Callback Error] {e}")
+        # not stored: a non-2xx makes Daraja retry instead of dropping the payment
+        return jsonify({"ResultCode": 1, "ResultDesc": "Not stored, retry"}), 500
 
     return jsonify({"ResultCode": 0, "ResultDesc": "Received"})
 
+
+def _payment_status(sale_id):
+    row = db.session.query(SaleTransaction.status).filter_by(id=sale_id).first()
+    if row is None:
+        return None
+    status = row.status
+    if status == "paid":
+        return "Success"
+    elif status == "failed":
+        return "Failed"
+    return "Pending"
+
+
+# 🔎 Status by CheckoutRequestID, for pushes sent before a sale exists (cart.js)
+@mpesa_bp.route("/status", methods=["GET"])
+def check_mpesa_status_by_checkout():
+    checkout_id = request.args.get("checkoutRequestID")
+    if not checkout_id:
+        return jsonify({"error": "Missing checkoutRequestID"}), 400
+    sale = db.session.query(SaleTransaction.id).filter_by(checkout_request_id=checkout_id).first()
+    status = _payment_status(sale.id) if sale else mpesa_inbox.result(checkout_id)
+    return jsonify({"status": status or "Pending"}), 200
+
+
 @mpesa_bp.route("/status/<sale_id>", methods=["GET"])
 def check_mpesa_status(sale_id):
-    transaction = SaleTransaction.query.filter_by(id=sale_id).first()
-    if not transaction:
+    status = _payment_status(sale_id)
+    if status is None:
         return jsonify({"error": "Sale not found"}), 404
+    return jsonify({"status": status}), 200
 
-    if transaction.status == "paid":
-        return jsonify({"status": "Success"}), 200
-    elif transaction.status == "failed":
-        return jsonify({"status": "Failed"}), 200
-    else:
-        return jsonify({"status": "Pending"}), 200
+
+# ⏳ Long-poll: answer as soon as the callback lands, or "Pending" after `timeout`
+@mpesa_bp.route("/status/<sale_id>/wait", methods=["GET"])
+def wait_mpesa_status(sale_id):
+    try:
+        timeout = float(request.args.get("timeout", 25))
+    except ValueError:
+        timeout = 25
+    if not math.isfinite(timeout):
+        # nan would make the deadline nan, and a nan deadline never passes
+        timeout = 25
+    timeout = min(max(timeout, 0), MAX_WAIT_SECONDS)
+    deadline = time.monotonic() + timeout
+
+    while True:
+        status = _payment_status(sale_id)
+        if status is None:
+            return jsonify({"error": "Sale not found"}), 404
+
+        remaining = deadline - time.monotonic()
+        if status != "Pending" or remaining <= 0:
+            return jsonify({"status": status}), 200
+
+        # Release the DB connection while parked. Callbacks handled by this
+        # worker wake us immediately; the periodic re-check catches callbacks
+        # that landed on another gunicorn worker.
+        db.session.rollback()
+        payment_events.wait(sale_id, min(remaining, RECHECK_SECONDS))
@@ -1,5 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from models import db, Category, Item
+from utils.cache import item_cache
+from utils.catalog import next_catalog_version, record_deletion
+from utils.stock import record_movements
 
 products_bp = Blueprint("products", __name__, url_prefix="/products")
 
@@ -34,7 +37,9 @@ def add_category():
 def delete_category(category_id):
     cat = Category.query.get_or_404(category_id)
     db.session.delete(cat)
+    next_catalog_version()
     db.session.commit()
+    item_cache.clear()
     flash("🗑️ Category deleted.", "info")
     return redirect(url_for("products.categories_page"))
 
@@ -42,9 +47,9 @@ def delete_category(category_id):
 # 🧩 --- Item Routes ---
 @products_bp.route("/items", methods=["GET"])
 def items_page():
-    items = Item.query.order_by(Item.created_at.desc()).all()
+    # the item table is filled by items.js from /items/; only the category picker renders here
     categories = Category.query.order_by(Category.name.asc()).all()
-    return render_template("items.html", items=items, categories=categories)
+    return render_template("items.html", categories=categories)
 
 
 @products_bp.route("/items/add", methods=["POST"])
@@ -70,10 +75,14 @@ def add_item():
         price=float(price),
         quantity=int(quantity),
         category_id=int(category_id) if category_id else None,
+        catalog_version=next_catalog_version(),
     )
 
     db.session.add(item)
+    db.session.flush()
+    record_movements("opening", [(item.id, item.quantity)], reference="item created")
     db.session.commit()
+    item_cache.invalidate(barcode)
     flash("✅ Item added successfully!", "success")
     return redirect(url_for("products.items_page"))
 
@@ -81,8 +90,12 @@ def add_item():
 @products_bp.route("/items/delete/<int:item_id>", methods=["POST"])
 def delete_item(item_id):
     item = Item.query.get_or_404(item_id)
+    barcode = item.barcode
+    record_deletion(item)
+    record_movements("adjustment", [(item.id, -(item.quantity or 0))], reference="item deleted")
     db.session.delete(item)
     db.session.commit()
+    item_cache.invalidate(barcode)
     flash("🗑️ Item deleted.", "info")
     return redirect(url_for("products.items_page"))
 
@@ -90,33 +103,37 @@ def delete_item(item_id):
 # 🧩 --- API Routes (for AJAX/Scanner use) ---
 @products_bp.route("/api/items", methods=["GET"])
 def api_get_items():
-    items = Item.query.all()
+    rows = (
+        db.session.query(Item.id, Item.barcode, Item.name, Item.price, Item.quantity, Category.name)
+        .outerjoin(Category, Item.category_id == Category.id)
+        .order_by(Item.id)
+    )
     data = [
         {
-            "id": i.id,
-            "barcode": i.barcode,
-            "name": i.name,
-            "price": i.price,
-            "quantity": i.quantity,
-            "category": i.category.name if i.category else None,
+            "id": item_id,
+            "barcode": barcode,
+            "name": name,
+            "price": price,
+            "quantity": quantity,
+            "category": category,
         }
-        for i in items
+        for item_id, barcode, name, price, quantity, category in rows
     ]
     return jsonify(data)
 
 
 @products_bp.route("/api/items/<barcode>", methods=["GET"])
 def api_get_item_by_barcode(barcode):
-    item = Item.query.filter_by(barcode=barcode).first()
+    item = item_cache.get(barcode)
     if not item:
         return jsonify({"error": "Item not found"}), 404
     return jsonify(
         {
-            "id": item.id,
-            "barcode": item.barcode,
-            "name": item.name,
-            "price": item.price,
-            "quantity": item.quantity,
-            "category": item.category.name if item.category else None,
+            "id": item["id"],
+            "barcode": item["barcode"],
+            "name": item["name"],
+            "price": item["price"],
+            "quantity": item["quantity"],
+            "category": item["category"],
         }
     )
@@ -1,7 +1,15 @@
 # routes/reports.py
 
-from flask import Blueprint, render_template, jsonify
-from models import Sale
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context
+from datetime import datetime, timedelta
+from models import db, Item, Sale
+from .sales import sales_listing, build_sales_query
+from utils.rollups import sales_summary
+from utils.stock import stock_levels_at
+from utils.export import iter_csv, iter_xlsx
+
+EXPORT_BATCH = 2000
+EXPORT_HEADER = ["ID", "Item", "Barcode", "Price", "Quantity", "Total (KSh)", "Date"]
 
 reports_bp = Blueprint("reports", __name__, url_prefix="/reports")
 
@@ -12,15 +20,72 @@ def reports_index():
 
 @reports_bp.route("/data")
 def report_data():
-    # Example: return sales data as JSON (adjust as needed)
-    sales = Sale.query.all()
-    data = [
-        {
-            "id": s.id,
-            "item": s.item_name,
-            "total": s.total,
-            "date": s.date.strftime("%Y-%m-%d %H:%M:%S"),
-        }
-        for s in sales
+    # Same filters, paging and streaming options as /sales/data
+    return sales_listing(request.args)
+
+@reports_bp.route("/summary")
+def report_summary():
+    # Revenue by day/hour, top sellers and category mix from the rollup tables
+    top = request.args.get("top", 10)
+    try:
+        top = max(1, min(int(top), 100))
+    except ValueError:
+        return jsonify({"error": "top must be an integer"}), 400
+    return jsonify(sales_summary(request.args.get("startDate"), request.args.get("endDate"), top)), 200
+
+@reports_bp.route("/stock")
+def report_stock():
+    # Stock per item at the end of ?date=YYYY-MM-DD (default: now), from the stock ledger snapshots
+    date = request.args.get("date")
+    try:
+        at = datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1) if date else None
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+
+    levels = stock_levels_at(at)
+    items = [
+        {"id": item_id, "barcode": barcode, "name": name, "quantity": levels.get(item_id, 0)}
+        for item_id, barcode, name in db.session.query(Item.id, Item.barcode, Item.name).order_by(Item.name)
     ]
-    return jsonify(data)
+    return jsonify({"date": date, "items": items}), 200
+
+@reports_bp.route("/export")
+def report_export():
+    # Stream the filtered sales as CSV or XLSX straight from a server-side cursor
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in ("csv", "xlsx"):
+        return jsonify({"error": "format must be csv or xlsx"}), 400
+
+    # parsed here, not just passed on: the dates also go into the download's filename
+    try:
+        start, end = (
+            datetime.strptime(value, "%Y-%m-%d").date().isoformat() if value else None
+            for value in (request.args.get("startDate") or request.args.get("start"),
+                          request.args.get("endDate") or request.args.get("end"))
+        )
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
+
+    query = (
+        build_sales_query(start, end)
+        .order_by(Sale.sold_at, Sale.id)
+        .yield_per(EXPORT_BATCH)
+    )
+    # build_sales_query() columns: id, item_name, barcode, price, quantity, total, sold_at
+    rows = (
+        (sale_id, name, barcode, price, qty, total, sold_at.isoformat(" ", "seconds"))
+        for sale_id, name, barcode, price, qty, total, sold_at in query
+    )
+
+    filename = "sales_{}_{}.{}".format(start or "all", end or "today", fmt)
+    if fmt == "csv":
+        body, mimetype = iter_csv(EXPORT_HEADER, rows), "text/csv"
+    else:
+        body = iter_xlsx(EXPORT_HEADER, rows, sheet_name="Sales")
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,7 +1,22 @@
 # routes/sales.py
-from flask import Blueprint, request, jsonify, render_template, flash, redirect, url_for
-from models import db, Item, Sale, SaleTransaction
+from flask import (
+    Blueprint, request, jsonify, render_template, flash, redirect, url_for,
+    Response, stream_with_context, current_app, abort
+)
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from models import db, Item, Receipt, Sale, SaleTransaction
+from utils.cache import item_cache
+from utils.totals import record_sales
+from utils.rollups import record_rollups
+from utils.till_sync import till_sync
+from utils.catalog import next_catalog_version
+from utils.stock import record_movements
+from utils.receipts import get_receipt, store_receipt
+from utils.pagination import parse_limit, decode_cursor, keyset_page, iter_keyset
 from datetime import datetime, timedelta
+import gzip
+import json
 from pytz import timezone
 
 EAT = timezone("Africa/Nairobi")
@@ -11,10 +26,11 @@ sales_bp = Blueprint("sales", __name__, url_prefix="/sales")
 # 🧾 POS main page
 @sales_bp.route("/", methods=["GET"])
 def pos_page():
-    items = Item.query.all()
-    return render_template("pos.html", items=items)
+    # The catalog is loaded client-side from /items/catalog (cached, versioned)
+    return render_template("pos.html")
 
-from utils.printer import print_receipt
+from utils.printer import format_receipt_text
+from utils.print_queue import print_queue
 
 # 🛒 Add item to sale (scan or manual)
 @sales_bp.route("/add", methods=["POST"])
@@ -23,78 +39,130 @@ def add_sale():
     barcode = data.get("barcode")
     quantity = int(data.get("quantity", 1))
 
-    item = Item.query.filter_by(barcode=barcode).first()
+    item = item_cache.get(barcode)
     if not item:
         return jsonify({"error": "Item not found"}), 404
 
-    if item.quantity < quantity:
+    if item["quantity"] < quantity:
         return jsonify({"error": "Not enough stock"}), 400
 
-    total = item.price * quantity
+    total = item["price"] * quantity
+    sold_at = datetime.now(EAT)
     sale = Sale(
-        barcode=item.barcode,
-        item_name=item.name,
-        price=item.price,
+        barcode=item["barcode"],
+        item_name=item["name"],
+        price=item["price"],
         quantity=quantity,
-        total=total
+        total=total,
+        sold_at=sold_at
     )
 
-    # Deduct from stock
-    item.quantity -= quantity
+    # Deduct from stock (the cached quantity may be stale, so re-check in SQL)
+    updated = Item.query.filter(
+        Item.id == item["id"], Item.quantity >= quantity
+    ).update(
+        {Item.quantity: Item.quantity - quantity, Item.catalog_version: next_catalog_version()},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.rollback()
+        item_cache.invalidate(barcode)
+        return jsonify({"error": "Not enough stock"}), 400
+
     db.session.add(sale)
+    db.session.flush()  # sale.id for the ledger reference
+    record_movements("sale", [(item["id"], -quantity)], reference=f"sale:{sale.id}", occurred_at=sold_at)
+    record_sales(1, total)
+    record_rollups([(sold_at, item["barcode"], item["name"], item.get("category_id"), quantity, total)])
     db.session.commit()
+    item_cache.invalidate(barcode)
 
-    # 🖨️ Print receipt automatically
-    try:
-        print_receipt(
-            sale,
-            shop_name="FidPOS Store",  # You can set this dynamically later
-            mode="bluetooth"           # or "usb" / "network" depending on printer
-        )
-    except Exception as e:
-        print(f"[⚠️ Printer Failed] {e}")
+    # 🖨️ Print receipt in the background — the sale is already committed
+    print_job_id = print_queue.submit(
+        format_receipt_text(sale, shop_name="FidPOS Store"),  # You can set this dynamically later
+        name=f"receipt_{sale.id}"
+    )
 
     return jsonify({
         "message": "Sale recorded successfully",
         "item": {
-            "barcode": item.barcode,
-            "name": item.name,
-            "price": item.price,
+            "barcode": item["barcode"],
+            "name": item["name"],
+            "price": item["price"],
             "quantity": quantity,
             "total": total
-        }
+        },
+        "print_job_id": print_job_id
     })
 
 
-# 🧾 Generate receipt (renders HTML receipt page)
+# 🖨️ Print job status
+@sales_bp.route("/print/<job_id>", methods=["GET"])
+def print_status(job_id):
+    job = print_queue.status(job_id)
+    if not job:
+        return jsonify({"error": "Print job not found"}), 404
+    return jsonify(job), 200
+
+
+# 🧾 Receipt page: the HTML stored at checkout, sent gzipped as stored when the client accepts it
 @sales_bp.route("/receipt/<int:sale_id>")
 def receipt(sale_id):
-    transaction = SaleTransaction.query.get_or_404(sale_id)
-    shop_name = "FidPOS Store"
+    body = get_receipt(sale_id, "html")
+    if body is None:
+        abort(404)
+
+    headers = {"Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(body, mimetype="text/html", headers=headers)
+
+
+# 🖨️ Reprint: queue the ESC/POS bytes stored at checkout
+@sales_bp.route("/receipt/<int:sale_id>/print", methods=["POST"])
+def reprint_receipt(sale_id):
+    data = get_receipt(sale_id, "escpos")
+    if data is None:
+        return jsonify({"error": "Transaction not found"}), 404
+    job_id = print_queue.submit(gzip.decompress(data), name=f"receipt_{sale_id}")
+    return jsonify({"print_job_id": job_id}), 202
+
+
+# 🧾 Receipt for a sale still in the till's local journal
+@sales_bp.route("/receipt/local/<key>")
+def local_receipt(key):
+    entry = till_sync.journal.get(key) if till_sync.enabled else None
+    if entry is None:
+        abort(404)
 
     return render_template(
         "receipt.html",
-        items=transaction.items,
-        total=transaction.total,
-        shop_name=shop_name,
-        date=transaction.sold_at
+        items=[
+            {"item_name": line["name"], "quantity": line["qty"], "price": line["price"],
+             "total": line["price"] * line["qty"]}
+            for line in entry["items"]
+        ],
+        total=entry["total"],
+        shop_name="FidPOS Store",
+        date=datetime.fromisoformat(entry["sold_at"])
     )
 
 
-
 # 📊 All sales (for report or testing)
 @sales_bp.route("/all", methods=["GET"])
 def all_sales():
-    sales = Sale.query.order_by(Sale.sold_at.desc()).all()
-    return render_template("reports.html", sales=sales)
+    # The table is filled page by page from /sales/data by reports.js
+    return render_template("reports.html")
 
 
-@sales_bp.route("/data", methods=["GET"])
-def sales_data():
-    start_date_str = request.args.get("startDate")
-    end_date_str = request.args.get("endDate")
-
-    query = Sale.query
+def build_sales_query(start_date_str=None, end_date_str=None):
+    """Column-only Sale query filtered to [start, end] (YYYY-MM-DD, end inclusive)."""
+    query = db.session.query(
+        Sale.id, Sale.item_name, Sale.barcode, Sale.price,
+        Sale.quantity, Sale.total, Sale.sold_at
+    )
 
     if start_date_str:
         try:
@@ -110,18 +178,157 @@ def sales_data():
         except ValueError:
             pass
 
+    return query
+
+
+def serialize_sale(s):
+    return {
+        "id": s.id,
+        "item": s.item_name,
+        "total": float(s.total),
+        "date": s.sold_at.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def sales_listing(args):
+    """
+    Shared handler for /sales/data and /reports/data.
+
+    - no paging params: the full list as a JSON array (legacy behaviour)
+    - ?limit=N[&cursor=c]: one keyset page as {"sales": [...], "next_cursor": c}
+    - ?format=ndjson: every matching row streamed as NDJSON, fetched in
+      keyset batches of `limit`, so memory stays flat for any date range
+    """
+    query = build_sales_query(args.get("startDate"), args.get("endDate"))
+    cursor = args.get("cursor")
+    limit = parse_limit(args.get("limit"))
+
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    if args.get("format") == "ndjson":
+        def generate():
+            for s in iter_keyset(query, Sale.sold_at, Sale.id, cursor, limit):
+                yield json.dumps(serialize_sale(s)) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    if "limit" in args or cursor:
+        sales, next_cursor = keyset_page(query, Sale.sold_at, Sale.id, cursor, limit)
+        return jsonify({
+            "sales": [serialize_sale(s) for s in sales],
+            "next_cursor": next_cursor
+        }), 200
+
     sales = query.order_by(Sale.sold_at.desc()).all()
+    return jsonify([serialize_sale(s) for s in sales]), 200
+
+
+@sales_bp.route("/data", methods=["GET"])
+def sales_data():
+    return sales_listing(request.args)
+
+class CheckoutError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def record_checkout(items, payment_method, sold_at=None, idempotency_key=None, allow_oversell=False):
+    """
+    Record a whole cart as one SaleTransaction and deduct stock atomically.
+
+    All cart barcodes are loaded with a single IN query. Stock is taken with
+    conditional `UPDATE ... WHERE quantity >= :qty` statements in the same
+    transaction as the Sale rows, so two tills can never oversell the same
+    item. Any failure rolls everything back and raises CheckoutError.
+
+    Every deduction is appended to the stock ledger under the sale time, and
+    the receipt is rendered and stored with the sale (utils.receipts).
+
+    Sales synced from an offline till pass their own `sold_at`, an
+    `idempotency_key` and `allow_oversell=True`: the customer already has
+    the goods, so stock is deducted even if it goes negative.
+    """
+    lines = []
+    wanted = {}
+    for item in items:
+        price = float(item.get("price", 0))
+        qty = int(item.get("qty", 1))
+        if qty <= 0:
+            raise CheckoutError("Quantity must be positive")
+        barcode = item.get("barcode", "")
+        lines.append((barcode, item.get("name", ""), price, qty))
+        wanted[barcode] = wanted.get(barcode, 0) + qty
+
+    stock = {
+        row.barcode: row
+        for row in db.session.query(Item.id, Item.barcode, Item.name, Item.category_id)
+        .filter(Item.barcode.in_([b for b in wanted if b]))
+    }
+
+    try:
+        # ✅ Deduct stock first (in id order, so concurrent checkouts lock rows
+        # in the same order) and fail before anything is inserted
+        catalog_version = next_catalog_version() if stock else None
+        for row in sorted(stock.values(), key=lambda r: r.id):
+            qty = wanted[row.barcode]
+            stmt = update(Item).where(Item.id == row.id)
+            if not allow_oversell:
+                stmt = stmt.where(Item.quantity >= qty)
+            updated = db.session.execute(
+                stmt.values(quantity=Item.quantity - qty, catalog_version=catalog_version)
+            ).rowcount
+            if not updated:
+                raise CheckoutError(f"Not enough stock for {row.name}")
+
+        sold_at = sold_at or datetime.now(EAT)
+        transaction = SaleTransaction(idempotency_key=idempotency_key)
+        db.session.add(transaction)
+        db.session.flush()  # get transaction.id before commit
+
+        total_sum = 0
+        rollup_lines = []
+        receipt_lines = []
+        for barcode, name, price, qty in lines:
+            total = price * qty
+            total_sum += total
+            known = stock.get(barcode)
+            item_name = name or (known.name if known else "")
+            receipt_lines.append((item_name, qty, price, total))
+            db.session.add(Sale(
+                transaction_id=transaction.id,
+                barcode=barcode,
+                item_name=item_name,
+                price=price,
+                quantity=qty,
+                total=total,
+                sold_at=sold_at
+            ))
+            rollup_lines.append((sold_at, barcode, item_name, known.category_id if known else None, qty, total))
+
+        transaction.total = total_sum
+        record_movements(
+            "sale", [(row.id, -wanted[row.barcode]) for row in stock.values()],
+            reference=f"sale_transaction:{transaction.id}", occurred_at=sold_at,
+        )
+        record_sales(len(lines), total_sum)
+        record_rollups(rollup_lines)
+        store_receipt(transaction.id, receipt_lines, total_sum, sold_at)
+        transaction.payment_method = payment_method
+        transaction.sold_at = sold_at
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        item_cache.invalidate(*stock)
+
+    return transaction
 
-    data = [
-        {
-            "id": s.id,
-            "item": s.item_name,
-            "total": float(s.total),
-            "date": s.sold_at.strftime("%Y-%m-%d %H:%M:%S")
-        }
-        for s in sales
-    ]
-    return jsonify(data), 200
 
 # 🧾 Checkout (finalize sale, clear cart)
 @sales_bp.route("/checkout", methods=["POST"])
@@ -139,6 +346,8 @@ def checkout():
 
         transaction.payment_method = payment_method or "unknown"
         transaction.sold_at = datetime.now(EAT)
+        # the receipt shows the sale time: render it again on its next view
+        db.session.query(Receipt).filter_by(transaction_id=transaction.id).delete()
         db.session.commit()
 
         return jsonify({"sale_id": transaction.id, "status": "ok"})
@@ -147,43 +356,105 @@ def checkout():
     if not items:
         return jsonify({"error": "Cart is empty"}), 400
 
-    transaction = SaleTransaction()
-    db.session.add(transaction)
-    db.session.flush()  # get transaction.id before commit
+    # 📴 Offline-first till: journal locally, the sync worker uploads it
+    if till_sync.enabled:
+        try:
+            entry = till_sync.record(items, payment_method)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({
+            "sale_id": None,
+            "journal_key": entry["key"],
+            "receipt_url": url_for("sales.local_receipt", key=entry["key"]),
+            "status": "queued"
+        })
 
-    total_sum = 0
-    for item in items:
-        price = float(item.get("price", 0))
-        qty = int(item.get("qty", 1))
-        total = price * qty
-        total_sum += total
-
-        sale = Sale(
-            transaction_id=transaction.id,
-            barcode=item.get("barcode", ""),
-            item_name=item.get("name", ""),
-            price=price,
-            quantity=qty,
-            total=total
-        )
-        db.session.add(sale)
-
-        # ✅ Deduct stock
-        db_item = Item.query.filter_by(barcode=item.get("barcode")).first()
-        if db_item:
-            if db_item.quantity < qty:
-                return jsonify({"error": f"Not enough stock for {db_item.name}"}), 400
-            db_item.quantity = max(0, db_item.quantity - qty)
-
-    transaction.total = total_sum
-    transaction.payment_method = payment_method or "cash"
-    transaction.sold_at = datetime.now(EAT)
-    db.session.commit()
+    try:
+        transaction = record_checkout(items, payment_method or "cash")
+    except CheckoutError as e:
+        return jsonify({"error": str(e)}), e.status
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid price or quantity"}), 400
 
     return jsonify({"sale_id": transaction.id, "status": "ok"})
 
+def _parse_sold_at(value):
+    """Till timestamps are ISO 8601; naive ones are taken as EAT."""
+    if not value:
+        return None
+    sold_at = datetime.fromisoformat(value)
+    return sold_at.astimezone(EAT) if sold_at.tzinfo else EAT.localize(sold_at)
+
+
+# 🔄 Upload endpoint for offline tills (see utils/till_sync.py)
+@sales_bp.route("/sync", methods=["POST"])
+def sync_sales():
+    token = current_app.config.get("SYNC_TOKEN")
+    if token and request.headers.get("X-Sync-Token") != token:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    sales = (request.get_json(silent=True) or {}).get("sales") or []
+    if len(sales) > current_app.config.get("SYNC_MAX_BATCH", 500):
+        return jsonify({"error": "Batch too large"}), 400
+
+    keys = [sale.get("key") for sale in sales if sale.get("key")]
+    existing = dict(
+        db.session.query(SaleTransaction.idempotency_key, SaleTransaction.id)
+        .filter(SaleTransaction.idempotency_key.in_(keys))
+    ) if keys else {}
+
+    results = []
+    for sale in sales:
+        key = sale.get("key")
+        if not key or len(key) > 64:
+            results.append({"key": key, "status": "rejected", "error": "Missing or invalid idempotency key"})
+            continue
+        if key in existing:
+            results.append({"key": key, "status": "duplicate", "sale_id": existing[key]})
+            continue
+        if not sale.get("items"):
+            results.append({"key": key, "status": "rejected", "error": "Cart is empty"})
+            continue
+
+        try:
+            transaction = record_checkout(
+                sale["items"], sale.get("payment_method") or "cash",
+                sold_at=_parse_sold_at(sale.get("sold_at")),
+                idempotency_key=key,
+                allow_oversell=True
+            )
+        except IntegrityError:
+            # Uploaded concurrently by another request; that one won
+            sale_id = db.session.query(SaleTransaction.id).filter_by(idempotency_key=key).scalar()
+            if sale_id is None:
+                results.append({"key": key, "status": "error", "error": "Conflict while recording sale"})
+                continue
+            results.append({"key": key, "status": "duplicate", "sale_id": sale_id})
+            continue
+        except (CheckoutError, TypeError, ValueError) as e:
+            results.append({"key": key, "status": "rejected", "error": str(e)})
+            continue
+        except Exception as e:
+            current_app.logger.exception("Sync of sale %s failed", key)
+            results.append({"key": key, "status": "error", "error": str(e)})
+            continue
+
+        existing[key] = transaction.id
+        results.append({"key": key, "status": "created", "sale_id": transaction.id})
+
+    return jsonify({"results": results}), 200
+
+
+# 📴 Till journal / sync state (till mode only)
+@sales_bp.route("/sync/status", methods=["GET"])
+def sync_status():
+    if not till_sync.enabled:
+        return jsonify({"till_mode": False}), 200
+    return jsonify(dict(till_sync.status(), till_mode=True)), 200
+
+
 # Mpesa payment integration
-from .mpesa import lipa_na_mpesa
+from .mpesa import link_checkout, stk_push
 from models import SaleTransaction
 from flask import current_app
 import uuid
@@ -202,9 +473,10 @@ def pay_with_mpesa():
         return jsonify({"error": "Invalid sale"}), 404
 
     amount = float(transaction.total)
-    callback_url = f"{request.host_url}mpesa/mpesa/callback"
+    callback_url = f"{request.host_url}mpesa/callback"
     account_ref = f"FIDPOS-{sale_id}-{uuid.uuid4().hex[:6]}"
 
-    resp = lipa_na_mpesa(phone, amount, account_ref, callback_url)
-    return jsonify(resp)
+    resp, status = stk_push(phone, amount, account_ref, callback_url)
+    link_checkout(transaction.id, resp, status)
+    return jsonify(resp), status
 
@@ -1,7 +1,8 @@
 # routes/settings.py
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from models import db  
+from utils.scheduler import job_scheduler
 
 settings_bp = Blueprint("settings", __name__, url_prefix="/settings")
 
@@ -21,3 +22,17 @@ def update_settings():
     print(f"✅ Updated setting: {new_value}")
     flash("Settings updated successfully!", "success")
     return redirect(url_for("settings.settings_index"))
+
+
+# ⏱️ Background jobs: leader, next runs and recent run history with durations
+@settings_bp.route("/jobs", methods=["GET"])
+def jobs_status():
+    return jsonify(job_scheduler.status()), 200
+
+
+# ▶️ Run a job on the leader's next tick
+@settings_bp.route("/jobs/<job_id>/run", methods=["POST"])
+def run_job(job_id):
+    if not job_scheduler.run_soon(job_id):
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify({"message": f"{job_id} will run within {job_scheduler.tick_seconds:g}s"}), 202
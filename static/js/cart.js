@@ -6,6 +6,39 @@ document.addEventListener("DOMContentLoaded", () => {
 
   let cart = [];
 
+  // 🔎 Name search for items that won't scan: suggestions fill the barcode in
+  const scanInput = document.getElementById("scanInput");
+  const suggestions = document.getElementById("itemSuggestions");
+  let searchTimer = null;
+  let searchToken = 0;
+
+  scanInput.addEventListener("input", () => {
+    clearTimeout(searchTimer);
+    const q = scanInput.value.trim();
+    // scanners type digits; only search what looks like a name
+    if (q.length < 2 || /^\d+$/.test(q)) {
+      suggestions.innerHTML = "";
+      return;
+    }
+    searchTimer = setTimeout(async () => {
+      const token = ++searchToken;
+      try {
+        const res = await fetch(`/items/search?q=${encodeURIComponent(q)}&limit=10`);
+        if (!res.ok || token !== searchToken) return;
+        const data = await res.json();
+        suggestions.innerHTML = "";
+        data.results.forEach((item) => {
+          const option = document.createElement("option");
+          option.value = item.barcode;
+          option.label = `${item.name} — KSh ${Number(item.price).toFixed(2)} (${item.quantity} in stock)`;
+          suggestions.appendChild(option);
+        });
+      } catch (err) {
+        console.error("❌ Search failed:", err);
+      }
+    }, 150);
+  });
+
   // ➕ Add to Cart
   addToCartBtn.addEventListener("click", async () => {
     const barcode = document.getElementById("scanInput").value.trim();
@@ -17,13 +50,16 @@ document.addEventListener("DOMContentLoaded", () => {
     }
 
     try {
-      // 🔎 Fetch the item from backend
-      const res = await fetch(`/items/lookup/${barcode}`);
-      if (!res.ok) {
-        alert("⚠️ Item not found in database!");
-        return;
+      // 🔎 Look the item up in the local catalog, else ask the backend
+      let item = window.fidposCatalog && window.fidposCatalog.get(barcode);
+      if (!item) {
+        const res = await fetch(`/items/lookup/${barcode}`);
+        if (!res.ok) {
+          alert("⚠️ Item not found in database!");
+          return;
+        }
+        item = await res.json();
       }
-      const item = await res.json();
 
       // ✅ Check if item already in cart
       const existing = cart.find(i => i.barcode === barcode);
@@ -71,6 +107,10 @@ checkoutBtn.addEventListener("click", async () => {
       else if (data.sale_id) {
         window.open(`/sales/receipt/${data.sale_id}`, "_blank");
       } 
+      // 📴 Offline till: receipt from the local journal
+      else if (data.receipt_url) {
+        window.open(data.receipt_url, "_blank");
+      } 
       else {
         alert("⚠️ Checkout succeeded but no receipt ID returned!");
       }
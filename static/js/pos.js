@@ -9,29 +9,65 @@ document.addEventListener("DOMContentLoaded", () => {
   let currentSaleId = null; // dynamically set when a sale starts
   let paymentMethod = null; // "mpesa" or "cash"
 
-  // 🔁 Load all items
-  async function loadItems() {
-    try {
-      const res = await fetch("/items/");
-      const data = await res.json();
+  // 📦 Catalog: gzipped snapshot (revalidated by ETag, so usually a 304 from
+  // the browser cache) plus a small delta of changes since its version.
+  // Scans are then looked up locally instead of one request per item.
+  const catalog = new Map(); // barcode -> item
+  const barcodeById = new Map();
+  let categories = {};
+  let catalogVersion = null;
+
+  function applyRows(columns, rows) {
+    rows.forEach((values) => {
+      const item = {};
+      columns.forEach((col, i) => (item[col] = values[i]));
+      const oldBarcode = barcodeById.get(item.id);
+      if (oldBarcode && oldBarcode !== item.barcode) catalog.delete(oldBarcode);
+      barcodeById.set(item.id, item.barcode);
+      catalog.set(item.barcode, item);
+    });
+  }
 
-      cartBody.innerHTML = "";
-      data.forEach((item) => {
-        const row = document.createElement("tr");
-        row.innerHTML = `
-          <td>${item.barcode}</td>
-          <td>${item.name}</td>
-          <td>${item.category}</td>
-          <td>${item.price}</td>
-          <td>${item.quantity}</td>
-        `;
-        cartBody.appendChild(row);
+  async function refreshCatalog() {
+    if (catalogVersion === null) return;
+    try {
+      const res = await fetch(`/items/catalog/delta?since=${catalogVersion}`);
+      if (!res.ok) return;
+      const delta = await res.json();
+      delta.deleted.forEach((id) => {
+        catalog.delete(barcodeById.get(id));
+        barcodeById.delete(id);
       });
+      applyRows(delta.columns, delta.items);
+      categories = delta.categories;
+      catalogVersion = delta.version;
     } catch (err) {
-      console.error("❌ Failed to load items:", err);
+      console.error("❌ Failed to refresh catalog:", err);
     }
   }
 
+  async function loadCatalog() {
+    try {
+      const res = await fetch("/items/catalog", { cache: "no-cache" });
+      const snapshot = await res.json();
+      categories = snapshot.categories;
+      applyRows(snapshot.columns, snapshot.items);
+      catalogVersion = snapshot.version;
+      await refreshCatalog();
+    } catch (err) {
+      console.error("❌ Failed to load catalog:", err);
+    }
+  }
+
+  // Used by cart.js; falls back to /items/lookup when the catalog isn't loaded
+  window.fidposCatalog = {
+    get(barcode) {
+      const item = catalog.get(barcode);
+      if (!item) return null;
+      return { ...item, category: categories[item.category_id] || "Uncategorized" };
+    },
+  };
+
   // 🧠 Barcode scanning listener
   let barcodeBuffer = "";
   let scanTimeout;
@@ -68,21 +104,27 @@ async function payWithMpesa(saleId, phone) {
   }
 }
 
-// 🔁 Poll M-Pesa payment status
+// ⏳ Wait for M-Pesa payment status (long-poll: the server answers as soon as the callback lands)
 async function pollPaymentStatus(saleId) {
-  const interval = setInterval(async () => {
-    const res = await fetch(`/mpesa/status/${saleId}`);
-    const data = await res.json();
+  while (true) {
+    try {
+      const res = await fetch(`/mpesa/status/${saleId}/wait?timeout=25`);
+      if (res.status === 404) return;
+      const data = await res.json();
 
-    if (data.status === "Success") {
-      clearInterval(interval);
-      alert("✅ M-Pesa payment confirmed!");
-      finalizeCheckout(saleId, "mpesa");
-    } else if (data.status === "Failed") {
-      clearInterval(interval);
-      alert("❌ Payment failed or cancelled.");
+      if (data.status === "Success") {
+        alert("✅ M-Pesa payment confirmed!");
+        finalizeCheckout(saleId, "mpesa");
+        return;
+      } else if (data.status === "Failed") {
+        alert("❌ Payment failed or cancelled.");
+        return;
+      }
+    } catch (err) {
+      console.error("❌ Payment status error:", err);
+      await new Promise((resolve) => setTimeout(resolve, 3000));
     }
-  }, 3000);
+  }
 }
 
 // 💵 Cash payment — auto checkout immediately
@@ -206,5 +248,6 @@ checkoutBtn?.addEventListener("click", () => {
 });
 
   // Initial load
-  loadItems();
+  loadCatalog();
+  setInterval(refreshCatalog, 30000);
 });
@@ -4,6 +4,60 @@ document.addEventListener("DOMContentLoaded", () => {
   const canvas = document.getElementById("salesChart");
   let salesChart = null;
 
+  const PAGE_SIZE = 500;
+  let loadToken = 0;
+
+  // 📄 Fetch one keyset page of sales
+  async function fetchPage(params, cursor) {
+    const pageParams = new URLSearchParams(params);
+    pageParams.set("limit", PAGE_SIZE);
+    if (cursor) pageParams.set("cursor", cursor);
+
+    const res = await fetch(`/sales/data?${pageParams.toString()}`);
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return res.json();
+  }
+
+  // 📈 Revenue per day from the rollup tables (one small request, any date range)
+  async function fetchSummary(params) {
+    const res = await fetch(`/reports/summary?${params.toString()}`);
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return res.json();
+  }
+
+  function drawChart(byDay) {
+    salesChart = new Chart(canvas.getContext("2d"), {
+      type: "bar",
+      data: {
+        labels: byDay.map(d => d.day),
+        datasets: [{
+          label: "Total Sales (KSh)",
+          data: byDay.map(d => d.revenue),
+          backgroundColor: "rgba(54, 162, 235, 0.5)",
+          borderColor: "rgba(54, 162, 235, 1)",
+          borderWidth: 1
+        }]
+      },
+      options: {
+        responsive: true,
+        animation: { duration: 0 },
+        scales: { y: { beginAtZero: true } }
+      }
+    });
+  }
+
+  function appendRows(sales) {
+    const rows = sales.map(sale => `
+      <tr>
+        <td>${sale.id}</td>
+        <td>${sale.item}</td>
+        <td>${sale.total.toLocaleString()}</td>
+        <td>${sale.date}</td>
+      </tr>
+    `).join("");
+    tableBody.insertAdjacentHTML("beforeend", rows);
+  }
+
   async function loadReports() {
     const startDate = document.getElementById("startDate").value;
     const endDate = document.getElementById("endDate").value;
@@ -12,10 +66,10 @@ document.addEventListener("DOMContentLoaded", () => {
     if (startDate) params.append("startDate", startDate);
     if (endDate) params.append("endDate", endDate);
 
-    try {
-      const res = await fetch(`/sales/data?${params.toString()}`);
-      const data = await res.json();
+    // A newer filter click cancels the pages still loading for an older one
+    const token = ++loadToken;
 
+    try {
       // Clear table
       tableBody.innerHTML = "";
 
@@ -25,7 +79,24 @@ document.addEventListener("DOMContentLoaded", () => {
         salesChart = null;
       }
 
-      if (!data || data.length === 0) {
+      const summary = await fetchSummary(params);
+      if (token !== loadToken) return;
+      if (summary.by_day.length) drawChart(summary.by_day);
+
+      let rowCount = 0;
+      let cursor = null;
+
+      // Render each page as soon as it arrives
+      do {
+        const page = await fetchPage(params, cursor);
+        if (token !== loadToken) return;
+
+        appendRows(page.sales);
+        rowCount += page.sales.length;
+        cursor = page.next_cursor;
+      } while (cursor);
+
+      if (rowCount === 0) {
         tableBody.innerHTML = `
           <tr>
             <td colspan="4" class="text-center text-muted">No sales found for this period.</td>
@@ -36,45 +107,6 @@ document.addEventListener("DOMContentLoaded", () => {
         ctx.clearRect(0, 0, canvas.width, canvas.height);
         return;
       }
-
-      const labels = [];
-      const totals = [];
-
-      data.forEach(sale => {
-        labels.push(sale.item);
-        totals.push(sale.total);
-
-        const row = `
-          <tr>
-            <td>${sale.id}</td>
-            <td>${sale.item}</td>
-            <td>${sale.total.toLocaleString()}</td>
-            <td>${sale.date}</td>
-          </tr>
-        `;
-        tableBody.insertAdjacentHTML("beforeend", row);
-      });
-
-      // Recreate chart
-      salesChart = new Chart(canvas.getContext("2d"), {
-        type: "bar",
-        data: {
-          labels: labels,
-          datasets: [{
-            label: "Total Sales (KSh)",
-            data: totals,
-            backgroundColor: "rgba(54, 162, 235, 0.5)",
-            borderColor: "rgba(54, 162, 235, 1)",
-            borderWidth: 1
-          }]
-        },
-        options: {
-          responsive: true,
-          animation: { duration: 0 },
-          scales: { y: { beginAtZero: true } }
-        }
-      });
-
     } catch (err) {
       console.error("❌ Failed to load sales data:", err);
       tableBody.innerHTML = `
@@ -87,6 +119,18 @@ document.addEventListener("DOMContentLoaded", () => {
 
   filterBtn.addEventListener("click", loadReports);
 
+  // ⬇️ Download the filtered sales; the server streams the file
+  document.querySelectorAll(".export-btn").forEach(btn => {
+    btn.addEventListener("click", () => {
+      const params = new URLSearchParams({ format: btn.dataset.format });
+      const startDate = document.getElementById("startDate").value;
+      const endDate = document.getElementById("endDate").value;
+      if (startDate) params.append("startDate", startDate);
+      if (endDate) params.append("endDate", endDate);
+      window.location.href = `/reports/export?${params.toString()}`;
+    });
+  });
+
   // Initial load
   loadReports();
 });
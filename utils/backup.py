@@ -1,6 +1,16 @@
 # utils/backup.py
-import sqlite3
+import glob
+import gzip
+import json
 import os
+import shutil
+import sqlite3
+import struct
+import time
+from contextlib import closing
+from datetime import datetime
+
+from utils.restore import database_fingerprint
 
 def backup_database(backup_file="backup.sql", db_path="fidpos.db"):
     """
@@ -11,11 +21,300 @@ def backup_database(backup_file="backup.sql", db_path="fidpos.db"):
         return
 
     try:
-        conn = sqlite3.connect(db_path)
-        with open(backup_file, "w", encoding="utf-8") as f:
-            for line in conn.iterdump():
-                f.write(f"{line}\n")
-        conn.close()
+        with closing(sqlite3.connect(db_path, isolation_level=None)) as conn:
+            # One read transaction, so the fingerprint matches the dump exactly
+            conn.execute("BEGIN")
+            with open(backup_file, "w", encoding="utf-8") as f:
+                for line in conn.iterdump():
+                    f.write(f"{line}\n")
+            with open(backup_file + ".json", "w", encoding="utf-8") as f:
+                json.dump(database_fingerprint(conn), f, indent=2)
+            conn.execute("COMMIT")
         print(f"✅ Backup created: {backup_file}")
     except Exception as e:
         print(f"❌ Backup failed: {e}")
+
+
+# --- Online snapshots (sqlite3 backup API) ---------------------------------
+#
+# backups/
+#   fidpos-20261017-020000-000000.db.gz         compressed page-level copy
+#   fidpos-20261017-020000-000000.json          manifest (WAL position, segments)
+#   fidpos-20261017-020000-000000.wal-0000.gz   WAL bytes shipped since the snapshot
+#   fidpos-20261017-020000-000000.wal-0001.gz   ...
+#
+# A snapshot plus its WAL segments, concatenated into <db>-wal, opens as the
+# database at the time of the last shipped commit (see utils.restore).
+
+SNAPSHOT_PREFIX = "fidpos-"
+WAL_HEADER_SIZE = 32
+WAL_FRAME_HEADER_SIZE = 24
+
+
+def _wal_path(db_path):
+    return db_path + "-wal"
+
+
+def _read_wal_header(db_path):
+    """Return the parsed WAL header, or None when the database isn't using WAL."""
+    try:
+        with open(_wal_path(db_path), "rb") as f:
+            raw = f.read(WAL_HEADER_SIZE)
+    except FileNotFoundError:
+        return None
+    if len(raw) < WAL_HEADER_SIZE:
+        return None
+
+    magic = struct.unpack(">I", raw[:4])[0]
+    if magic not in (0x377F0682, 0x377F0683):
+        return None
+    _, _, page_size, _, salt1, salt2, cksum1, cksum2 = struct.unpack(">8I", raw)
+    return {
+        "big_endian": bool(magic & 1),
+        "page_size": page_size,
+        "salt": [salt1, salt2],
+        "checksum": [cksum1, cksum2],
+    }
+
+
+def _wal_checksum(data, s0, s1, big_endian):
+    words = struct.unpack(f"{'>' if big_endian else '<'}{len(data) // 4}I", data)
+    for i in range(0, len(words), 2):
+        s0 = (s0 + words[i] + s1) & 0xFFFFFFFF
+        s1 = (s1 + words[i + 1] + s0) & 0xFFFFFFFF
+    return s0, s1
+
+
+def _read_committed_wal(db_path, header, offset, checksum):
+    """
+    Read WAL frames from `offset` up to the last fully written commit frame.
+
+    Frames are validated against SQLite's running checksum, so a frame that
+    a writer is still appending is never shipped. Returns
+    (data, new_offset, new_checksum).
+    """
+    frame_size = WAL_FRAME_HEADER_SIZE + header["page_size"]
+    s0, s1 = checksum
+    pos = good_end = offset
+    good_checksum = (s0, s1)
+    chunks, pending = [], []
+
+    with open(_wal_path(db_path), "rb") as f:
+        f.seek(offset)
+        while True:
+            frame = f.read(frame_size)
+            if len(frame) < frame_size:
+                break
+            _, db_size, salt1, salt2, c0, c1 = struct.unpack(">6I", frame[:WAL_FRAME_HEADER_SIZE])
+            if [salt1, salt2] != header["salt"]:
+                break
+            s0, s1 = _wal_checksum(frame[:8], s0, s1, header["big_endian"])
+            s0, s1 = _wal_checksum(frame[WAL_FRAME_HEADER_SIZE:], s0, s1, header["big_endian"])
+            if (s0, s1) != (c0, c1):
+                break
+            pos += frame_size
+            pending.append(frame)
+            if db_size:  # commit frame: everything up to here is a complete transaction
+                chunks.extend(pending)
+                pending = []
+                good_end, good_checksum = pos, (s0, s1)
+
+    return b"".join(chunks), good_end, list(good_checksum)
+
+
+def _write_gzip(path, data):
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb", compresslevel=6) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _manifest_path(backup_dir, name):
+    return os.path.join(backup_dir, f"{name}.json")
+
+
+def _save_manifest(backup_dir, manifest):
+    path = _manifest_path(backup_dir, manifest["name"])
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def latest_manifest(backup_dir):
+    paths = sorted(glob.glob(os.path.join(backup_dir, f"{SNAPSHOT_PREFIX}*.json")))
+    if not paths:
+        return None
+    with open(paths[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _ship_segment(db_path, backup_dir, manifest, header):
+    """Append committed WAL frames after manifest['wal']['offset'] as a new segment."""
+    wal = manifest["wal"]
+    data, offset, checksum = _read_committed_wal(db_path, header, wal["offset"], wal["checksum"])
+    if not data:
+        return None
+
+    # The WAL may have been reset (new salt) while we were reading it
+    after = _read_wal_header(db_path)
+    if not after or after["salt"] != header["salt"]:
+        return None
+
+    segment = f"{manifest['name']}.wal-{len(wal['segments']):04d}.gz"
+    _write_gzip(os.path.join(backup_dir, segment), data)
+    wal["segments"].append(segment)
+    wal["offset"], wal["checksum"] = offset, checksum
+    return segment
+
+
+class _StepBudgetExceeded(Exception):
+    pass
+
+
+def _copy_database(db_path, dest, pages, sleep, max_seconds):
+    """
+    Copy `db_path` to `dest` with the backup API.
+
+    In WAL mode one step is a single read transaction that never blocks
+    writers. In rollback-journal mode the copy goes `pages` at a time with
+    `sleep` seconds between steps so writers get the lock in between; every
+    write restarts a stepped backup though, so after `max_seconds` it falls
+    back to one step.
+    """
+    src = sqlite3.connect(db_path)
+    try:
+        wal = src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+        if wal or pages <= 0:
+            dst = sqlite3.connect(dest)
+            with dst:
+                src.backup(dst)
+            dst.close()
+            return
+
+        deadline = time.monotonic() + max_seconds
+
+        def progress(status, remaining, total):
+            if time.monotonic() > deadline:
+                raise _StepBudgetExceeded()
+
+        dst = sqlite3.connect(dest)
+        try:
+            with dst:
+                src.backup(dst, pages=pages, sleep=sleep, progress=progress)
+        except _StepBudgetExceeded:
+            print("⚠️ Stepped backup kept restarting — copying in one step.")
+            with dst:
+                src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+def snapshot_database(db_path="fidpos.db", backup_dir="backups", keep=7, pages=1024, sleep=0.005,
+                      max_seconds=5):
+    """
+    Take an online, compressed, timestamped snapshot with the SQLite backup API.
+
+    Only the newest `keep` snapshots (and their WAL segments) are kept.
+    Returns the manifest dict.
+    """
+    if not os.path.exists(db_path):
+        print("⚠️ Database not found — skipping backup.")
+        return None
+
+    os.makedirs(backup_dir, exist_ok=True)
+    name = f"{SNAPSHOT_PREFIX}{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    tmp = os.path.join(backup_dir, f".{name}.db.tmp")
+    started = time.perf_counter()
+
+    try:
+        header_before = _read_wal_header(db_path)
+        _copy_database(db_path, tmp, pages, sleep, max_seconds)
+
+        with closing(sqlite3.connect(tmp)) as check:
+            fingerprint = database_fingerprint(check)
+
+        snapshot = f"{name}.db.gz"
+        with open(tmp, "rb") as f_in, gzip.open(os.path.join(backup_dir, snapshot), "wb", compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        db_size = os.path.getsize(tmp)
+        os.remove(tmp)
+
+        manifest = {
+            "name": name,
+            "snapshot": snapshot,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "db_size": db_size,
+            "fingerprint": fingerprint,
+            "wal": None,
+        }
+
+        # Ship the WAL prefix the snapshot was taken on. Replaying it over the
+        # snapshot is a no-op, but later segments only validate on top of it.
+        # If the WAL was reset during the copy, commits may have been
+        # checkpointed out of reach, so the chain starts with the next snapshot.
+        header = _read_wal_header(db_path)
+        if header and header_before and header["salt"] == header_before["salt"]:
+            manifest["wal"] = {
+                "salt": header["salt"],
+                "page_size": header["page_size"],
+                "big_endian": header["big_endian"],
+                "header": None,
+                "offset": WAL_HEADER_SIZE,
+                "checksum": header["checksum"],
+                "segments": [],
+            }
+            with open(_wal_path(db_path), "rb") as f:
+                manifest["wal"]["header"] = f.read(WAL_HEADER_SIZE).hex()
+            _ship_segment(db_path, backup_dir, manifest, header)
+
+        manifest["seconds"] = round(time.perf_counter() - started, 3)
+        _save_manifest(backup_dir, manifest)
+        rotate_snapshots(backup_dir, keep)
+        print(f"✅ Snapshot created: {os.path.join(backup_dir, snapshot)}")
+        return manifest
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        print(f"❌ Snapshot failed: {e}")
+        return None
+
+
+def ship_wal(db_path="fidpos.db", backup_dir="backups", keep=7):
+    """
+    Ship WAL frames committed since the last snapshot/segment.
+
+    If the WAL was checkpointed and restarted since the latest snapshot, the
+    segment chain can't continue, so a fresh snapshot is taken instead.
+    Returns the shipped segment name (or the new manifest), or None.
+    """
+    header = _read_wal_header(db_path)
+    if not header:
+        return None
+
+    manifest = latest_manifest(backup_dir)
+    if not manifest or not manifest.get("wal") or manifest["wal"]["salt"] != header["salt"]:
+        return snapshot_database(db_path, backup_dir, keep=keep)
+
+    try:
+        segment = _ship_segment(db_path, backup_dir, manifest, header)
+        if segment:
+            _save_manifest(backup_dir, manifest)
+            print(f"✅ WAL segment shipped: {segment}")
+        return segment
+    except Exception as e:
+        print(f"❌ WAL shipping failed: {e}")
+        return None
+
+
+def rotate_snapshots(backup_dir, keep=7):
+    """Delete all but the newest `keep` snapshots, with their manifests and WAL segments."""
+    names = sorted(
+        os.path.basename(p)[:-len(".json")]
+        for p in glob.glob(os.path.join(backup_dir, f"{SNAPSHOT_PREFIX}*.json"))
+    )
+    for name in (names[:-keep] if keep > 0 else []):
+        for path in glob.glob(os.path.join(backup_dir, f"{name}.*")):
+            os.remove(path)
@@ -0,0 +1,99 @@
+# utils/cache.py
+import threading
+import time
+from collections import OrderedDict
+
+from models import db, Item, Category
+
+
+class BarcodeCache:
+    """
+    Process-local barcode -> item cache with LRU eviction.
+
+    Entries are plain dicts (never ORM objects) so they can be shared safely
+    between requests. Every route that changes an item or a category must call
+    `invalidate()` / `clear()` after committing.
+    """
+
+    def __init__(self, maxsize=2048, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("BARCODE_CACHE_SIZE", self.maxsize)
+        self.ttl = app.config.get("BARCODE_CACHE_TTL", self.ttl)
+        self.clear()
+
+    def get(self, barcode):
+        """Return the cached item dict for `barcode`, loading it on a miss."""
+        if not barcode or self.maxsize <= 0:
+            return _load_item(barcode) if barcode else None
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(barcode)
+            if entry is not None and (not self.ttl or now - entry[0] < self.ttl):
+                self._entries.move_to_end(barcode)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        item = _load_item(barcode)
+        if item is None:
+            return None
+
+        with self._lock:
+            self._entries[barcode] = (now, item)
+            self._entries.move_to_end(barcode)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return item
+
+    def invalidate(self, *barcodes):
+        with self._lock:
+            for barcode in barcodes:
+                self._entries.pop(barcode, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _load_item(barcode):
+    """Fetch an item and its category name in a single query."""
+    row = (
+        db.session.query(
+            Item.id, Item.barcode, Item.name, Item.price, Item.quantity,
+            Item.category_id, Category.name
+        )
+        .outerjoin(Category, Item.category_id == Category.id)
+        .filter(Item.barcode == barcode)
+        .first()
+    )
+    if row is None:
+        return None
+    return {
+        "id": row[0],
+        "barcode": row[1],
+        "name": row[2],
+        "price": row[3],
+        "quantity": row[4],
+        "category_id": row[5],
+        "category": row[6],
+    }
+
+
+item_cache = BarcodeCache()
@@ -0,0 +1,130 @@
+# utils/catalog.py
+import gzip
+import json
+import threading
+import time
+
+from sqlalchemy import func, update
+
+from models import db, Item, Category, CatalogState, CatalogTombstone
+
+STATE_ID = 1
+COLUMNS = ["id", "barcode", "name", "category_id", "price", "quantity"]
+
+
+def current_version():
+    return db.session.query(CatalogState.version).filter_by(id=STATE_ID).scalar() or 0
+
+
+def next_catalog_version():
+    """
+    Reserve the next catalog version inside the caller's transaction.
+
+    Stamp it on every item the transaction changes (Item.catalog_version);
+    it becomes visible to catalog readers together with those changes.
+    """
+    version = db.session.execute(
+        update(CatalogState)
+        .where(CatalogState.id == STATE_ID)
+        .values(version=CatalogState.version + 1)
+        .returning(CatalogState.version)
+    ).scalar()
+    if version is None:
+        version = max(
+            db.session.query(func.max(Item.catalog_version)).scalar() or 0,
+            db.session.query(func.max(CatalogTombstone.version)).scalar() or 0,
+        ) + 1
+        db.session.add(CatalogState(id=STATE_ID, version=version))
+        db.session.flush()
+    return version
+
+
+def record_deletion(item):
+    """Leave a tombstone so catalog deltas tell clients to drop `item`."""
+    db.session.merge(CatalogTombstone(item_id=item.id, barcode=item.barcode, version=next_catalog_version()))
+
+
+def _item_rows(since=None):
+    query = db.session.query(
+        Item.id, Item.barcode, Item.name, Item.category_id, Item.price, Item.quantity
+    )
+    if since is None:
+        return [list(row) for row in query.order_by(Item.id)]
+    # ordered by version so SQLite walks ix_items_catalog_version instead of
+    # scanning the table in id order to skip a sort
+    query = query.filter(Item.catalog_version > since).order_by(Item.catalog_version, Item.id)
+    return [list(row) for row in query]
+
+
+def _categories():
+    return {str(cid): name for cid, name in db.session.query(Category.id, Category.name)}
+
+
+def catalog_delta(since):
+    """Items changed and deleted after version `since`, plus the current category names."""
+    # Read the version first: anything committed after this is newer and
+    # will show up in the next delta, so nothing can be missed.
+    version = current_version()
+    deleted = [
+        item_id for (item_id,) in
+        db.session.query(CatalogTombstone.item_id).filter(CatalogTombstone.version > since)
+    ]
+    return {
+        "version": version,
+        "since": since,
+        "columns": COLUMNS,
+        "items": _item_rows(since),
+        "deleted": deleted,
+        "categories": _categories(),
+    }
+
+
+class CatalogSnapshot:
+    """
+    Gzipped, versioned snapshot of the whole item catalog for the POS page.
+
+    Rows are columnar arrays (`columns` + `items`) rather than one object per
+    item, which roughly halves the payload before compression. The snapshot
+    is rebuilt only when the catalog version has moved on, and at most once
+    per `min_age` seconds: a slightly stale snapshot plus /items/catalog/delta
+    is always current, while sales (which bump stock versions) keep coming.
+    """
+
+    def __init__(self, min_age=30):
+        self.min_age = min_age
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.min_age = app.config.get("CATALOG_SNAPSHOT_MIN_AGE", self.min_age)
+
+    def get(self):
+        version = current_version()
+        snapshot = self._snapshot
+        if snapshot and (snapshot["version"] == version or time.monotonic() - snapshot["built"] < self.min_age):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot and snapshot["version"] == version:
+                return snapshot
+            self._snapshot = self._build(version)
+            return self._snapshot
+
+    def clear(self):
+        self._snapshot = None
+
+    def _build(self, version):
+        rows = _item_rows()
+        payload = {"version": version, "columns": COLUMNS, "items": rows, "categories": _categories()}
+        body = gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), compresslevel=6)
+        return {
+            "version": version,
+            "etag": f'"catalog-{version}"',
+            "body": body,
+            "items": len(rows),
+            "built": time.monotonic(),
+        }
+
+
+catalog_snapshot = CatalogSnapshot()
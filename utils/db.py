@@ -0,0 +1,11 @@
+# utils/db.py
+from models import db
+
+
+def dialect_insert(table):
+    """Dialect-specific INSERT with ON CONFLICT support (SQLite or PostgreSQL)."""
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
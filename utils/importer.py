@@ -0,0 +1,319 @@
+# utils/importer.py
+import csv
+import io
+import json
+import math
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, EAT, Category, Item
+from utils.cache import item_cache
+from utils.catalog import next_catalog_version
+from utils.db import dialect_insert
+from utils.stock import record_counts, record_movements
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+STOCK_MODES = ("set", "add")
+MAX_QUANTITY = 2 ** 63 - 1  # SQLite INTEGER
+
+# header spellings found in supplier price lists -> field
+ALIASES = {
+    "barcode": "barcode", "code": "barcode", "sku": "barcode",
+    "name": "name", "item": "name", "item_name": "name", "description": "name",
+    "price": "price", "selling_price": "price",
+    "quantity": "quantity", "qty": "quantity", "stock": "quantity",
+    "category": "category", "category_name": "category",
+    "category_id": "category_id",
+}
+
+
+def read_csv(stream):
+    """Rows of a CSV byte stream as dicts, decoded while reading (UTF-8, BOM optional)."""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    try:
+        yield from reader
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"CSV line {reader.line_num}: {e}")
+
+
+def read_json(data):
+    """Rows of a JSON import: a list of objects or {"items": [...]}."""
+    if isinstance(data, dict):
+        data = data.get("items")
+    if not isinstance(data, list):
+        raise ValueError('JSON must be a list of items or {"items": [...]}')
+    for row in data:
+        yield row if isinstance(row, dict) else {}
+
+
+def parse_row(raw):
+    """Validate one import row; raises ValueError with a message for the report."""
+    row = {}
+    for key, value in raw.items():
+        field = ALIASES.get(str(key or "").strip().lower().replace(" ", "_"))
+        if isinstance(value, str):
+            value = value.strip()
+        if field and value not in (None, ""):
+            row[field] = value
+
+    barcode = str(row.get("barcode", ""))
+    name = str(row.get("name", ""))
+    if not barcode:
+        raise ValueError("barcode is required")
+    if not name:
+        raise ValueError("name is required")
+    if len(barcode) > 100 or len(name) > 200:
+        raise ValueError("barcode (100) or name (200) too long")
+    if "price" not in row:
+        raise ValueError("price is required")
+    try:
+        price = float(row["price"])
+    except (TypeError, ValueError):
+        raise ValueError(f"price {row['price']!r} is not a number")
+    if not math.isfinite(price):
+        # SQLite stores nan as NULL, which items.price rejects
+        raise ValueError(f"price {row['price']!r} is not a number")
+    if price < 0:
+        raise ValueError("price must not be negative")
+
+    quantity = row.get("quantity")
+    if quantity is not None:
+        try:
+            # spreadsheets export whole numbers as "12.0"
+            number = float(quantity)
+            if not math.isfinite(number) or not number.is_integer():
+                raise ValueError
+            quantity = int(number)
+        except (TypeError, ValueError, OverflowError):
+            raise ValueError(f"quantity {quantity!r} is not a whole number")
+        if abs(quantity) > MAX_QUANTITY:
+            raise ValueError(f"quantity {row['quantity']!r} is out of range")
+
+    category_id = row.get("category_id")
+    if category_id is not None:
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"category_id {category_id!r} is not a number")
+
+    return {
+        "barcode": barcode,
+        "name": name,
+        "price": price,
+        "quantity": quantity,
+        "category_id": category_id,
+        "category": str(row["category"]) if "category" in row else None,
+    }
+
+
+def _report_error(summary, row_number, message):
+    summary["error_count"] += 1
+    if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+        summary["errors"].append({"row": row_number, "error": str(message)})
+
+
+def _resolve_categories(batch, categories, create, dry_run, summary):
+    """Fill in category_id from category names, creating missing categories in one statement."""
+    missing = {}
+    for row in batch.values():
+        if row["category"] and row["category"].lower() not in categories:
+            missing.setdefault(row["category"].lower(), row["category"])
+    if missing and create and not dry_run:
+        now = datetime.now(EAT)
+        db.session.execute(
+            dialect_insert(Category.__table__).on_conflict_do_nothing(index_elements=["name"]),
+            [{"name": name, "created_at": now} for name in missing.values()],
+        )
+        for cid, name in db.session.execute(select(Category.id, Category.name).where(Category.name.in_(missing.values()))):
+            categories[name.lower()] = cid
+        summary["categories_created"] += len(missing)
+    elif missing and create:
+        # dry run: count each new category once
+        summary["categories_created"] += len(missing)
+        categories.update(dict.fromkeys(missing))
+
+    for row in batch.values():
+        if row["category"] and row["category_id"] is None:
+            row["category_id"] = categories.get(row["category"].lower())
+
+
+def _flush(batch, categories, stock, create, dry_run, summary):
+    _resolve_categories(batch, categories, create, dry_run, summary)
+    # barcode -> id of the items already stored, for the counts and the stock ledger
+    existing = dict(db.session.execute(
+        select(Item.barcode, Item.id).where(Item.barcode.in_(list(batch)))
+    ).all())
+    if dry_run:
+        summary["inserted"] += len(batch) - len(existing)
+        summary["updated"] += len(existing)
+        return
+
+    version = next_catalog_version()
+    now = datetime.now(EAT)
+    # Rows that leave quantity / category out keep the current value on update,
+    # so they need their own statement: one executemany per combination.
+    groups = {}
+    for row in batch.values():
+        key = (row["quantity"] is not None, row["category_id"] is not None)
+        groups.setdefault(key, []).append({
+            "barcode": row["barcode"],
+            "name": row["name"],
+            "price": row["price"],
+            "quantity": row["quantity"] or 0,
+            "category_id": row["category_id"],
+            "catalog_version": version,
+            "created_at": now,
+        })
+
+    if stock == "set":
+        # before the upsert overwrites them: the ledger takes the difference
+        # from the stored quantities as they are now, not from an earlier read
+        record_counts([(existing[row["barcode"]], row["quantity"]) for row in batch.values()
+                       if row["quantity"] is not None and row["barcode"] in existing], reference="import")
+
+    table = Item.__table__
+    for (has_quantity, has_category), values in groups.items():
+        stmt = dialect_insert(table)
+        changes = {
+            "name": stmt.excluded.name,
+            "price": stmt.excluded.price,
+            "catalog_version": stmt.excluded.catalog_version,
+        }
+        if has_quantity:
+            changes["quantity"] = (table.c.quantity + stmt.excluded.quantity) if stock == "add" else stmt.excluded.quantity
+        if has_category:
+            changes["category_id"] = stmt.excluded.category_id
+        db.session.execute(stmt.on_conflict_do_update(index_elements=["barcode"], set_=changes), values)
+
+    # stock ledger: what each row did to the quantity (set-mode counts are recorded above)
+    stocked = [row for row in batch.values() if row["quantity"] is not None]
+    new_barcodes = [row["barcode"] for row in stocked if row["barcode"] not in existing]
+    created = dict(db.session.execute(
+        select(Item.barcode, Item.id).where(Item.barcode.in_(new_barcodes))
+    ).all()) if new_barcodes else {}
+    movements = {"opening": [], "restock": []}
+    for row in stocked:
+        if row["barcode"] in created:
+            movements["opening"].append((created[row["barcode"]], row["quantity"]))
+        elif stock == "add":
+            movements["restock"].append((existing[row["barcode"]], row["quantity"]))
+    for kind, changes in movements.items():
+        record_movements(kind, changes, reference="import")
+    db.session.commit()
+    summary["inserted"] += len(batch) - len(existing)
+    summary["updated"] += len(existing)
+
+
+def _write_batch(batch, categories, stock, create, dry_run, summary):
+    """_flush() one batch; on a database error roll it back, record why in summary["aborted"] and return False."""
+    created = summary["categories_created"]
+    try:
+        _flush(batch, categories, stock, create, dry_run, summary)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        summary["categories_created"] = created
+        summary["aborted"] = (f"database error, batch ending at row {summary['rows']} not imported: "
+                              f"{getattr(e, 'orig', None) or e}")
+        return False
+    return True
+
+
+def import_items(rows, stock="set", create_categories=True, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Upsert items from an iterable of dicts (see read_csv / read_json).
+
+    Rows are validated as they stream in and written in batches of
+    `batch_size`: one barcode lookup (for the added/updated counts) and one
+    INSERT ... ON CONFLICT(barcode) DO UPDATE executemany per batch, each
+    batch its own transaction and catalog version. Category names are
+    resolved against one up-front load of the categories table, and missing
+    ones are created (unless create_categories=False, which rejects the
+    row). stock="set" replaces quantities, "add" adds them to current stock;
+    rows without a quantity leave stock alone. Stock changes go to the stock
+    ledger as opening (new items), restock (add) or adjustment (set) movements.
+    Invalid rows are reported by 1-based data row number and skipped; a
+    later duplicate barcode wins. A database error rolls back its batch and
+    stops the import, with the reason in summary["aborted"]; earlier batches
+    stay imported.
+    """
+    if stock not in STOCK_MODES:
+        raise ValueError(f"stock must be one of {', '.join(STOCK_MODES)}")
+
+    started = time.perf_counter()
+    summary = {
+        "rows": 0, "inserted": 0, "updated": 0, "duplicates": 0,
+        "categories_created": 0, "error_count": 0, "errors": [], "dry_run": dry_run,
+    }
+    categories = {name.lower(): cid for cid, name in db.session.query(Category.id, Category.name)}
+    category_ids = set(categories.values())
+    batch = {}
+
+    rows = iter(rows)
+    while True:
+        try:
+            raw = next(rows)
+        except StopIteration:
+            break
+        except ValueError as e:
+            # unreadable input: keep what was imported so far and say where it stopped
+            summary["aborted"] = str(e)
+            break
+        summary["rows"] += 1
+        try:
+            row = parse_row(raw)
+            if row["category_id"] is not None and row["category_id"] not in category_ids:
+                raise ValueError(f"category_id {row['category_id']} does not exist")
+            if row["category"] and not create_categories and row["category"].lower() not in categories:
+                raise ValueError(f"category {row['category']!r} does not exist")
+        except (ValueError, AttributeError) as e:
+            _report_error(summary, summary["rows"], e)
+            continue
+
+        if row["barcode"] in batch:
+            summary["duplicates"] += 1
+        batch[row["barcode"]] = row
+        if len(batch) >= batch_size:
+            written = _write_batch(batch, categories, stock, create_categories, dry_run, summary)
+            batch = {}
+            if not written:
+                break
+    if batch:
+        _write_batch(batch, categories, stock, create_categories, dry_run, summary)
+
+    if not dry_run and (summary["inserted"] or summary["updated"]):
+        item_cache.clear()
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 3)
+    summary["rows_per_second"] = round(summary["rows"] / elapsed) if elapsed else None
+    return summary
+
+
+@click.command("import-items")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--stock", type=click.Choice(STOCK_MODES), default="set", show_default=True,
+              help="Replace stock quantities or add them to current stock.")
+@click.option("--no-create-categories", is_flag=True, help="Reject rows naming an unknown category.")
+@click.option("--dry-run", is_flag=True, help="Validate and count only; write nothing.")
+@with_appcontext
+def import_items_command(path, stock, no_create_categories, dry_run):
+    """Bulk add/update items from a CSV or JSON file (matched on barcode)."""
+    with open(path, "rb") as f:
+        rows = read_json(json.load(f)) if path.lower().endswith(".json") else read_csv(f)
+        summary = import_items(rows, stock=stock, create_categories=not no_create_categories, dry_run=dry_run)
+
+    for error in summary["errors"]:
+        click.echo(f"  row {error['row']}: {error['error']}")
+    if summary.get("aborted"):
+        click.echo(f"⚠️ Stopped early: {summary['aborted']}")
+    click.echo(
+        f"{'🔎 Dry run: ' if dry_run else '✅ '}{summary['inserted']} added, {summary['updated']} updated, "
+        f"{summary['error_count']} rejected, {summary['categories_created']} new categories "
+        f"({summary['rows']} rows in {summary['seconds']}s)"
+    )
@@ -0,0 +1,151 @@
+# utils/journal.py
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime
+
+from models import EAT
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS acks (
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL,          -- synced | rejected
+    server_id INTEGER,
+    error TEXT,
+    acked_at TEXT NOT NULL
+);
+"""
+
+
+def normalize_cart(items, payment_method):
+    """Validate a cart the way record_checkout() would; raises ValueError."""
+    lines = []
+    for item in items or []:
+        price = float(item.get("price", 0))
+        qty = int(item.get("qty", 1))
+        if qty <= 0:
+            raise ValueError("Quantity must be positive")
+        lines.append({
+            "barcode": item.get("barcode", ""),
+            "name": item.get("name", ""),
+            "price": price,
+            "qty": qty,
+        })
+    if not lines:
+        raise ValueError("Cart is empty")
+    return {
+        "items": lines,
+        "payment_method": payment_method or "cash",
+        "total": sum(line["price"] * line["qty"] for line in lines),
+    }
+
+
+class SaleJournal:
+    """
+    Append-only local journal of sales taken on an offline-capable till.
+
+    A sale is confirmed as soon as its row is fsynced to the journal file
+    (WAL + synchronous=FULL). Rows are never updated or deleted: the sync
+    worker records server acknowledgements in a separate `acks` table, and
+    "pending" is simply every journal row without an ack.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def append(self, items, payment_method):
+        """Journal a cart and return the entry (with its idempotency key)."""
+        entry = normalize_cart(items, payment_method)
+        entry["key"] = uuid.uuid4().hex
+        entry["sold_at"] = datetime.now(EAT).isoformat()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO journal (key, payload, created_at) VALUES (?, ?, ?)",
+                    (entry["key"], json.dumps(entry), entry["sold_at"]),
+                )
+        finally:
+            conn.close()
+        return entry
+
+    def get(self, key):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT j.payload, a.status, a.server_id FROM journal j "
+                "LEFT JOIN acks a ON a.key = j.key WHERE j.key = ?",
+                (key,),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        entry = json.loads(row[0])
+        entry["sync_status"] = row[1] or "pending"
+        entry["server_id"] = row[2]
+        return entry
+
+    def pending(self, limit=50):
+        """Oldest unacknowledged entries first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT j.payload FROM journal j LEFT JOIN acks a ON a.key = j.key "
+                "WHERE a.key IS NULL ORDER BY j.seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [json.loads(row[0]) for row in rows]
+
+    def ack(self, results):
+        """Record server results: [{"key", "status": synced|rejected, "sale_id", "error"}]."""
+        now = datetime.now(EAT).isoformat()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO acks (key, status, server_id, error, acked_at) VALUES (?, ?, ?, ?, ?)",
+                    [(r["key"], r["status"], r.get("sale_id"), r.get("error"), now) for r in results],
+                )
+        finally:
+            conn.close()
+
+    def stats(self):
+        conn = self._connect()
+        try:
+            total = conn.execute("SELECT count(*) FROM journal").fetchone()[0]
+            by_status = dict(conn.execute("SELECT status, count(*) FROM acks GROUP BY status").fetchall())
+            oldest = conn.execute(
+                "SELECT min(j.created_at) FROM journal j LEFT JOIN acks a ON a.key = j.key WHERE a.key IS NULL"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            "journaled": total,
+            "synced": by_status.get("synced", 0),
+            "rejected": by_status.get("rejected", 0),
+            "pending": total - sum(by_status.values()),
+            "oldest_pending": oldest,
+        }
@@ -0,0 +1,209 @@
+# utils/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (le = upper bound)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += n
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+class Metrics:
+    """
+    Opt-in request and SQL instrumentation (METRICS_ENABLED=1).
+
+    Per endpoint it keeps request counts by status, latency, response-size
+    and queries-per-request histograms, and total SQL time, all counted in
+    SQLAlchemy cursor events and Flask request hooks. /metrics serves them in
+    Prometheus text format. A request issuing more than METRICS_N_PLUS_ONE
+    statements is logged with its most repeated statement, which is usually
+    a lazy relationship loaded in a loop.
+
+    Streamed responses (report exports) are measured up to the point the
+    view returns; SQL issued while the body streams is not attributed.
+
+    Counters live in the worker process: under gunicorn each worker reports
+    its own series, which Prometheus sums by instance.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.n_plus_one_threshold = 50
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.requests = Counter()  # (endpoint, method, status) -> n
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))  # (endpoint, method)
+        self.response_size = defaultdict(lambda: Histogram(SIZE_BUCKETS))  # endpoint
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))  # endpoint
+        self.sql_seconds = Counter()  # endpoint -> seconds
+        self.background_queries = 0
+        self.background_sql_seconds = 0.0
+        self.n_plus_one = Counter()  # endpoint -> warnings
+
+    def init_app(self, app, engine):
+        self.enabled = app.config.get("METRICS_ENABLED", False)
+        if not self.enabled:
+            return
+        self.n_plus_one_threshold = app.config.get("METRICS_N_PLUS_ONE", self.n_plus_one_threshold)
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule("/metrics", "metrics", self.render)
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    # --- SQLAlchemy events ---
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # on the statement's own context, not conn.info: a statement that fails
+        # never reaches after_cursor_execute, and its start time goes with it
+        context.metrics_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.metrics_start
+        if has_request_context() and "metrics_start" in g:
+            g.metrics_queries += 1
+            g.metrics_sql_seconds += elapsed
+            g.metrics_statements[statement] += 1
+        else:
+            # scheduler jobs, sync worker, CLI commands
+            with self._lock:
+                self.background_queries += 1
+                self.background_sql_seconds += elapsed
+
+    # --- Flask hooks ---
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_sql_seconds = 0.0
+        g.metrics_statements = Counter()
+
+    def _after_request(self, response):
+        if "metrics_start" not in g:
+            return response
+        elapsed = time.perf_counter() - g.metrics_start
+        endpoint = request.endpoint or "unmatched"
+        # Never touch a streamed body here: calculate_content_length() would buffer it
+        size = response.content_length
+        if size is None and response.is_sequence:
+            size = response.calculate_content_length()
+        queries = g.metrics_queries
+
+        warn = queries > self.n_plus_one_threshold
+        with self._lock:
+            self.requests[(endpoint, request.method, response.status_code)] += 1
+            self.latency[(endpoint, request.method)].observe(elapsed)
+            self.queries[endpoint].observe(queries)
+            self.sql_seconds[endpoint] += g.metrics_sql_seconds
+            if size is not None:
+                self.response_size[endpoint].observe(size)
+            if warn:
+                self.n_plus_one[endpoint] += 1
+
+        if warn:
+            statement, repeats = g.metrics_statements.most_common(1)[0]
+            current_app.logger.warning(
+                "Possible N+1: %s %s issued %d SQL statements (%.1f ms SQL); "
+                "most repeated (%dx): %s",
+                request.method, request.path, queries, g.metrics_sql_seconds * 1000,
+                repeats, " ".join(statement.split())[:200],
+            )
+        return response
+
+    # --- /metrics ---
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP fidpos_http_requests_total Requests handled, by endpoint, method and status.",
+                "# TYPE fidpos_http_requests_total counter",
+            ]
+            for (endpoint, method, status), n in sorted(self.requests.items()):
+                lines.append(f"fidpos_http_requests_total{{{_labels(endpoint=endpoint, method=method, status=status)}}} {n}")
+
+            lines += [
+                "# HELP fidpos_http_request_duration_seconds Time spent in the view, hooks included.",
+                "# TYPE fidpos_http_request_duration_seconds histogram",
+            ]
+            for (endpoint, method), hist in sorted(self.latency.items()):
+                lines.extend(hist.lines("fidpos_http_request_duration_seconds", _labels(endpoint=endpoint, method=method)))
+
+            lines += [
+                "# HELP fidpos_http_response_size_bytes Response body size (streamed bodies excluded).",
+                "# TYPE fidpos_http_response_size_bytes histogram",
+            ]
+            for endpoint, hist in sorted(self.response_size.items()):
+                lines.extend(hist.lines("fidpos_http_response_size_bytes", _labels(endpoint=endpoint)))
+
+            lines += [
+                "# HELP fidpos_sql_queries_per_request SQL statements issued per request.",
+                "# TYPE fidpos_sql_queries_per_request histogram",
+            ]
+            for endpoint, hist in sorted(self.queries.items()):
+                lines.extend(hist.lines("fidpos_sql_queries_per_request", _labels(endpoint=endpoint)))
+
+            lines += [
+                "# HELP fidpos_sql_duration_seconds_total Time spent executing SQL, by endpoint.",
+                "# TYPE fidpos_sql_duration_seconds_total counter",
+            ]
+            for endpoint, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f"fidpos_sql_duration_seconds_total{{{_labels(endpoint=endpoint)}}} {seconds:.6f}")
+
+            lines += [
+                "# HELP fidpos_n_plus_one_warnings_total Requests over the METRICS_N_PLUS_ONE statement threshold.",
+                "# TYPE fidpos_n_plus_one_warnings_total counter",
+            ]
+            for endpoint, n in sorted(self.n_plus_one.items()):
+                lines.append(f"fidpos_n_plus_one_warnings_total{{{_labels(endpoint=endpoint)}}} {n}")
+
+            lines += [
+                "# HELP fidpos_background_sql_queries_total SQL statements issued outside requests.",
+                "# TYPE fidpos_background_sql_queries_total counter",
+                f"fidpos_background_sql_queries_total {self.background_queries}",
+                "# HELP fidpos_background_sql_duration_seconds_total SQL time outside requests.",
+                "# TYPE fidpos_background_sql_duration_seconds_total counter",
+                f"fidpos_background_sql_duration_seconds_total {self.background_sql_seconds:.6f}",
+            ]
+        return Response("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+metrics = Metrics()
@@ -0,0 +1,65 @@
+# utils/mpesa_client.py
+import threading
+import time
+
+
+class TokenCache:
+    """
+    Thread-safe cache for the Daraja OAuth token.
+
+    Daraja tokens live for ~1 hour (`expires_in`); the cached token is reused
+    until `refresh_margin` seconds before expiry, so an STK push never pays
+    for an extra OAuth round trip. Only one thread refreshes at a time; the
+    others wait for it instead of stampeding the OAuth endpoint.
+    """
+
+    def __init__(self, refresh_margin=60):
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, fetch):
+        """Return a valid token, calling `fetch() -> (token, expires_in)` when needed."""
+        if self._token and time.monotonic() < self._expires_at - self.refresh_margin:
+            return self._token
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._token and time.monotonic() < self._expires_at - self.refresh_margin:
+                return self._token
+
+            token, expires_in = fetch()
+            self._token = token
+            self._expires_at = time.monotonic() + int(expires_in or 3599)
+            return token
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._expires_at = 0
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Shared keep-alive session for every Daraja call (one TLS handshake per pooled connection)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # imported here so workers that never call Daraja don't load requests at boot
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=16)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+token_cache = TokenCache()
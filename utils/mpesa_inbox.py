@@ -0,0 +1,191 @@
+# utils/mpesa_inbox.py
+import json
+import threading
+import traceback
+from datetime import datetime
+
+from sqlalchemy import bindparam, update
+
+from models import db, EAT, MpesaCallback, SaleTransaction
+from utils.db import dialect_insert
+from utils.notify import payment_events
+
+BATCH_SIZE = 200
+
+
+def _metadata(payload):
+    """Amount, receipt number and phone from a callback's CallbackMetadata, read in one pass."""
+    try:
+        items = json.loads(payload)["Body"]["stkCallback"].get("CallbackMetadata", {}).get("Item", [])
+        values = {item.get("Name"): item.get("Value") for item in items}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        values = {}
+    phone = values.get("PhoneNumber")
+    return {
+        "amount": values.get("Amount"),
+        "receipt_number": values.get("MpesaReceiptNumber"),
+        "phone": str(phone) if phone is not None else None,
+    }
+
+
+class MpesaInbox:
+    """
+    Daraja STK callbacks, acknowledged on arrival and applied in the background.
+
+    The callback route only stores the raw payload in mpesa_callbacks, keyed
+    by its CheckoutRequestID: Daraja's retries of a callback hit the unique
+    key and are dropped on insert. A daemon worker then applies new rows in
+    batches, matching them to sales through SaleTransaction.checkout_request_id
+    (written when the push is sent) with one indexed IN lookup per batch, and
+    wakes any till long-polling on those sales. Applying a callback is
+    idempotent, so a row picked up by two workers (or re-applied by link())
+    ends the same way; a scheduler job sweeps up rows whose worker died.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.app = None
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get("MPESA_CALLBACK_BATCH", self.batch_size)
+
+    def receive(self, data):
+        """Store a callback payload. False if it is a duplicate or has no CheckoutRequestID."""
+        callback = (data.get("Body") or {}).get("stkCallback") or {}
+        checkout_id = callback.get("CheckoutRequestID")
+        if not checkout_id:
+            return False
+        try:
+            result_code = int(callback.get("ResultCode"))
+        except (TypeError, ValueError):
+            result_code = None
+        stored = db.session.execute(
+            dialect_insert(MpesaCallback.__table__).on_conflict_do_nothing(index_elements=["checkout_request_id"]),
+            {
+                "checkout_request_id": str(checkout_id)[:64],
+                "result_code": result_code,
+                "result_desc": str(callback.get("ResultDesc") or "")[:255],
+                "payload": json.dumps(data),
+                "received_at": datetime.now(EAT),
+            },
+        ).rowcount
+        db.session.commit()
+        if stored:
+            self._ensure_worker()
+            self._wake.set()
+        return bool(stored)
+
+    def link(self, transaction_id, checkout_request_id):
+        """
+        Record a sent push's CheckoutRequestID on its sale.
+
+        A callback can beat the push response here; if it already arrived
+        (and was processed without a match) it is applied again now.
+        """
+        db.session.execute(
+            update(SaleTransaction).where(SaleTransaction.id == transaction_id)
+            .values(checkout_request_id=checkout_request_id)
+        )
+        early = (
+            db.session.query(MpesaCallback.id, MpesaCallback.checkout_request_id,
+                             MpesaCallback.result_code, MpesaCallback.payload)
+            .filter(MpesaCallback.checkout_request_id == checkout_request_id)
+            .all()
+        )
+        woken = self._apply(early) if early else []
+        db.session.commit()
+        self._publish(woken)
+
+    def process_pending(self):
+        """Apply every unprocessed callback, a batch per transaction. Returns how many."""
+        processed = 0
+        while True:
+            rows = (
+                db.session.query(MpesaCallback.id, MpesaCallback.checkout_request_id,
+                                 MpesaCallback.result_code, MpesaCallback.payload)
+                .filter(MpesaCallback.processed_at.is_(None))
+                .order_by(MpesaCallback.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            if not rows:
+                return processed
+            woken = self._apply(rows)
+            db.session.commit()
+            self._publish(woken)
+            processed += len(rows)
+
+    def _apply(self, rows):
+        """Apply callback rows inside the caller's transaction; returns the matched sale ids."""
+        now = datetime.now(EAT)
+        checkout_ids = [row.checkout_request_id for row in rows]
+        sales = dict(
+            db.session.query(SaleTransaction.checkout_request_id, SaleTransaction.id)
+            .filter(SaleTransaction.checkout_request_id.in_(checkout_ids))
+            .all()
+        )
+        paid = [row.checkout_request_id for row in rows if row.result_code == 0 and row.checkout_request_id in sales]
+        failed = [row.checkout_request_id for row in rows if row.result_code != 0 and row.checkout_request_id in sales]
+        if paid:
+            db.session.execute(
+                update(SaleTransaction).where(SaleTransaction.checkout_request_id.in_(paid))
+                .values(status="paid", paymenyt_method="mpesa", paid_at=now)
+            )
+        if failed:
+            # never undo a payment
+            db.session.execute(
+                update(SaleTransaction)
+                .where(SaleTransaction.checkout_request_id.in_(failed),
+                       SaleTransaction.status.is_distinct_from("paid"))
+                .values(status="failed")
+            )
+
+        table = MpesaCallback.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam("callback_id")).values(processed_at=now),
+            [{"callback_id": row.id, "sale_id": sales.get(row.checkout_request_id), **_metadata(row.payload)}
+             for row in rows],
+        )
+
+        unmatched = len(rows) - len(paid) - len(failed)
+        print(f"💳 M-Pesa callbacks: {len(paid)} paid, {len(failed)} failed"
+              + (f", {unmatched} without a sale" if unmatched else ""))
+        return [sales[checkout_id] for checkout_id in paid + failed]
+
+    def _publish(self, sale_ids):
+        # 🔔 after commit, so woken long-polls read the new status
+        for sale_id in sale_ids:
+            payment_events.publish(sale_id)
+
+    def result(self, checkout_request_id):
+        """Payment status from a received callback ("Success" / "Failed"), None if none arrived."""
+        row = db.session.query(MpesaCallback.result_code).filter_by(checkout_request_id=checkout_request_id).first()
+        if row is None:
+            return None
+        return "Success" if row.result_code == 0 else "Failed"
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="fidpos-mpesa-inbox", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    self.process_pending()
+                except Exception:
+                    db.session.rollback()
+                    traceback.print_exc()
+                finally:
+                    db.session.remove()
+
+
+mpesa_inbox = MpesaInbox()
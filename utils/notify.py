@@ -0,0 +1,49 @@
+# utils/notify.py
+import threading
+import time
+
+
+class StatusBroker:
+    """
+    In-process wake-up channel for long-polling clients.
+
+    A waiter blocks on a key (e.g. a sale id) until someone `publish()`es that
+    key or the timeout passes. Only keys with active waiters are tracked, so
+    publishing to a key nobody is waiting on costs a dict lookup.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions = {}
+        self._waiters = {}
+
+    def publish(self, key):
+        key = str(key)
+        with self._cond:
+            if key in self._waiters:
+                self._versions[key] += 1
+                self._cond.notify_all()
+
+    def wait(self, key, timeout):
+        """Block until `key` is published or `timeout` seconds pass. Returns True if woken."""
+        key = str(key)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiters[key] = self._waiters.get(key, 0) + 1
+            self._versions.setdefault(key, 0)
+            seen = self._versions[key]
+            try:
+                while self._versions[key] == seen:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                return True
+            finally:
+                self._waiters[key] -= 1
+                if not self._waiters[key]:
+                    del self._waiters[key]
+                    del self._versions[key]
+
+
+payment_events = StatusBroker()
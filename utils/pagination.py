@@ -0,0 +1,65 @@
+# utils/pagination.py
+import base64
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    """Clamp a `limit` query parameter to 1..MAX_PAGE_SIZE."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(sort_value, row_id):
+    raw = f"{sort_value.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Turn an opaque cursor back into (datetime, id). Raises ValueError if malformed."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        sort_value, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_page(query, sort_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of `query`, newest first, keyed on (sort_column, id_column).
+
+    Returns (rows, next_cursor). `next_cursor` is None on the last page. Each
+    page is a fresh indexed range scan, so the cost does not grow with the
+    page number the way OFFSET does. Rows must expose the two key columns
+    under their column names.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        # A row-value comparison lets the (sort_column, id) index serve the
+        # range directly; the equivalent OR form needs a temp B-tree sort.
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+
+def iter_keyset(query, sort_column, id_column, cursor=None, batch_size=DEFAULT_PAGE_SIZE):
+    """Yield every row of `query` from `cursor` onwards, one keyset page at a time."""
+    while True:
+        rows, cursor = keyset_page(query, sort_column, id_column, cursor, batch_size)
+        yield from rows
+        if cursor is None:
+            return
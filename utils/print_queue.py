@@ -0,0 +1,136 @@
+# utils/print_queue.py
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from utils.printer import PrinterUnavailable, initialize_printer, send_to_printer, save_receipt_fallback
+
+
+class PrintQueue:
+    """
+    Background receipt printing.
+
+    Sale routes `submit()` the formatted receipt text and return right away; a
+    single worker thread prints jobs in order over a persistent connection,
+    retrying with exponential backoff and saving the receipt to a file when
+    the printer stays unreachable. Job states: queued -> printing ->
+    printed | saved (fallback file) | dropped (queue full).
+    """
+
+    def __init__(self, maxsize=100, retries=3, backoff=0.5, history=500):
+        self.maxsize = maxsize
+        self.retries = retries
+        self.backoff = backoff
+        self.history = history
+        self.device = {"mode": "bluetooth"}
+        self._queue = queue.Queue(maxsize)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("PRINT_QUEUE_SIZE", self.maxsize)
+        self.retries = app.config.get("PRINT_RETRIES", self.retries)
+        self.backoff = app.config.get("PRINT_RETRY_BACKOFF", self.backoff)
+        self.device = {
+            "mode": app.config.get("PRINTER_MODE", "bluetooth"),
+            "usb_vid": app.config.get("PRINTER_USB_VID"),
+            "usb_pid": app.config.get("PRINTER_USB_PID"),
+            "bt_mac": app.config.get("PRINTER_BT_MAC"),
+            "network_ip": app.config.get("PRINTER_NETWORK_IP"),
+            "network_port": app.config.get("PRINTER_NETWORK_PORT", 9100),
+        }
+        with self._lock:
+            # a running worker is blocked in get() on the current queue; keep it
+            if self._worker is None or not self._worker.is_alive():
+                self._queue = queue.Queue(self.maxsize)
+
+    def submit(self, text, name="receipt"):
+        """Queue a receipt for printing and return its job id."""
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "name": name,
+            "status": "queued",
+            "attempts": 0,
+            "error": None,
+            "file": None,
+            "queued_at": datetime.now().isoformat(timespec="seconds"),
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((job_id, text))
+        except queue.Full:
+            # Don't block the sale on a backed-up printer; keep a copy instead
+            self._finish(job_id, "dropped", error="Print queue full",
+                         file=save_receipt_fallback(text, name))
+        return job_id
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="fidpos-print-worker", daemon=True
+                )
+                self._worker.start()
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(changes)
+
+    def _finish(self, job_id, status, error=None, file=None):
+        self._update(
+            job_id, status=status, error=error, file=file,
+            finished_at=datetime.now().isoformat(timespec="seconds"),
+        )
+
+    def _run(self):
+        # first receipt of this process, not worker boot
+        initialize_printer()
+        while True:
+            job_id, text = self._queue.get()
+            try:
+                self._print(job_id, text)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    def _print(self, job_id, text):
+        name = (self.status(job_id) or {}).get("name", "receipt")
+        error = None
+        for attempt in range(self.retries + 1):
+            self._update(job_id, status="printing", attempts=attempt + 1)
+            try:
+                send_to_printer(text, **self.device)
+                self._finish(job_id, "printed")
+                return
+            except PrinterUnavailable as e:
+                error = str(e)
+                break
+            except Exception as e:
+                error = str(e)
+                print(f"[printer] Job {job_id} attempt {attempt + 1} failed: {e}")
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+
+        self._finish(job_id, "saved", error=error, file=save_receipt_fallback(text, name))
+
+
+print_queue = PrintQueue()
@@ -1,20 +1,20 @@
 import datetime
 import os
+import threading
 import traceback
 
-# Try importing only stable classes first
-try:
-    from escpos.printer import Usb, Network  # Bluetooth left out
-except Exception:
-    Usb = None
-    Network = None
 
+def _get_printer_class(name):
+    """
+    escpos.printer.<name>, or None where it can't load.
 
-def _get_bluetooth_printer_class():
-    """Try loading Bluetooth class only if available."""
+    Imported on the first print rather than at startup: escpos pulls in
+    pyusb, Pillow, qrcode, ... and would otherwise add ~0.4s to every
+    worker boot.
+    """
     try:
-        from escpos.printer import Bluetooth  # imported lazily
-        return Bluetooth
+        from escpos import printer
+        return getattr(printer, name)
     except Exception:
         return None
 
@@ -39,6 +39,98 @@ def format_receipt_text(sale, shop_name="FidPOS", shop_address=""):
     return "\n".join([l for l in lines if l])
 
 
+class PrinterUnavailable(Exception):
+    """The requested mode can't work on this machine; retrying won't help."""
+
+
+# Open printer connections, reused across receipts: {(mode, address): printer}
+_connections = {}
+_connections_lock = threading.Lock()
+
+
+def _device_key(mode, usb_vid=None, usb_pid=None, bt_mac=None, network_ip=None, network_port=9100):
+    if mode == "usb":
+        return (mode, usb_vid, usb_pid)
+    if mode == "network":
+        return (mode, network_ip, network_port)
+    return (mode, bt_mac)
+
+
+def _open_printer(mode, usb_vid=None, usb_pid=None, bt_mac=None, network_ip=None, network_port=9100):
+    if mode == "usb":
+        Usb = _get_printer_class("Usb")
+        if not Usb:
+            raise PrinterUnavailable("USB printing not supported on this device.")
+        return Usb(int(usb_vid, 16), int(usb_pid, 16))
+
+    if mode == "network":
+        Network = _get_printer_class("Network")
+        if not Network or not network_ip:
+            raise PrinterUnavailable("Network printer not configured.")
+        return Network(network_ip, port=network_port)
+
+    if mode == "bluetooth":
+        Bluetooth = _get_printer_class("Bluetooth")
+        if not Bluetooth:
+            raise PrinterUnavailable("Bluetooth not supported on this device.")
+        return Bluetooth(bt_mac)
+
+    raise PrinterUnavailable(f"Unsupported mode: {mode}")
+
+
+def close_printer(mode, **device):
+    """Drop a cached connection so the next job reconnects."""
+    key = _device_key(mode, **device)
+    with _connections_lock:
+        p = _connections.pop(key, None)
+    if p is not None:
+        try:
+            p.close()
+        except Exception:
+            pass
+
+
+def send_to_printer(text, mode="network", **device):
+    """
+    Print `text` on a persistent connection, opening it on first use.
+
+    On any failure the connection is dropped (so the next attempt reconnects)
+    and the exception is re-raised for the caller to retry or fall back.
+    """
+    key = _device_key(mode, **device)
+    with _connections_lock:
+        p = _connections.get(key)
+        if p is None:
+            p = _connections[key] = _open_printer(mode, **device)
+
+    try:
+        if isinstance(text, bytes):
+            # pre-rendered ESC/POS from utils.receipts, cut included
+            p._raw(text)
+        else:
+            p.text(text + "\n")
+            p.cut()
+    except Exception:
+        close_printer(mode, **device)
+        raise
+
+
+def save_receipt_fallback(text, name):
+    os.makedirs("receipts", exist_ok=True)
+    stamp = int(datetime.datetime.now().timestamp())
+    if isinstance(text, bytes):
+        # pre-rendered ESC/POS, kept as-is to send to a printer later
+        fname = os.path.join("receipts", f"{name}_{stamp}.bin")
+        with open(fname, "wb") as f:
+            f.write(text)
+    else:
+        fname = os.path.join("receipts", f"{name}_{stamp}.txt")
+        with open(fname, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(f"[printer] Saved receipt to {fname}")
+    return fname
+
+
 def print_receipt(
     sale,
     shop_name="FidPOS",
@@ -50,68 +142,29 @@ def print_receipt(
     network_ip=None,
     network_port=9100,
 ):
+    """
+    Print synchronously. Request handlers should use utils.print_queue instead
+    so a slow or missing printer never blocks the response.
+    """
     text = format_receipt_text(sale, shop_name, shop_address)
     print(f"[printer] Printing mode: {mode}")
 
-    def _save_fallback():
-        os.makedirs("receipts", exist_ok=True)
-        fname = os.path.join(
-            "receipts", f"receipt_{sale.id}_{int(datetime.datetime.now().timestamp())}.txt"
-        )
-        with open(fname, "w", encoding="utf-8") as f:
-            f.write(text)
-        print(f"[printer] Saved receipt to {fname}")
-        return False
-
     try:
-        if mode == "usb" and Usb:
-            try:
-                p = Usb(int(usb_vid, 16), int(usb_pid, 16))
-                p.text(text + "\n")
-                p.cut()
-                print("[printer] USB print done.")
-                return True
-            except Exception as e:
-                print("[printer] USB print failed:", e)
-                traceback.print_exc()
-                return _save_fallback()
-
-        elif mode == "network" and Network and network_ip:
-            try:
-                p = Network(network_ip, port=network_port)
-                p.text(text + "\n")
-                p.cut()
-                print("[printer] Network print done.")
-                return True
-            except Exception as e:
-                print("[printer] Network print failed:", e)
-                traceback.print_exc()
-                return _save_fallback()
-
-        elif mode == "bluetooth":
-            Bluetooth = _get_bluetooth_printer_class()
-            if not Bluetooth:
-                print("[printer] Bluetooth not supported on this device.")
-                return _save_fallback()
-            try:
-                p = Bluetooth(bt_mac)
-                p.text(text + "\n")
-                p.cut()
-                print("[printer] Bluetooth print done.")
-                return True
-            except Exception as e:
-                print("[printer] Bluetooth print failed:", e)
-                traceback.print_exc()
-                return _save_fallback()
-
-        else:
-            print("[printer] Unsupported mode — saving to file.")
-            return _save_fallback()
-
+        send_to_printer(
+            text, mode,
+            usb_vid=usb_vid, usb_pid=usb_pid, bt_mac=bt_mac,
+            network_ip=network_ip, network_port=network_port,
+        )
+        print(f"[printer] {mode} print done.")
+        return True
+    except PrinterUnavailable as e:
+        print(f"[printer] {e}")
     except Exception as e:
-        print("[printer] Unexpected error:", e)
+        print(f"[printer] {mode} print failed:", e)
         traceback.print_exc()
-        return _save_fallback()
+
+    save_receipt_fallback(text, f"receipt_{sale.id}")
+    return False
 
 def initialize_printer():
     """
@@ -119,12 +172,3 @@ def initialize_printer():
     Replace with real printer setup when hardware is available.
     """
     print("🖨️ Printer initialization skipped (no adapter detected).")
-
-def print_receipt(sale_data):
-    """
-    Mock print function — would normally send receipt data to printer.
-    """
-    print("🧾 Mock printing receipt:")
-    for key, value in sale_data.items():
-        print(f"  {key}: {value}")
-    print("✅ Receipt printed (mock).")
\ No newline at end of file
@@ -0,0 +1,112 @@
+# utils/receipts.py
+"""
+Receipts rendered once, at checkout, and stored gzipped in the receipts table.
+
+Each SaleTransaction gets its receipt page (receipt.html) and the ESC/POS
+byte stream for the till printer, built from the cart lines record_checkout()
+already holds. Viewing or reprinting a receipt is then one primary-key read
+of a blob: no template rendering and no transaction.items load. Sales
+recorded before this table existed are rendered on first view and stored.
+"""
+import gzip
+from datetime import datetime
+
+from flask import render_template
+from sqlalchemy import select
+
+from models import db, EAT, Receipt, Sale, SaleTransaction
+from utils.db import dialect_insert
+
+SHOP_NAME = "FidPOS Store"
+WIDTH = 32  # characters per line on 58mm paper
+
+# ESC/POS commands
+INIT = b"\x1b@"
+ALIGN_LEFT, ALIGN_CENTER = b"\x1ba\x00", b"\x1ba\x01"
+BOLD_ON, BOLD_OFF = b"\x1bE\x01", b"\x1bE\x00"
+FEED_AND_CUT = b"\x1bd\x04\x1dV\x00"
+
+
+def render_html(lines, total, sold_at, shop_name=SHOP_NAME):
+    """receipt.html for `lines` of (item_name, quantity, price, total)."""
+    return render_template(
+        "receipt.html",
+        items=[{"item_name": name, "quantity": qty, "price": price, "total": line_total}
+               for name, qty, price, line_total in lines],
+        total=total,
+        shop_name=shop_name,
+        date=sold_at,
+    )
+
+
+def _columns(left, right):
+    return f"{left[:WIDTH - len(right) - 1]:<{WIDTH - len(right)}}{right}"
+
+
+def render_escpos(lines, total, sold_at, shop_name=SHOP_NAME):
+    """The printer's byte stream for the same receipt, ending with a cut."""
+    rule = "-" * WIDTH + "\n"
+    body = [rule]
+    for name, qty, price, line_total in lines:
+        body.append(f"{name[:WIDTH]}\n")
+        body.append(_columns(f"  {qty} x {price:.2f}", f"{line_total:.2f}") + "\n")
+    body.append(rule)
+
+    def encode(text):
+        return text.encode("cp437", errors="replace")
+
+    return b"".join([
+        INIT,
+        ALIGN_CENTER, BOLD_ON, encode(shop_name[:WIDTH] + "\n"), BOLD_OFF,
+        ALIGN_LEFT, encode("".join(body)),
+        BOLD_ON, encode(_columns("TOTAL", f"KSh {total:.2f}") + "\n"), BOLD_OFF,
+        encode(rule),
+        ALIGN_CENTER, encode(f"{sold_at.strftime('%Y-%m-%d %H:%M:%S')}\nThank you for shopping with us!\n"),
+        FEED_AND_CUT,
+    ])
+
+
+def store_receipt(transaction_id, lines, total, sold_at):
+    """
+    Render and store a transaction's receipt, replacing any earlier one.
+
+    Runs inside the caller's transaction, like record_sales(), so a sale
+    and its receipt commit together.
+    """
+    values = {
+        "transaction_id": transaction_id,
+        "html": gzip.compress(render_html(lines, total, sold_at).encode("utf-8"), compresslevel=6),
+        "escpos": gzip.compress(render_escpos(lines, total, sold_at), compresslevel=6),
+        "rendered_at": datetime.now(EAT),
+    }
+    stmt = dialect_insert(Receipt.__table__)
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["transaction_id"],
+            set_={"html": stmt.excluded.html, "escpos": stmt.excluded.escpos, "rendered_at": stmt.excluded.rendered_at},
+        ),
+        values,
+    )
+
+
+def _render_stored_sale(transaction_id):
+    """Render and store a receipt from the sales tables (older sales). False if no such transaction."""
+    head = db.session.query(SaleTransaction.total, SaleTransaction.sold_at).filter_by(id=transaction_id).first()
+    if head is None:
+        return False
+    lines = db.session.execute(
+        select(Sale.item_name, Sale.quantity, Sale.price, Sale.total)
+        .where(Sale.transaction_id == transaction_id).order_by(Sale.id)
+    ).all()
+    store_receipt(transaction_id, lines, head.total or 0, head.sold_at or datetime.now(EAT))
+    db.session.commit()
+    return True
+
+
+def get_receipt(transaction_id, kind):
+    """A transaction's stored receipt, still gzipped: kind is "html" or "escpos". None if unknown."""
+    column = Receipt.__table__.c[kind]
+    blob = db.session.execute(select(column).where(Receipt.transaction_id == transaction_id)).scalar()
+    if blob is None and _render_stored_sale(transaction_id):
+        blob = db.session.execute(select(column).where(Receipt.transaction_id == transaction_id)).scalar()
+    return blob
@@ -1,25 +1,236 @@
 # utils/restore.py
-import sqlite3
+import gzip
+import hashlib
+import json
 import os
+import shutil
+import sqlite3
+from contextlib import closing
+
+BATCH_STATEMENTS = 2000
+
+
+def _open_backup(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_statements(f):
+    """Yield complete SQL statements from a dump, one at a time (never the whole file)."""
+    buf = []
+    for line in f:
+        buf.append(line)
+        if sqlite3.complete_statement("".join(buf) if len(buf) > 1 else line):
+            yield "".join(buf).strip()
+            buf = []
+    leftover = "".join(buf).strip()
+    if leftover:
+        yield leftover
+
+
+def _is_index(statement):
+    head = statement[:32].upper()
+    return head.startswith("CREATE INDEX") or head.startswith("CREATE UNIQUE INDEX")
+
+
+def _execute_batch(conn, statements):
+    """Run a batch of statements as one transaction, parsed in C by executescript."""
+    if statements:
+        conn.executescript("BEGIN;\n" + "\n".join(statements) + "\nCOMMIT;")
+
+
+def _replace_database(tmp_path, db_path):
+    """Swap a fully restored file into place, dropping the old WAL/SHM files."""
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(tmp_path, db_path)
 
-def restore_database(backup_file="backup.sql", db_path="fidpos.db"):
+
+def restore_database(backup_file="backup.sql", db_path="fidpos.db", verify=True):
     """
     Restore the SQLite database from a backup SQL file.
+
+    The dump is parsed statement by statement and loaded into a scratch file
+    in large transactions with synchronous=OFF / journal_mode=MEMORY. Index
+    creation is deferred to the end, then the finished file replaces
+    `db_path`. Binary snapshots (*.db.gz, *.json manifests) are handed to
+    restore_snapshot(). Stop the app before restoring.
     """
+    if backup_file.endswith(".json") or backup_file.endswith(".db.gz") or backup_file.endswith(".db"):
+        return restore_snapshot(backup_file, db_path, verify=verify)
+
     if not os.path.exists(backup_file):
         print("⚠️ No backup file found — skipping restore.")
         return
 
+    tmp_path = db_path + ".restoring"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        # closed before the except below deletes the file, also on failure
+        with closing(sqlite3.connect(tmp_path, isolation_level=None)) as conn:
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("PRAGMA journal_mode=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")  # 64 MB
 
-        with open(backup_file, "r", encoding="utf-8") as f:
-            sql = f.read()
-            cursor.executescript(sql)
+            indexes = []
+            batch = []
+            with _open_backup(backup_file) as f:
+                for statement in iter_statements(f):
+                    upper = statement.upper()
+                    # the dump's own transaction markers; we batch our own
+                    if upper in ("BEGIN TRANSACTION;", "COMMIT;"):
+                        continue
+                    if _is_index(statement):
+                        indexes.append(statement)
+                        continue
+                    batch.append(statement)
+                    if len(batch) >= BATCH_STATEMENTS:
+                        _execute_batch(conn, batch)
+                        batch = []
+            _execute_batch(conn, batch)
 
-        conn.commit()
-        conn.close()
+            # Rebuild indexes once over the loaded tables instead of per insert
+            _execute_batch(conn, indexes)
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute("PRAGMA synchronous=FULL")
+
+        _replace_database(tmp_path, db_path)
         print("✅ Database restored successfully.")
     except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"❌ Restore failed: {e}")
+        return
+
+    if verify:
+        return verify_restore(db_path, _load_fingerprint(backup_file + ".json"))
+
+
+def restore_snapshot(path, db_path="fidpos.db", apply_wal=True, verify=True):
+    """
+    Restore from a backup-API snapshot (utils.backup.snapshot_database).
+
+    `path` is a manifest (*.json) or a snapshot file (*.db.gz / *.db). With a
+    manifest and `apply_wal`, the shipped WAL segments are replayed on top,
+    bringing the database up to the last shipped commit.
+    """
+    if not os.path.exists(path):
+        print("⚠️ No backup file found — skipping restore.")
+        return
+
+    backup_dir = os.path.dirname(path)
+    manifest = None
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        snapshot = os.path.join(backup_dir, manifest["snapshot"])
+    else:
+        snapshot = path
+
+    tmp_path = db_path + ".restoring"
+    for leftover in (tmp_path, tmp_path + "-wal", tmp_path + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+    try:
+        opener = gzip.open if snapshot.endswith(".gz") else open
+        with opener(snapshot, "rb") as f_in, open(tmp_path, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
+        wal = manifest.get("wal") if manifest else None
+        segments = wal["segments"] if wal and apply_wal else []
+        if segments:
+            with open(tmp_path + "-wal", "wb") as f_out:
+                f_out.write(bytes.fromhex(wal["header"]))
+                for segment in segments:
+                    with gzip.open(os.path.join(backup_dir, segment), "rb") as f_in:
+                        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
+        # Opening the file replays any WAL; the checkpoint folds it into the
+        # main file so the result is a single self-contained database.
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if os.path.exists(tmp_path + "-wal"):
+            os.remove(tmp_path + "-wal")
+        if os.path.exists(tmp_path + "-shm"):
+            os.remove(tmp_path + "-shm")
+
+        _replace_database(tmp_path, db_path)
+        print(f"✅ Database restored from snapshot ({len(segments)} WAL segments applied).")
+    except Exception as e:
+        for leftover in (tmp_path, tmp_path + "-wal", tmp_path + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
         print(f"❌ Restore failed: {e}")
+        return
+
+    if verify:
+        # The manifest fingerprint describes the snapshot alone; WAL segments
+        # legitimately add rows on top of it.
+        expected = manifest.get("fingerprint") if manifest and not segments else None
+        return verify_restore(db_path, expected)
+
+
+# --- Verification ------------------------------------------------------------
+
+def database_fingerprint(conn):
+    """Row count and SHA-256 (rows in rowid order) for every user table."""
+    tables = [
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )
+    ]
+    fingerprint = {}
+    for table in tables:
+        digest = hashlib.sha256()
+        rows = 0
+        for row in conn.execute(f'SELECT * FROM "{table}" ORDER BY rowid'):
+            digest.update(repr(row).encode("utf-8"))
+            rows += 1
+        fingerprint[table] = {"rows": rows, "checksum": digest.hexdigest()}
+    return fingerprint
+
+
+def _load_fingerprint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_restore(db_path, expected=None):
+    """
+    Check a restored database: PRAGMA integrity_check plus per-table row
+    counts and checksums, compared against `expected` when the backup
+    recorded one. Returns a report dict with an overall "ok" flag.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        actual = database_fingerprint(conn)
+    finally:
+        conn.close()
+
+    mismatches = []
+    if expected is not None:
+        for table in sorted(set(expected) | set(actual)):
+            if expected.get(table) != actual.get(table):
+                mismatches.append({"table": table, "expected": expected.get(table), "actual": actual.get(table)})
+
+    report = {
+        "ok": integrity == "ok" and not mismatches,
+        "integrity": integrity,
+        "compared": expected is not None,
+        "tables": actual,
+        "mismatches": mismatches,
+    }
+    if report["ok"]:
+        print(f"✅ Restore verified ({sum(t['rows'] for t in actual.values())} rows).")
+    else:
+        print(f"❌ Restore verification failed: {integrity} / {mismatches}")
+    return report
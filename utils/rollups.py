@@ -0,0 +1,271 @@
+# utils/rollups.py
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, extract, func, insert, select, union_all
+
+from models import (
+    db, Category, Item, Sale,
+    SalesDaily, SalesHourly, ItemSalesDaily, ItemSalesMonthly, CategorySalesDaily,
+)
+from utils.db import dialect_insert
+
+COUNTERS = ("sale_count", "quantity", "revenue")
+UNCATEGORISED = 0
+
+# model -> primary key columns
+ROLLUPS = (
+    (SalesDaily, ("day",)),
+    (SalesHourly, ("day", "hour")),
+    (ItemSalesDaily, ("day", "barcode")),
+    (ItemSalesMonthly, ("month", "barcode")),
+    (CategorySalesDaily, ("day", "category_id")),
+)
+
+
+def _upsert(model, keys, rows):
+    """Add `rows` to the rollup, incrementing the counters of existing buckets."""
+    if not rows:
+        return
+    table = model.__table__
+    stmt = dialect_insert(table).values(rows)
+    changes = {c: table.c[c] + stmt.excluded[c] for c in COUNTERS}
+    if "item_name" in table.c:
+        changes["item_name"] = stmt.excluded.item_name
+    db.session.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=changes))
+
+
+def record_rollups(lines):
+    """
+    Add freshly inserted sales to the rollup tables.
+
+    `lines` is an iterable of (sold_at, barcode, item_name, category_id,
+    quantity, total). Like record_sales(), this runs inside the caller's
+    transaction, so the rollups commit or roll back together with the Sale
+    rows. One upsert per rollup table, however many lines the cart has.
+    """
+    buckets = {model: defaultdict(lambda: dict.fromkeys(COUNTERS, 0)) for model, _ in ROLLUPS}
+    names = {}
+    for sold_at, barcode, item_name, category_id, quantity, total in lines:
+        day = sold_at.date()
+        month = day.strftime("%Y-%m")
+        names[barcode] = item_name
+        for model, key in (
+            (SalesDaily, (day,)),
+            (SalesHourly, (day, sold_at.hour)),
+            (ItemSalesDaily, (day, barcode)),
+            (ItemSalesMonthly, (month, barcode)),
+            (CategorySalesDaily, (day, category_id or UNCATEGORISED)),
+        ):
+            bucket = buckets[model][key]
+            bucket["sale_count"] += 1
+            bucket["quantity"] += quantity
+            bucket["revenue"] += total
+
+    for model, keys in ROLLUPS:
+        rows = []
+        for key, counters in buckets[model].items():
+            row = dict(zip(keys, key), **counters)
+            if "barcode" in keys:
+                row["item_name"] = names[row["barcode"]]
+            rows.append(row)
+        _upsert(model, keys, rows)
+
+
+def _day_range(start=None, end=None):
+    """(first_day, last_day) as dates from YYYY-MM-DD strings; invalid values are ignored."""
+    days = []
+    for value in (start, end):
+        try:
+            days.append(datetime.strptime(value, "%Y-%m-%d").date() if value else None)
+        except ValueError:
+            days.append(None)
+    return days
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def rebuild_rollups(start=None, end=None):
+    """
+    Recompute the rollups for [start, end] (YYYY-MM-DD, inclusive; default:
+    all history) straight from the sales table with INSERT ... SELECT.
+
+    The monthly table is rebuilt for every month the range touches. Sales are
+    bucketed by their stored (EAT) time; the category rollup uses each item's
+    current category, since sales don't record one.
+    """
+    first, last = _day_range(start, end)
+    day = func.date(Sale.sold_at)
+    month = func.substr(day, 1, 7)
+    counters = (func.count(Sale.id), func.coalesce(func.sum(Sale.quantity), 0), func.sum(Sale.total))
+
+    def in_range(query, lo, hi):
+        if lo:
+            query = query.where(Sale.sold_at >= datetime.combine(lo, datetime.min.time()))
+        if hi:
+            query = query.where(Sale.sold_at < datetime.combine(hi, datetime.min.time()))
+        return query
+
+    day_bounds = (first, last + timedelta(days=1) if last else None)
+    month_bounds = (_month_start(first) if first else None, _next_month(last) if last else None)
+
+    for model, _ in ROLLUPS:
+        stmt = delete(model)
+        if model is ItemSalesMonthly:
+            if first:
+                stmt = stmt.where(model.month >= first.strftime("%Y-%m"))
+            if last:
+                stmt = stmt.where(model.month <= last.strftime("%Y-%m"))
+        else:
+            if first:
+                stmt = stmt.where(model.day >= first)
+            if last:
+                stmt = stmt.where(model.day <= last)
+        db.session.execute(stmt)
+
+    hour = extract("hour", Sale.sold_at)
+    category_id = func.coalesce(Item.category_id, UNCATEGORISED)
+    selects = (
+        (SalesDaily, ["day"], select(day, *counters).group_by(day), day_bounds),
+        (SalesHourly, ["day", "hour"], select(day, hour, *counters).group_by(day, hour), day_bounds),
+        (ItemSalesDaily, ["day", "barcode", "item_name"],
+         select(day, Sale.barcode, func.max(Sale.item_name), *counters).group_by(day, Sale.barcode),
+         day_bounds),
+        (ItemSalesMonthly, ["month", "barcode", "item_name"],
+         select(month, Sale.barcode, func.max(Sale.item_name), *counters).group_by(month, Sale.barcode),
+         month_bounds),
+        (CategorySalesDaily, ["day", "category_id"],
+         select(day, category_id, *counters)
+         .select_from(Sale).outerjoin(Item, Item.barcode == Sale.barcode)
+         .group_by(day, category_id),
+         day_bounds),
+    )
+    for model, keys, query, (lo, hi) in selects:
+        db.session.execute(insert(model).from_select(keys + list(COUNTERS), in_range(query, lo, hi)))
+
+
+def ensure_rollups():
+    """Backfill the rollups once when they are empty but sales already exist."""
+    if db.session.query(SalesDaily.day).first() is None and db.session.query(Sale.id).first() is not None:
+        rebuild_rollups()
+        db.session.commit()
+        print("✅ Sales rollups backfilled from existing sales.")
+
+
+# --- Report queries ----------------------------------------------------------
+
+def _item_rows(first, last):
+    """
+    Per-item rollup rows covering [first, last]: whole months from
+    item_sales_monthly, the partial months at either end from item_sales_daily.
+    """
+    def monthly(lo=None, hi=None):
+        query = select(ItemSalesMonthly.barcode, ItemSalesMonthly.item_name,
+                       *(ItemSalesMonthly.__table__.c[c] for c in COUNTERS))
+        if lo:
+            query = query.where(ItemSalesMonthly.month >= lo.strftime("%Y-%m"))
+        if hi:
+            query = query.where(ItemSalesMonthly.month < hi.strftime("%Y-%m"))
+        return query
+
+    def daily(lo, hi):
+        return select(ItemSalesDaily.barcode, ItemSalesDaily.item_name,
+                      *(ItemSalesDaily.__table__.c[c] for c in COUNTERS)) \
+            .where(ItemSalesDaily.day >= lo, ItemSalesDaily.day < hi)
+
+    # [lo, hi) is the run of whole months; the partial edges come from the daily table
+    end = last + timedelta(days=1) if last else None
+    lo = (first if first.day == 1 else _next_month(first)) if first else None
+    hi = (end if end.day == 1 else _month_start(last)) if last else None
+    if lo and hi and lo >= hi:
+        return daily(first, end)  # no whole month in the range
+
+    parts = [monthly(lo, hi)]
+    if first and first < lo:
+        parts.append(daily(first, lo))
+    if last and hi < end:
+        parts.append(daily(hi, end))
+    return parts[0] if len(parts) == 1 else union_all(*parts)
+
+
+def sales_summary(start=None, end=None, top=10):
+    """Revenue by day and hour, top sellers and category mix, from the rollups only."""
+    first, last = _day_range(start, end)
+
+    def in_range(query, model):
+        if first:
+            query = query.filter(model.day >= first)
+        if last:
+            query = query.filter(model.day <= last)
+        return query
+
+    def sums(columns):
+        return (
+            func.coalesce(func.sum(columns.sale_count), 0),
+            func.coalesce(func.sum(columns.quantity), 0),
+            func.coalesce(func.sum(columns.revenue), 0),
+        )
+
+    def counters(row, offset):
+        return {
+            "sale_count": int(row[offset]),
+            "quantity": int(row[offset + 1]),
+            "revenue": float(row[offset + 2]),
+        }
+
+    totals = in_range(db.session.query(*sums(SalesDaily)), SalesDaily).one()
+
+    by_day = in_range(
+        db.session.query(SalesDaily.day, SalesDaily.sale_count, SalesDaily.quantity, SalesDaily.revenue),
+        SalesDaily,
+    ).order_by(SalesDaily.day)
+
+    by_hour = in_range(
+        db.session.query(SalesHourly.hour, *sums(SalesHourly)), SalesHourly
+    ).group_by(SalesHourly.hour).order_by(SalesHourly.hour)
+
+    items = _item_rows(first, last).subquery()
+    top_items = (
+        db.session.query(items.c.barcode, func.max(items.c.item_name), *sums(items.c))
+        .group_by(items.c.barcode)
+        .order_by(func.sum(items.c.revenue).desc())
+        .limit(top)
+    )
+
+    categories = in_range(
+        db.session.query(CategorySalesDaily.category_id, Category.name, *sums(CategorySalesDaily))
+        .outerjoin(Category, Category.id == CategorySalesDaily.category_id),
+        CategorySalesDaily,
+    ).group_by(CategorySalesDaily.category_id, Category.name).order_by(func.sum(CategorySalesDaily.revenue).desc())
+
+    return {
+        "start": first.isoformat() if first else None,
+        "end": last.isoformat() if last else None,
+        "totals": counters(totals, 0),
+        "by_day": [dict(day=row[0].isoformat(), **counters(row, 1)) for row in by_day],
+        "by_hour": [dict(hour=row[0], **counters(row, 1)) for row in by_hour],
+        "top_items": [dict(barcode=row[0], name=row[1], **counters(row, 2)) for row in top_items],
+        "categories": [
+            dict(category_id=row[0] or None, name=row[1] or "Uncategorised", **counters(row, 2))
+            for row in categories
+        ],
+    }
+
+
+@click.command("backfill-rollups")
+@click.option("--start", default=None, help="First day to rebuild (YYYY-MM-DD); default: all history.")
+@click.option("--end", default=None, help="Last day to rebuild (YYYY-MM-DD, inclusive).")
+@with_appcontext
+def backfill_rollups_command(start, end):
+    """Rebuild the sales rollup tables from the sales table."""
+    rebuild_rollups(start, end)
+    db.session.commit()
+    click.echo(f"✅ Sales rollups rebuilt ({start or 'beginning'} → {end or 'today'}).")
@@ -0,0 +1,249 @@
+# utils/scheduler.py
+import atexit
+import os
+import socket
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, or_, update
+
+from models import db, EAT, JobRun, ScheduledJob, SchedulerLease
+from utils.db import dialect_insert
+
+LEASE_NAME = "scheduler"
+HISTORY_DAYS = 30
+HISTORY_SHOWN = 10
+
+Job = namedtuple("Job", "id name func args interval")
+
+
+def _now():
+    # stored datetimes are naive EAT wall clock
+    return datetime.now(EAT).replace(tzinfo=None)
+
+
+class JobScheduler:
+    """
+    Background jobs that run once per deployment, not once per worker.
+
+    Every worker process ticks every SCHEDULER_TICK_SECONDS, but only the
+    worker holding the leader lease (a row in scheduler_leases, renewed on
+    each tick and taken over once it expires) runs jobs. Each job's next due
+    time lives in scheduled_jobs, and a run is claimed by moving it forward
+    with a compare-and-set UPDATE, so even two workers that both think they
+    lead cannot start the same run twice. Runs, durations and errors are
+    kept in job_runs for HISTORY_DAYS and shown at /settings/jobs.
+
+    Jobs run in the ticking thread inside an app context, one at a time.
+    A new job's first run is one interval after it is first seen, like the
+    interval triggers this replaces.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = True
+        self.tick_seconds = 30
+        self.lease_seconds = 120
+        self.jobs = {}
+        self._scheduler = None
+        self._leader = False
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get("SCHEDULER_ENABLED", True)
+        self.tick_seconds = app.config.get("SCHEDULER_TICK_SECONDS", self.tick_seconds)
+        self.lease_seconds = app.config.get("SCHEDULER_LEASE_SECONDS", self.lease_seconds)
+
+    def add_job(self, id, func, interval, name=None, args=()):
+        """Run func(*args) every `interval` (a timedelta)."""
+        self.jobs[id] = Job(id, name or id, func, tuple(args), interval)
+
+    def start(self):
+        if not self.enabled or self._scheduler is not None:
+            return
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from apscheduler.triggers.interval import IntervalTrigger
+
+        self._scheduler = BackgroundScheduler()
+        self._scheduler.add_job(
+            func=self.tick,
+            trigger=IntervalTrigger(seconds=self.tick_seconds),
+            id="scheduler_tick",
+            name="Run due background jobs (leader only)",
+            max_instances=1,
+            coalesce=True,
+        )
+        self._scheduler.start()
+        atexit.register(self.shutdown)
+
+    def shutdown(self):
+        if self._scheduler is None:
+            return
+        self._scheduler.shutdown(wait=False)
+        self._scheduler = None
+        if self._leader:
+            # hand over right away instead of after the lease runs out
+            with self.app.app_context():
+                db.session.execute(
+                    update(SchedulerLease)
+                    .where(SchedulerLease.name == LEASE_NAME, SchedulerLease.owner == self.owner)
+                    .values(expires_at=_now())
+                )
+                db.session.commit()
+            self._leader = False
+
+    @property
+    def owner(self):
+        # evaluated per call: gunicorn may fork workers from an app built in the master
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    # --- leader election ---
+    def _acquire_lease(self):
+        """Renew our lease or take over an expired one. Returns True while we lead."""
+        now = _now()
+        values = {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_seconds)}
+        held = db.session.execute(
+            update(SchedulerLease)
+            .where(SchedulerLease.name == LEASE_NAME,
+                   or_(SchedulerLease.owner == self.owner, SchedulerLease.expires_at < now))
+            .values(**values)
+        ).rowcount
+        if not held:
+            held = db.session.execute(
+                dialect_insert(SchedulerLease.__table__).on_conflict_do_nothing(index_elements=["name"]),
+                {"name": LEASE_NAME, **values},
+            ).rowcount
+        db.session.commit()
+
+        if held and not self._leader:
+            print(f"✅ Scheduler: {self.owner} is now running background jobs.")
+        self._leader = bool(held)
+        return self._leader
+
+    # --- running jobs ---
+    def tick(self):
+        with self.app.app_context():
+            try:
+                if self._acquire_lease():
+                    self._run_due_jobs()
+            except Exception as e:
+                db.session.rollback()
+                print(f"⚠️ Scheduler tick failed: {e}")
+            finally:
+                db.session.remove()
+
+    def _run_due_jobs(self):
+        due = dict(
+            db.session.query(ScheduledJob.id, ScheduledJob.next_run_at)
+            .filter(ScheduledJob.id.in_(list(self.jobs)))
+            .all()
+        )
+        now = _now()
+        for job in self.jobs.values():
+            next_run_at = due.get(job.id)
+            if next_run_at is None or next_run_at > now + job.interval:
+                # new job, or its interval was shortened: due one interval from now
+                db.session.execute(
+                    dialect_insert(ScheduledJob.__table__).on_conflict_do_update(
+                        index_elements=["id"], set_={"next_run_at": now + job.interval}
+                    ),
+                    {"id": job.id, "next_run_at": now + job.interval},
+                )
+                db.session.commit()
+            elif next_run_at <= now:
+                # long jobs can outlast the lease; check we still lead before each one
+                if not self._acquire_lease():
+                    return
+                self._run(job, next_run_at)
+
+    def _run(self, job, due_at):
+        started_at = _now()
+        # keep the cadence, but collapse runs missed while nobody was up into one
+        next_run_at = due_at + job.interval
+        if next_run_at <= started_at:
+            next_run_at = started_at + job.interval
+        claimed = db.session.execute(
+            update(ScheduledJob)
+            .where(ScheduledJob.id == job.id, ScheduledJob.next_run_at == due_at)
+            .values(next_run_at=next_run_at)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            return
+        run = JobRun(job_id=job.id, owner=self.owner, started_at=started_at, status="running")
+        db.session.add(run)
+        db.session.commit()
+        run_id = run.id
+
+        start = time.perf_counter()
+        status, error = "ok", None
+        try:
+            job.func(*job.args)
+        except Exception as e:
+            db.session.rollback()
+            status, error = "failed", str(e)[:500]
+            print(f"❌ Job {job.id} failed: {e}")
+        seconds = time.perf_counter() - start
+
+        db.session.execute(
+            update(JobRun).where(JobRun.id == run_id)
+            .values(finished_at=_now(), seconds=round(seconds, 3), status=status, error=error)
+        )
+        db.session.execute(
+            delete(JobRun).where(JobRun.job_id == job.id,
+                                 JobRun.started_at < started_at - timedelta(days=HISTORY_DAYS))
+        )
+        db.session.commit()
+
+    def run_soon(self, job_id):
+        """Make a job due now; the leader runs it on its next tick. False if unknown."""
+        if job_id not in self.jobs:
+            return False
+        db.session.execute(
+            dialect_insert(ScheduledJob.__table__).on_conflict_do_update(
+                index_elements=["id"], set_={"next_run_at": _now()}
+            ),
+            {"id": job_id, "next_run_at": _now()},
+        )
+        db.session.commit()
+        return True
+
+    # --- /settings/jobs ---
+    def status(self):
+        lease = db.session.get(SchedulerLease, LEASE_NAME)
+        due = dict(db.session.query(ScheduledJob.id, ScheduledJob.next_run_at).all())
+        jobs = []
+        for job in self.jobs.values():
+            runs = (
+                JobRun.query.filter(JobRun.job_id == job.id)
+                .order_by(JobRun.started_at.desc(), JobRun.id.desc())
+                .limit(HISTORY_SHOWN)
+                .all()
+            )
+            jobs.append({
+                "id": job.id,
+                "name": job.name,
+                "interval_seconds": job.interval.total_seconds(),
+                "next_run_at": due[job.id].isoformat(" ", "seconds") if job.id in due else None,
+                "runs": [
+                    {
+                        "started_at": run.started_at.isoformat(" ", "seconds"),
+                        "seconds": run.seconds,
+                        "status": run.status,
+                        "error": run.error,
+                        "worker": run.owner,
+                    }
+                    for run in runs
+                ],
+            })
+        return {
+            "enabled": self.enabled,
+            "worker": self.owner,
+            "leader": lease.owner if lease and lease.expires_at > _now() else None,
+            "lease_expires_at": lease.expires_at.isoformat(" ", "seconds") if lease else None,
+            "jobs": jobs,
+        }
+
+
+job_scheduler = JobScheduler()
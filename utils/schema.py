@@ -0,0 +1,22 @@
+# utils/schema.py
+import click
+from flask.cli import with_appcontext
+
+from models import db
+from utils.rollups import ensure_rollups
+from utils.stock import ensure_stock_ledger
+
+
+def create_schema():
+    """Create missing tables, then backfill the rollups and open the stock ledger if needed."""
+    db.create_all()
+    ensure_rollups()
+    ensure_stock_ledger()
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Create missing tables and backfill derived data, for a database built without migrations."""
+    create_schema()
+    click.echo("✅ Database schema ready.")
@@ -0,0 +1,333 @@
+# utils/search.py
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from utils.catalog import current_version, catalog_delta, _item_rows, _categories
+
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_WORDS = 6
+BARCODE_PREFIX_LIMIT = 500
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """Lowercase, strip accents, split on anything that isn't a letter or digit."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub(" ", text.lower()).split()
+
+
+def _trigrams(word, prefix=False):
+    """Padded trigrams of `word`; prefix=True leaves the end open (word still being typed)."""
+    padded = f"  {word}" if prefix else f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _bitmap(slots):
+    """Int with bit `slot` set for every slot (built via bytes; OR-ing one bit at a time copies the int)."""
+    if not slots:
+        return 0
+    buf = bytearray((max(slots) >> 3) + 1)
+    for slot in slots:
+        buf[slot >> 3] |= 1 << (slot & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _slots(bits, limit=None):
+    """Set bit positions of `bits`, lowest first."""
+    out = []
+    while bits and (limit is None or len(out) < limit):
+        low = bits & -bits
+        out.append(low.bit_length() - 1)
+        bits ^= low
+    return out
+
+
+def _max_typos(token):
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def _edit_distance(a, b, limit):
+    """Optimal string alignment distance (a swap counts as one edit), or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SearchIndex:
+    """
+    In-process fuzzy search over item name, barcode and category name.
+
+    Items are tokenised into words; a trigram index over the (much smaller)
+    word vocabulary finds typo candidates, which are confirmed with a
+    bounded edit distance (1 typo from 4 letters, 2 from 8). Every query
+    word must match some word of the item exactly, as a prefix, or within
+    its typo budget; digit queries also match barcode prefixes.
+
+    Each item gets a slot, and each word's items are an int bitmap of
+    slots: unions and intersections run in C, and (unlike sets of ids) the
+    per-query temporaries are invisible to the cyclic GC, whose passes over
+    large sets were the main latency spike. A full build hands out slots in
+    ranking order (shortest name first), so the lowest set bits of a result
+    bitmap are its best matches.
+
+    The index follows the catalog version (utils.catalog): each search
+    applies /items/catalog/delta-style changes since the version it last
+    saw, so CRUD routes, checkouts and other workers never leave it stale.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # item id -> (barcode, name, category_id, price, quantity, words, slot)
+        self.docs = {}
+        self.items = []  # slot -> item id, None once deleted
+        self.ranked = 0  # slots below this are in ranking order; later ones were appended
+        self.categories = {}  # str(category id) -> name
+        self.word_bits = {}  # word -> bitmap of slots
+        self.trigram_words = defaultdict(set)  # trigram -> words
+        self.vocabulary = []  # sorted words, for prefix ranges
+        self.barcodes = []  # sorted (barcode, item id)
+
+    def clear(self):
+        with self._lock:
+            self.version = None
+            self._reset()
+
+    # --- Keeping up with the catalog ---
+    def sync(self):
+        """Bring the index up to the current catalog version (full build the first time)."""
+        version = current_version()
+        with self._lock:
+            if self.version == version:
+                return
+            if self.version is None:
+                self._build(version)
+                return
+
+            delta = catalog_delta(self.version)
+            for item_id in delta["deleted"]:
+                self._remove(item_id)
+            renamed = {cid for cid, name in delta["categories"].items() if self.categories.get(cid) != name}
+            renamed |= set(self.categories) - set(delta["categories"])
+            self.categories = delta["categories"]
+            changed = {row[0] for row in delta["items"]}
+            for item_id, barcode, name, category_id, price, quantity in delta["items"]:
+                doc = self.docs.get(item_id)
+                if doc and doc[:3] == (barcode, name, category_id) and str(category_id) not in renamed:
+                    # price / stock only (every sale): keep words and slot
+                    self.docs[item_id] = (barcode, name, category_id, price, quantity, doc[5], doc[6])
+                    continue
+                self._remove(item_id)
+                self._add(item_id, barcode, name, category_id, price, quantity)
+            if renamed:
+                for item_id, doc in list(self.docs.items()):
+                    if item_id not in changed and str(doc[2]) in renamed:
+                        self._remove(item_id)
+                        self._add(item_id, *doc[:5])
+            self.version = delta["version"]
+
+            # Too many appended (unranked) slots: re-rank with a full build
+            if len(self.items) - self.ranked > max(1000, self.ranked // 10):
+                self._build(self.version)
+
+    def _words(self, name, category_id):
+        category = self.categories.get(str(category_id)) if category_id is not None else None
+        return tuple(set(normalize(name) + normalize(category)))
+
+    def _build(self, version):
+        self._reset()
+        self.categories = _categories()
+        rows = sorted(_item_rows(), key=lambda row: (len(row[2]), row[2].lower(), row[0]))
+        slots_by_word = defaultdict(list)
+        for slot, (item_id, barcode, name, category_id, price, quantity) in enumerate(rows):
+            words = self._words(name, category_id)
+            self.docs[item_id] = (barcode, name, category_id, price, quantity, words, slot)
+            self.items.append(item_id)
+            for word in words:
+                slots_by_word[word].append(slot)
+        for word, slots in slots_by_word.items():
+            self.word_bits[word] = _bitmap(slots)
+            for gram in _trigrams(word):
+                self.trigram_words[gram].add(word)
+        self.vocabulary = sorted(self.word_bits)
+        self.barcodes = sorted((row[1], row[0]) for row in rows if row[1])
+        self.ranked = len(rows)
+        self.version = version
+
+    def _add(self, item_id, barcode, name, category_id, price, quantity):
+        slot = len(self.items)
+        self.items.append(item_id)
+        words = self._words(name, category_id)
+        self.docs[item_id] = (barcode, name, category_id, price, quantity, words, slot)
+        for word in words:
+            if word not in self.word_bits:
+                self.word_bits[word] = 0
+                insort(self.vocabulary, word)
+                for gram in _trigrams(word):
+                    self.trigram_words[gram].add(word)
+            self.word_bits[word] |= 1 << slot
+        if barcode:
+            insort(self.barcodes, (barcode, item_id))
+
+    def _remove(self, item_id):
+        doc = self.docs.pop(item_id, None)
+        if doc is None:
+            return
+        barcode, words, slot = doc[0], doc[5], doc[6]
+        self.items[slot] = None
+        for word in words:
+            bits = self.word_bits[word] & ~(1 << slot)
+            if bits:
+                self.word_bits[word] = bits
+                continue
+            del self.word_bits[word]
+            del self.vocabulary[bisect_left(self.vocabulary, word)]
+            for gram in _trigrams(word):
+                self.trigram_words[gram].discard(word)
+        if barcode:
+            i = bisect_left(self.barcodes, (barcode, item_id))
+            if i < len(self.barcodes) and self.barcodes[i] == (barcode, item_id):
+                del self.barcodes[i]
+
+    # --- Querying ---
+    def _word_matches(self, token, last):
+        """Vocabulary words matching `token` -> score (exact 1.0, prefix 0.9, typo 0.7/0.6)."""
+        matches = {}
+        if not last or len(token) >= MIN_QUERY_LENGTH:
+            lo = bisect_left(self.vocabulary, token)
+            # only the word being typed (the last) matches as a prefix
+            hi = bisect_left(self.vocabulary, token + "\x7f") if last else lo + 1
+            for word in self.vocabulary[lo:hi]:
+                if word == token:
+                    matches[word] = 1.0
+                elif last:
+                    matches[word] = 0.9
+
+        typos = _max_typos(token)
+        if typos:
+            grams = _trigrams(token, prefix=last)
+            counts = Counter()
+            for gram in grams:
+                counts.update(self.trigram_words.get(gram, ()))
+            # each edit destroys at most 3 trigrams
+            needed = max(1, len(grams) - 3 * typos)
+            for word, shared in counts.items():
+                if shared < needed or word in matches:
+                    continue
+                if last and len(word) > len(token):
+                    # a prefix with a typo: compare with the word cut to the typed length (+1 for a dropped letter)
+                    distance = min(_edit_distance(token, word[:len(token)], typos),
+                                   _edit_distance(token, word[:len(token) + 1], typos))
+                else:
+                    distance = _edit_distance(token, word, typos)
+                if distance <= typos:
+                    matches[word] = 0.7 - 0.1 * (distance - 1)
+        return matches
+
+    def _tiers(self, token, last):
+        """Items matching `token` as [(score, bitmap)], best first; an item sits in its best tier only."""
+        by_score = defaultdict(int)
+        for word, score in self._word_matches(token, last).items():
+            by_score[score] |= self.word_bits[word]
+
+        # exact barcode 1.0, barcode prefix 0.95 (the first BARCODE_PREFIX_LIMIT in order)
+        if token.isdigit() and len(token) >= 3:
+            lo = bisect_left(self.barcodes, (token,))
+            hi = min(bisect_left(self.barcodes, (token + "\x7f",)), lo + BARCODE_PREFIX_LIMIT)
+            exact, prefix = [], []
+            for barcode, item_id in self.barcodes[lo:hi]:
+                (exact if barcode == token else prefix).append(self.docs[item_id][6])
+            by_score[1.0] |= _bitmap(exact)
+            by_score[0.95] |= _bitmap(prefix)
+
+        tiers, seen = [], 0
+        for score in sorted(by_score, reverse=True):
+            bits = by_score[score] & ~seen
+            if bits:
+                tiers.append((score, bits))
+                seen |= bits
+        return tiers
+
+    def _best(self, bits, limit):
+        """Item ids of the `limit` best-ranked slots in `bits`."""
+        slots = _slots(bits & ((1 << self.ranked) - 1), limit)
+        appended = bits >> self.ranked
+        if appended:
+            # added since the last full build: merge by name
+            slots += [self.ranked + s for s in _slots(appended)]
+            docs, items = self.docs, self.items
+            slots.sort(key=lambda s: (len(docs[items[s]][1]), docs[items[s]][1].lower(), items[s]))
+        return [self.items[slot] for slot in slots[:limit]]
+
+    def search(self, query, limit=20):
+        self.sync()
+        tokens = normalize(query)[:MAX_QUERY_WORDS]
+        if not tokens or len("".join(tokens)) < MIN_QUERY_LENGTH:
+            return []
+
+        with self._lock:
+            per_token = []
+            for n, token in enumerate(tokens):
+                tiers = self._tiers(token, last=n == len(tokens) - 1)
+                if not tiers:
+                    return []
+                per_token.append(tiers)
+            # most selective word first keeps the intersections small
+            per_token.sort(key=lambda tiers: sum(bits.bit_count() for _, bits in tiers))
+
+            # Every combination of tiers is one total score, and its items are
+            # a plain bitmap intersection: no per-item scoring loop.
+            groups = defaultdict(int)  # total score -> bitmap
+
+            def walk(i, score, bits):
+                if i == len(per_token):
+                    groups[round(score, 3)] |= bits
+                    return
+                for tier_score, tier_bits in per_token[i]:
+                    narrowed = tier_bits if bits is None else bits & tier_bits
+                    if narrowed:
+                        walk(i + 1, score + tier_score, narrowed)
+
+            walk(0, 0.0, None)
+
+            results = []
+            for score in sorted(groups, reverse=True):
+                for item_id in self._best(groups[score], limit - len(results)):
+                    barcode, name, category_id, price, quantity, _, _ = self.docs[item_id]
+                    results.append({
+                        "id": item_id,
+                        "barcode": barcode,
+                        "name": name,
+                        "category": self.categories.get(str(category_id)) or "Uncategorized",
+                        "price": price,
+                        "quantity": quantity,
+                        "score": round(score / len(tokens), 3),
+                    })
+                if len(results) >= limit:
+                    break
+            return results
+
+
+search_index = SearchIndex()
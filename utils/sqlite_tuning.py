@@ -0,0 +1,43 @@
+# utils/sqlite_tuning.py
+from sqlalchemy import event
+
+
+def sqlite_pragmas(config):
+    """Build the per-connection PRAGMA list from app config."""
+    pragmas = [
+        ("journal_mode", config.get("SQLITE_JOURNAL_MODE", "WAL")),
+        ("synchronous", config.get("SQLITE_SYNCHRONOUS", "NORMAL")),
+        ("busy_timeout", int(config.get("SQLITE_BUSY_TIMEOUT_MS", 5000))),
+        ("mmap_size", int(config.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))),
+        # negative = KiB rather than pages
+        ("cache_size", -int(config.get("SQLITE_CACHE_SIZE_KB", 64 * 1024))),
+    ]
+    return [(name, value) for name, value in pragmas if value not in (None, "")]
+
+
+def tune_sqlite(engine, config):
+    """
+    Apply the production PRAGMA profile to every pooled connection of `engine`.
+
+    Must run before the engine hands out its first connection. WAL lets
+    report queries read while a checkout writes; busy_timeout makes a second
+    writer wait for the lock instead of failing with "database is locked".
+    Transactions are left to pysqlite, which only issues BEGIN before the
+    first write, so a checkout never holds a read snapshot that it later
+    has to upgrade. Non-SQLite engines are left alone.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return True
@@ -0,0 +1,236 @@
+# utils/stock.py
+"""
+Stock ledger: every change to Item.quantity is also appended to
+stock_movements, so any item's stock can be explained and reconstructed.
+
+Item.quantity stays the live balance the tills read; the ledger is the
+record of how it got there. Periodic snapshots (take_snapshots) store each
+moved item's balance as of a movement id, so the stock at any point in
+time is the latest earlier snapshot plus a replay of the few movements
+recorded after it, instead of a sum over the item's whole history.
+"""
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, bindparam, case, func, insert, literal, select
+
+from models import db, EAT, Item, StockMovement, StockSnapshot
+from utils.db import dialect_insert
+
+# opening: balance when the ledger started (or an item was created with stock)
+KINDS = ("opening", "sale", "restock", "adjustment", "return")
+
+
+def record_movements(kind, changes, reference=None, occurred_at=None):
+    """
+    Append one movement per (item_id, quantity) in `changes`; zero changes are skipped.
+
+    Like record_sales(), this runs inside the caller's transaction, so the
+    ledger commits or rolls back together with the Item.quantity update it
+    describes. Quantities are signed: sales are negative.
+    """
+    occurred_at = occurred_at or datetime.now(EAT)
+    rows = [
+        {"item_id": item_id, "kind": kind, "quantity": quantity,
+         "reference": reference, "occurred_at": occurred_at}
+        for item_id, quantity in changes if quantity
+    ]
+    if rows:
+        db.session.execute(insert(StockMovement.__table__), rows)
+
+
+def record_counts(counts, reference=None, occurred_at=None):
+    """
+    Append the adjustment that takes each item from its current quantity to
+    the count given for it in `counts` ((item_id, quantity) pairs).
+
+    The difference is taken in SQL from the row as the statement finds it, not
+    from an earlier read, so a sale or restock committed in between is kept
+    in the ledger. Call it before the write that sets the new quantities, in
+    the same transaction: on SQLite this statement takes the write lock, so
+    nothing else can change them in between.
+    """
+    occurred_at = occurred_at or datetime.now(EAT)
+    rows = [{"counted_id": item_id, "counted": quantity} for item_id, quantity in counts]
+    if not rows:
+        return
+    current = func.coalesce(Item.quantity, 0)
+    db.session.execute(
+        insert(StockMovement.__table__).from_select(
+            ["item_id", "kind", "quantity", "reference", "occurred_at"],
+            select(Item.id, literal("adjustment"), bindparam("counted") - current, literal(reference),
+                   literal(occurred_at))
+            .where(Item.id == bindparam("counted_id"), current != bindparam("counted")),
+        ),
+        rows,
+    )
+
+
+def ensure_stock_ledger():
+    """
+    Open the ledger with each item's current stock when it is empty but items exist.
+
+    One INSERT ... SELECT ... WHERE NOT EXISTS, so workers booting together
+    can't each open it: SQLite runs the statement under the write lock, and
+    only the first one finds the ledger empty.
+    """
+    opened = db.session.execute(
+        insert(StockMovement).from_select(
+            ["item_id", "kind", "quantity", "reference", "occurred_at"],
+            select(Item.id, literal("opening"), Item.quantity, literal("ledger start"),
+                   literal(datetime.now(EAT).replace(tzinfo=None)))
+            .where(Item.quantity != 0, ~select(StockMovement.id).exists()),
+        )
+    ).rowcount
+    db.session.commit()
+    if opened:
+        print(f"✅ Stock ledger opened with the current stock of {opened} items.")
+
+
+def _replay(query):
+    """
+    Net change per item of (item_id, quantity) rows from a movement id range.
+
+    Summed here rather than with GROUP BY: SQLite would walk the whole
+    item_id index to skip the sort instead of reading the short id range.
+    """
+    changes = {}
+    for item_id, quantity in query:
+        changes[item_id] = changes.get(item_id, 0) + quantity
+    return changes
+
+
+def take_snapshots():
+    """
+    Snapshot the balance of every item that moved since the last snapshot run.
+
+    Each run covers the movements in (last run, newest movement] and adds
+    them to the items' snapshots as of the last run, so it only reads that
+    slice of the ledger. Runs racing in two workers are each still exact;
+    identical rows for the same movement id are absorbed by the unique key.
+    Returns the number of items snapshotted.
+    """
+    last = db.session.query(StockSnapshot.movement_id).order_by(
+        StockSnapshot.taken_at.desc(), StockSnapshot.movement_id.desc()
+    ).limit(1).scalar() or 0
+    through = db.session.query(func.max(StockMovement.id)).scalar() or 0
+    if through <= last:
+        return 0
+
+    moved = _replay(db.session.query(StockMovement.item_id, StockMovement.quantity).filter(
+        StockMovement.id > last, StockMovement.id <= through
+    ))
+    latest = (
+        select(StockSnapshot.item_id, func.max(StockSnapshot.movement_id).label("movement_id"))
+        .where(StockSnapshot.movement_id <= last, StockSnapshot.item_id.in_(
+            select(StockMovement.item_id).where(StockMovement.id > last, StockMovement.id <= through)
+        ))
+        .group_by(StockSnapshot.item_id)
+        .subquery()
+    )
+    previous = dict(
+        db.session.query(StockSnapshot.item_id, StockSnapshot.quantity)
+        .join(latest, and_(StockSnapshot.item_id == latest.c.item_id,
+                           StockSnapshot.movement_id == latest.c.movement_id))
+    )
+
+    taken_at = datetime.now(EAT)
+    db.session.execute(
+        dialect_insert(StockSnapshot.__table__).on_conflict_do_nothing(index_elements=["item_id", "movement_id"]),
+        [{"item_id": item_id, "movement_id": through, "quantity": previous.get(item_id, 0) + change,
+          "taken_at": taken_at}
+         for item_id, change in moved.items()],
+    )
+    db.session.commit()
+    return len(moved)
+
+
+def _naive(at):
+    # stored datetimes are naive EAT wall clock
+    return at.astimezone(EAT).replace(tzinfo=None) if at and at.tzinfo else at
+
+
+def quantity_at(item_id, at=None):
+    """An item's stock from movements before `at` (default: all): snapshot + short replay."""
+    at = _naive(at)
+    snapshot = db.session.query(StockSnapshot.movement_id, StockSnapshot.quantity).filter(
+        StockSnapshot.item_id == item_id
+    )
+    if at:
+        snapshot = snapshot.filter(StockSnapshot.taken_at <= at)
+    through, quantity = snapshot.order_by(StockSnapshot.taken_at.desc(), StockSnapshot.movement_id.desc()).first() or (0, 0)
+
+    # the time test stays out of WHERE so SQLite seeks (item_id, id > through)
+    # rather than walking the item's history by occurred_at
+    change = StockMovement.quantity
+    if at:
+        change = case((StockMovement.occurred_at < at, StockMovement.quantity), else_=0)
+    return quantity + db.session.query(func.coalesce(func.sum(change), 0)).filter(
+        StockMovement.item_id == item_id, StockMovement.id > through
+    ).scalar()
+
+
+def stock_levels_at(at=None):
+    """
+    {item_id: stock} for every current item, from movements before `at` (default: all).
+
+    Starts from the last snapshot run before `at`, then replays the ledger
+    recorded after that run: movements are filtered by when they happened,
+    not when they were recorded, so a late upload from an offline till still
+    counts on the right day.
+    """
+    at = _naive(at)
+    runs = db.session.query(StockSnapshot.movement_id)
+    if at:
+        runs = runs.filter(StockSnapshot.taken_at <= at)
+    through = runs.order_by(StockSnapshot.taken_at.desc(), StockSnapshot.movement_id.desc()).limit(1).scalar() or 0
+
+    # one index seek per item for its last snapshot of that run or earlier
+    latest = (
+        select(StockSnapshot.quantity)
+        .where(StockSnapshot.item_id == Item.id, StockSnapshot.movement_id <= through)
+        .order_by(StockSnapshot.movement_id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    levels = {item_id: quantity or 0 for item_id, quantity in db.session.query(Item.id, latest)}
+    replay = db.session.query(StockMovement.item_id, StockMovement.quantity).filter(
+        StockMovement.id > through
+    )
+    if at:
+        replay = replay.filter(StockMovement.occurred_at < at)
+    for item_id, change in _replay(replay).items():
+        if item_id in levels:
+            levels[item_id] += change
+    return levels
+
+
+def ledger_discrepancies():
+    """Items whose Item.quantity differs from their ledger balance: [(id, barcode, quantity, ledger)]."""
+    ledger = stock_levels_at()
+    return [
+        (item_id, barcode, quantity, ledger[item_id])
+        for item_id, barcode, quantity in db.session.query(Item.id, Item.barcode, Item.quantity).order_by(Item.id)
+        if (quantity or 0) != ledger[item_id]
+    ]
+
+
+@click.command("stock-snapshot")
+@with_appcontext
+def stock_snapshot_command():
+    """Snapshot the stock of items moved since the last snapshot."""
+    click.echo(f"✅ Stock snapshot: {take_snapshots()} items.")
+
+
+@click.command("stock-audit")
+@with_appcontext
+def stock_audit_command():
+    """Compare every item's stock with its ledger balance; exits 1 on any difference."""
+    mismatches = ledger_discrepancies()
+    for item_id, barcode, quantity, ledger in mismatches:
+        click.echo(f"  item {item_id} ({barcode}): stock {quantity}, ledger {ledger}")
+    if mismatches:
+        click.echo(f"⚠️ {len(mismatches)} items differ from the stock ledger.")
+        raise SystemExit(1)
+    click.echo("✅ Stock matches the ledger for every item.")
@@ -0,0 +1,136 @@
+# utils/till_sync.py
+import threading
+import traceback
+from datetime import datetime
+
+from models import EAT
+from utils.journal import SaleJournal
+
+MAX_BACKOFF_SECONDS = 300
+
+
+class TillSync:
+    """
+    Offline-first till mode.
+
+    With TILL_MODE on, checkout appends the cart to a local SaleJournal and
+    answers immediately. A daemon worker uploads pending entries in batches
+    to SYNC_SERVER_URL/sales/sync, where each sale's idempotency key makes a
+    re-upload (lost response, retry, restart) a no-op. Network failures back
+    off exponentially; nothing is ever dropped from the journal.
+    """
+
+    def __init__(self, batch_size=50, interval=5):
+        self.enabled = False
+        self.journal = None
+        self.server_url = None
+        self.token = None
+        self.batch_size = batch_size
+        self.interval = interval
+        self.last_sync = None
+        self.last_error = None
+        self._wake = threading.Event()
+        self._sync_lock = threading.Lock()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._session = None
+
+    def init_app(self, app):
+        self.enabled = app.config.get("TILL_MODE", False)
+        if not self.enabled:
+            return
+        self.journal = SaleJournal(app.config["TILL_JOURNAL_PATH"])
+        self.server_url = (app.config.get("SYNC_SERVER_URL") or "").rstrip("/")
+        self.token = app.config.get("SYNC_TOKEN")
+        self.batch_size = app.config.get("SYNC_BATCH_SIZE", self.batch_size)
+        self.interval = app.config.get("SYNC_INTERVAL_SECONDS", self.interval)
+        # Upload whatever an earlier run left behind
+        self._ensure_worker()
+
+    def record(self, items, payment_method):
+        """Journal a sale (durable once this returns) and nudge the worker."""
+        entry = self.journal.append(items, payment_method)
+        self._ensure_worker()
+        self._wake.set()
+        return entry
+
+    def status(self):
+        return dict(
+            self.journal.stats(),
+            server_url=self.server_url,
+            last_sync=self.last_sync,
+            last_error=self.last_error,
+        )
+
+    def sync_now(self):
+        """Upload one batch; returns the number of entries acknowledged."""
+        if not self.server_url:
+            raise RuntimeError("SYNC_SERVER_URL is not set")
+
+        with self._sync_lock:
+            batch = self.journal.pending(self.batch_size)
+            if not batch:
+                return 0
+
+            headers = {"X-Sync-Token": self.token} if self.token else {}
+            response = self._get_session().post(
+                f"{self.server_url}/sales/sync",
+                json={"sales": batch},
+                headers=headers,
+                timeout=(3, 30),
+            )
+            response.raise_for_status()
+
+            acks = []
+            for result in response.json().get("results", []):
+                if result.get("status") in ("created", "duplicate"):
+                    acks.append(dict(result, status="synced"))
+                elif result.get("status") == "rejected":
+                    acks.append(result)
+                # anything else (e.g. "error") stays pending and is retried
+            self.journal.ack(acks)
+            self.last_sync = datetime.now(EAT).isoformat(timespec="seconds")
+            self.last_error = None
+            return len(acks)
+
+    def _get_session(self):
+        if self._session is None:
+            # imported on the first upload: non-till workers never load requests
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def _ensure_worker(self):
+        if not self.server_url:
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="fidpos-till-sync", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        import requests
+
+        failures = 0
+        delay = 0
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                synced = self.sync_now()
+                failures = 0
+                # A full batch means there is probably more waiting
+                delay = 0 if synced >= self.batch_size else self.interval
+            except requests.RequestException as e:
+                failures += 1
+                self.last_error = str(e)
+                delay = min(self.interval * 2 ** failures, MAX_BACKOFF_SECONDS)
+                print(f"[till-sync] Upload failed ({e}); retrying in {delay}s")
+            except Exception as e:
+                failures += 1
+                self.last_error = str(e)
+                delay = min(self.interval * 2 ** failures, MAX_BACKOFF_SECONDS)
+                traceback.print_exc()
+
+
+till_sync = TillSync()
@@ -0,0 +1,51 @@
+# utils/totals.py
+from datetime import datetime
+
+from sqlalchemy import func
+
+from models import db, Sale, SalesSummary, EAT
+
+SUMMARY_ID = 1
+
+
+def record_sales(count, revenue):
+    """
+    Add freshly inserted sales to the running totals.
+
+    Runs inside the caller's transaction, so the totals commit (or roll back)
+    together with the Sale rows. Call it after the rows are added to the session.
+    """
+    updated = SalesSummary.query.filter_by(id=SUMMARY_ID).update(
+        {
+            SalesSummary.sale_count: SalesSummary.sale_count + count,
+            SalesSummary.revenue: SalesSummary.revenue + revenue,
+            SalesSummary.updated_at: datetime.now(EAT),
+        },
+        synchronize_session=False,
+    )
+    if not updated:
+        # First sale on a fresh (or pre-existing) database: seed from the sales
+        # table, which already includes the rows being added.
+        rebuild_totals()
+
+
+def rebuild_totals():
+    """Recompute the running totals from the sales table with SQL aggregates."""
+    sale_count, revenue = db.session.query(
+        func.count(Sale.id), func.coalesce(func.sum(Sale.total), 0)
+    ).one()
+    summary = db.session.get(SalesSummary, SUMMARY_ID) or SalesSummary(id=SUMMARY_ID)
+    summary.sale_count = sale_count
+    summary.revenue = float(revenue)
+    summary.updated_at = datetime.now(EAT)
+    db.session.add(summary)
+    return summary
+
+
+def get_totals():
+    """Return (sale_count, revenue) in O(1), seeding the summary row if missing."""
+    summary = db.session.get(SalesSummary, SUMMARY_ID)
+    if summary is None:
+        summary = rebuild_totals()
+        db.session.commit()
+    return summary.sale_count, summary.revenue